@@ -2,7 +2,11 @@
 
 from django.conf import settings
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from . import token_cache, user_cache
+from .models import CustomUser
 
 
 class CookieJWTAuthentication(JWTAuthentication):
@@ -24,3 +28,69 @@ class CookieJWTAuthentication(JWTAuthentication):
             return self.get_user(validated_token), validated_token
         except InvalidToken:
             return None
+
+    def get_validated_token(self, raw_token):
+        # Signature and claims are only verified on a token cache miss
+        return token_cache.get_validated_token(raw_token, self.verify_token)
+
+    def verify_token(self, raw_token):
+        """Signature and claims check (CPU only, no I/O)"""
+        return super().get_validated_token(raw_token)
+
+    def get_user(self, validated_token):
+        """Same checks as JWTAuthentication.get_user, loaded via the user cache."""
+        try:
+            user = user_cache.get_user(self.get_user_id(validated_token))
+        except CustomUser.DoesNotExist as e:
+            raise AuthenticationFailed("User not found", code="user_not_found") from e
+        return self.check_user(user)
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(
+                "Token contained no recognizable user identification"
+            ) from e
+
+    def check_user(self, user):
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        return user
+
+
+class AsyncCookieJWTAuthentication(CookieJWTAuthentication):
+    """
+    CookieJWTAuthentication for async views: aauthenticate() awaits the
+    shared caches and the database instead of blocking the event loop.
+    Takes a plain Django request.
+    """
+
+    async def aauthenticate(self, request):
+        raw_token = request.COOKIES.get(settings.SIMPLE_JWT["AUTH_COOKIE"])
+
+        if raw_token is None:
+            header = self.get_header(request)
+            if header is None:
+                return None
+            raw_token = self.get_raw_token(header)
+            if raw_token is None:
+                return None
+            validated_token = await self.aget_validated_token(raw_token)
+            return await self.aget_user(validated_token), validated_token
+
+        try:
+            validated_token = await self.aget_validated_token(raw_token)
+            return await self.aget_user(validated_token), validated_token
+        except InvalidToken:
+            return None
+
+    async def aget_validated_token(self, raw_token):
+        return await token_cache.aget_validated_token(raw_token, self.verify_token)
+
+    async def aget_user(self, validated_token):
+        try:
+            user = await user_cache.aget_user(self.get_user_id(validated_token))
+        except CustomUser.DoesNotExist as e:
+            raise AuthenticationFailed("User not found", code="user_not_found") from e
+        return self.check_user(user)
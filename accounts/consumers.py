@@ -1,24 +1,55 @@
 # accounts/consumers.py
 
 import json
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
-from channels.db import database_sync_to_async
-from .models import CustomUser
+from . import presence
 
 
 class OnlineUsersConsumer(AsyncWebsocketConsumer):
+    """
+    Online users presence.
+
+    Default mode: `online_users` message with the full list on every change.
+    Delta mode (`ws/online-users/?mode=delta`): one `snapshot` message with
+    a sequence number on connect, then `joined`/`left` messages carrying
+    consecutive sequence numbers. Clients ignore deltas with seq <= snapshot
+    seq and send {"type": "resync"} to get a fresh snapshot on a gap.
+
+    Clients send {"type": "ping"} more often than every PRESENCE_TTL
+    seconds and get a `pong` back; sockets that stop pinging go offline.
+    """
+
     async def connect(self):
-        self.room_group_name = "online_users"
+        query = parse_qs(self.scope["query_string"].decode())
+        self.delta_mode = query.get("mode") == ["delta"]
+        self.room_group_name = (
+            presence.DELTA_GROUP if self.delta_mode else presence.ONLINE_USERS_GROUP
+        )
 
         # Join room group
         await self.channel_layer.group_add(self.room_group_name, self.channel_name)
 
         await self.accept()
 
+        presence.ensure_sweeper()
+
         # Send current online users
         if self.scope["user"].is_authenticated:
-            await self.update_user_status(self.scope["user"].id, True)
-            await self.broadcast_online_users()
+            changed = await self.update_user_status(self.scope["user"], True)
+
+            # This socket gets its state right away, everyone else on the
+            # next coalesced broadcast
+            if self.delta_mode:
+                await self.send_snapshot()
+            else:
+                payload = await sync_to_async(presence.online_users_message)()
+                await self.send(text_data=payload)
+
+            if changed:
+                await presence.schedule_broadcast()
 
     async def disconnect(self, close_code):
         # Leave room group
@@ -26,48 +57,47 @@ class OnlineUsersConsumer(AsyncWebsocketConsumer):
 
         # Update user status
         if self.scope["user"].is_authenticated:
-            await self.update_user_status(self.scope["user"].id, False)
-            await self.broadcast_online_users()
-
-    async def receive(self, text_data):
-        # Handle incoming messages if needed (for heartbeat/ping-pong)
-        pass
+            if await self.update_user_status(self.scope["user"], False):
+                await presence.schedule_broadcast()
+
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            message = json.loads(text_data)
+        except (TypeError, ValueError):
+            return
+
+        if not isinstance(message, dict):
+            return
+
+        # Heartbeat
+        if message.get("type") == "ping":
+            if self.scope["user"].is_authenticated:
+                # Back online if the sweeper had expired this socket
+                if await sync_to_async(presence.refresh_connection)(
+                    self.scope["user"], self.channel_name
+                ):
+                    await presence.schedule_broadcast()
+            await self.send(text_data=json.dumps({"type": "pong"}))
+
+        # Client detected a sequence gap
+        elif message.get("type") == "resync" and self.delta_mode:
+            await self.send_snapshot()
 
     async def user_status_update(self, event):
-        # Fetch list
-        online_users = await self.get_online_users()
+        # Forward the payload precomputed by the broadcaster
+        await self.send(text_data=event["payload"])
 
-        # Send message to WebSocket
-        await self.send(
-            text_data=json.dumps({"type": "online_users", "users": online_users})
-        )
+    async def presence_deltas(self, event):
+        # Deltas coalesced over one broadcast window, in sequence order
+        for payload in event["payloads"]:
+            await self.send(text_data=payload)
 
-    @database_sync_to_async
-    def update_user_status(self, user_id, is_online):
-        from django.core.cache import cache
+    async def send_snapshot(self):
+        payload = await sync_to_async(presence.snapshot_message)()
+        await self.send(text_data=payload)
 
-        cache_key = f"user_online_{user_id}"
+    @sync_to_async
+    def update_user_status(self, user, is_online):
         if is_online:
-            cache.set(cache_key, True, timeout=None)
-        else:
-            cache.delete(cache_key)
-
-    @database_sync_to_async
-    def get_online_users(self):
-        from django.core.cache import cache
-
-        users = CustomUser.objects.all()
-        online_users = []
-        for user in users:
-            if cache.get(f"user_online_{user.id}"):
-                online_users.append(
-                    {"id": user.id, "username": user.username, "role": user.role}
-                )
-        return online_users
-
-    async def broadcast_online_users(self):
-        online_users = await self.get_online_users()
-
-        await self.channel_layer.group_send(
-            self.room_group_name, {"type": "user_status_update", "users": online_users}
-        )
+            return presence.add_connection(user, self.channel_name)
+        return presence.remove_connection(user.id, self.channel_name)
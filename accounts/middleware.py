@@ -3,16 +3,15 @@
 from channels.db import database_sync_to_async
 from django.contrib.auth.models import AnonymousUser
 from django.conf import settings
-from rest_framework_simplejwt.tokens import AccessToken
-from .models import CustomUser
+from . import token_cache, user_cache
 
 
 @database_sync_to_async
 def get_user_from_token(token):
     try:
-        access_token = AccessToken(token)
+        access_token = token_cache.get_validated_token(token)
         user_id = access_token["user_id"]
-        return CustomUser.objects.get(id=user_id)
+        return user_cache.get_user(user_id)
     except Exception:
         return AnonymousUser()
 
@@ -0,0 +1,390 @@
+# accounts/presence.py
+
+import asyncio
+import json
+import logging
+import threading
+import time
+import uuid
+
+import redis
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+ONLINE_USERS_KEY = "presence:online_users"
+SEQUENCE_KEY = "presence:seq"
+PENDING_KEY = "presence:pending"
+CONNECTIONS_KEY = "presence:connections"
+USER_CONNECTIONS_PREFIX = "presence:user_connections:"
+FLUSH_LOCK_KEY = "presence:flush_lock"
+
+# Legacy clients get the full list on every change, delta clients
+# get a snapshot once and then only joined/left messages.
+ONLINE_USERS_GROUP = "online_users"
+DELTA_GROUP = "online_users_delta"
+
+# Extra lock lifetime so a crashed flusher never blocks broadcasts for long
+FLUSH_LOCK_GRACE_MS = 1000
+
+# Upper bound of connections expired by one sweep script call
+SWEEP_BATCH_SIZE = 1000
+
+# Membership change, sequence bump and queueing of the delta happen in
+# one atomic step, so deltas are gap-free and queued in sequence order.
+# KEYS: online users, sequence, pending deltas, connection expiries and,
+# for per-user scripts, the user's connection set.
+LEAVE_LUA = """
+local function leave(user_id)
+    local snapshot = redis.call('HGET', KEYS[1], user_id)
+    if not snapshot then
+        return 0
+    end
+    redis.call('HDEL', KEYS[1], user_id)
+    local seq = redis.call('INCR', KEYS[2])
+    redis.call('RPUSH', KEYS[3],
+        '{"type": "left", "seq": ' .. seq .. ', "user": ' .. snapshot .. '}')
+    return 1
+end
+"""
+
+CONNECT_SCRIPT = """
+redis.call('ZADD', KEYS[4], ARGV[4], ARGV[3])
+redis.call('SADD', KEYS[5], ARGV[3])
+if redis.call('HSET', KEYS[1], ARGV[1], ARGV[2]) == 0 then
+    return 0
+end
+local seq = redis.call('INCR', KEYS[2])
+redis.call('RPUSH', KEYS[3],
+    '{"type": "joined", "seq": ' .. seq .. ', "user": ' .. ARGV[2] .. '}')
+return 1
+"""
+
+# User stays online while any of their connections (tabs) is open
+DISCONNECT_SCRIPT = (
+    LEAVE_LUA
+    + """
+redis.call('ZREM', KEYS[4], ARGV[2])
+redis.call('SREM', KEYS[5], ARGV[2])
+if redis.call('SCARD', KEYS[5]) > 0 then
+    return 0
+end
+return leave(ARGV[1])
+"""
+)
+
+FORCE_OFFLINE_SCRIPT = (
+    LEAVE_LUA
+    + """
+local members = redis.call('SMEMBERS', KEYS[5])
+if #members > 0 then
+    redis.call('ZREM', KEYS[4], unpack(members))
+end
+redis.call('DEL', KEYS[5])
+return leave(ARGV[1])
+"""
+)
+
+# Expire up to ARGV[3] connections whose heartbeat deadline passed.
+# Returns {expired connections, users that went offline}.
+SWEEP_SCRIPT = (
+    LEAVE_LUA
+    + """
+local expired = redis.call(
+    'ZRANGEBYSCORE', KEYS[4], '-inf', ARGV[1], 'LIMIT', 0, ARGV[3])
+local left = 0
+for _, member in ipairs(expired) do
+    local user_id = string.match(member, '^(%d+):')
+    local user_key = ARGV[2] .. user_id
+    redis.call('ZREM', KEYS[4], member)
+    redis.call('SREM', user_key, member)
+    if redis.call('SCARD', user_key) == 0 then
+        left = left + leave(user_id)
+    end
+end
+return {#expired, left}
+"""
+)
+
+# Release the flush lock only if we still own it and report whether
+# changes arrived after the drain.
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+end
+return redis.call('LLEN', KEYS[2])
+"""
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_scripts = {}
+_flush_tasks = set()
+_sweeper_task = None
+# Long-lived event loop (and its thread) running flushes for sync callers
+_flusher_loop = None
+_flusher_thread = None
+_flusher_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide Redis client used for presence."""
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _client
+
+
+def _run_script(source, keys, args):
+    if source not in _scripts:
+        _scripts[source] = get_client().register_script(source)
+    return _scripts[source](keys=keys, args=args)
+
+
+def user_snapshot(user):
+    """Public data shown in the online users list."""
+    return {"id": user.id, "username": user.username, "role": user.role}
+
+
+def _connection_member(user_id, channel_name):
+    return f"{user_id}:{channel_name}"
+
+
+def _user_keys(user_id):
+    return [
+        ONLINE_USERS_KEY,
+        SEQUENCE_KEY,
+        PENDING_KEY,
+        CONNECTIONS_KEY,
+        f"{USER_CONNECTIONS_PREFIX}{user_id}",
+    ]
+
+
+def _expires_at():
+    return time.time() + settings.PRESENCE_TTL
+
+
+def add_connection(user, channel_name):
+    """
+    Register an open socket for user and queue a `joined` delta.
+    Returns False if the user was already online from another socket.
+    """
+    return bool(
+        _run_script(
+            CONNECT_SCRIPT,
+            keys=_user_keys(user.id),
+            args=[
+                user.id,
+                json.dumps(user_snapshot(user)),
+                _connection_member(user.id, channel_name),
+                _expires_at(),
+            ],
+        )
+    )
+
+
+def remove_connection(user_id, channel_name):
+    """
+    Unregister a closed socket; queue a `left` delta if it was the last one.
+    Returns False if the user is still online.
+    """
+    return bool(
+        _run_script(
+            DISCONNECT_SCRIPT,
+            keys=_user_keys(user_id),
+            args=[user_id, _connection_member(user_id, channel_name)],
+        )
+    )
+
+
+def refresh_connection(user, channel_name):
+    """
+    Heartbeat: push back the expiry of an open socket. A socket the sweeper
+    already expired (missed pings, stalled event loop) is registered again.
+    Returns True if that brought the user back online.
+    """
+    refreshed = get_client().zadd(
+        CONNECTIONS_KEY,
+        {_connection_member(user.id, channel_name): _expires_at()},
+        xx=True,
+        ch=True,
+    )
+    if refreshed:
+        return False
+    return add_connection(user, channel_name)
+
+
+def mark_offline(user_id):
+    """
+    Drop all of user's connections and queue a `left` delta.
+    Returns False if the user was not online.
+    """
+    return bool(
+        _run_script(FORCE_OFFLINE_SCRIPT, keys=_user_keys(user_id), args=[user_id])
+    )
+
+
+def _sorted_users(values):
+    users = [json.loads(value) for value in values]
+    users.sort(key=lambda user: user["id"])
+    return users
+
+
+def _online_users_payload(values):
+    return json.dumps({"type": "online_users", "users": _sorted_users(values)})
+
+
+def get_online_users():
+    """
+    Return online users ordered by id.
+    One round-trip, proportional to the number of online users only.
+    """
+    return _sorted_users(get_client().hvals(ONLINE_USERS_KEY))
+
+
+def online_users_message():
+    """Serialized `online_users` message with the full list."""
+    return _online_users_payload(get_client().hvals(ONLINE_USERS_KEY))
+
+
+def snapshot_message():
+    """Serialized `snapshot` message; list and sequence read atomically."""
+    pipe = get_client().pipeline(transaction=True)
+    pipe.get(SEQUENCE_KEY)
+    pipe.hvals(ONLINE_USERS_KEY)
+    seq, values = pipe.execute()
+    return json.dumps(
+        {"type": "snapshot", "seq": int(seq or 0), "users": _sorted_users(values)}
+    )
+
+
+# ==================== COALESCED BROADCASTING ====================
+def _acquire_flush_lock():
+    """
+    Try to become the flusher for the current window, across all workers.
+    Returns the lock token, or None if another flush is already scheduled.
+    """
+    token = uuid.uuid4().hex
+    ttl_ms = int(settings.PRESENCE_BROADCAST_WINDOW * 1000) + FLUSH_LOCK_GRACE_MS
+    if get_client().set(FLUSH_LOCK_KEY, token, nx=True, px=ttl_ms):
+        return token
+    return None
+
+
+def _release_flush_lock(token):
+    return _run_script(RELEASE_SCRIPT, keys=[FLUSH_LOCK_KEY, PENDING_KEY], args=[token])
+
+
+def _drain_pending():
+    """Take all queued deltas and the current full list in one round-trip."""
+    pipe = get_client().pipeline(transaction=True)
+    pipe.lrange(PENDING_KEY, 0, -1)
+    pipe.delete(PENDING_KEY)
+    pipe.hvals(ONLINE_USERS_KEY)
+    deltas, _, values = pipe.execute()
+    return deltas, _online_users_payload(values)
+
+
+async def flush(token):
+    """
+    Send everything queued during the window as one update per group.
+    Returns a new lock token if more changes arrived and another window
+    is needed, otherwise None.
+    """
+    deltas, payload = await sync_to_async(_drain_pending)()
+
+    if deltas:
+        channel_layer = get_channel_layer()
+        await channel_layer.group_send(
+            ONLINE_USERS_GROUP, {"type": "user_status_update", "payload": payload}
+        )
+        await channel_layer.group_send(
+            DELTA_GROUP, {"type": "presence_deltas", "payloads": deltas}
+        )
+
+    # Changes queued between the drain and the release need another window
+    if await sync_to_async(_release_flush_lock)(token):
+        return await sync_to_async(_acquire_flush_lock)()
+    return None
+
+
+async def _flush_windows(token):
+    while token is not None:
+        await asyncio.sleep(settings.PRESENCE_BROADCAST_WINDOW)
+        token = await flush(token)
+
+
+async def schedule_broadcast():
+    """Flush queued presence changes at the end of the current window."""
+    token = await sync_to_async(_acquire_flush_lock)()
+    if token is None:
+        return
+
+    task = asyncio.create_task(_flush_windows(token))
+    _flush_tasks.add(task)
+    task.add_done_callback(_flush_tasks.discard)
+
+
+def _get_flusher_loop():
+    """This process's flusher event loop, started on first use."""
+    global _flusher_loop, _flusher_thread
+    with _flusher_lock:
+        # Threads don't survive a fork: a worker forked after first use
+        # starts its own
+        if _flusher_thread is None or not _flusher_thread.is_alive():
+            _flusher_loop = asyncio.new_event_loop()
+            _flusher_thread = threading.Thread(
+                target=_flusher_loop.run_forever, name="presence-flusher", daemon=True
+            )
+            _flusher_thread.start()
+        return _flusher_loop
+
+
+def schedule_broadcast_sync():
+    """
+    schedule_broadcast() for sync code paths without an event loop. Only
+    the call that takes the flush lock does more than one Redis SET: it
+    hands the window to the process's flusher loop.
+    """
+    token = _acquire_flush_lock()
+    if token is None:
+        return
+
+    asyncio.run_coroutine_threadsafe(_flush_windows(token), _get_flusher_loop())
+
+
+# ==================== HEARTBEAT SWEEPER ====================
+def sweep():
+    """
+    Expire connections whose client stopped pinging (closed tab, dead
+    worker, half-open socket), in bulk.
+    Returns the number of users that went offline.
+    """
+    left = 0
+    while True:
+        expired, batch_left = _run_script(
+            SWEEP_SCRIPT,
+            keys=[ONLINE_USERS_KEY, SEQUENCE_KEY, PENDING_KEY, CONNECTIONS_KEY],
+            args=[time.time(), USER_CONNECTIONS_PREFIX, SWEEP_BATCH_SIZE],
+        )
+        left += batch_left
+        if expired < SWEEP_BATCH_SIZE:
+            return left
+
+
+async def _sweep_forever():
+    while True:
+        await asyncio.sleep(settings.PRESENCE_SWEEP_INTERVAL)
+        try:
+            # All users expired by one sweep go out as one coalesced update
+            if await sync_to_async(sweep)():
+                await schedule_broadcast()
+        except redis.RedisError:
+            logger.exception("Presence sweep failed")
+
+
+def ensure_sweeper():
+    """Start this process's sweeper task if it is not running yet."""
+    global _sweeper_task
+    if _sweeper_task is None or _sweeper_task.done():
+        _sweeper_task = asyncio.create_task(_sweep_forever())
@@ -0,0 +1,96 @@
+# accounts/renderers.py
+
+import cbor2
+import msgpack
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+# Types none of the encoders handle natively (lazy translations, dates,
+# Decimal, querysets...) become what DRF's JSONRenderer would output
+_default = JSONEncoder().default
+
+
+def _orjson_dumps(data):
+    return orjson.dumps(
+        data,
+        default=_default,
+        option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+    )
+
+
+def _ujson_dumps(data):
+    return ujson.dumps(
+        data, default=_default, ensure_ascii=False, escape_forward_slashes=False
+    ).encode()
+
+
+if orjson is not None:
+    json_backend, _dumps = "orjson", _orjson_dumps
+elif ujson is not None:
+    json_backend, _dumps = "ujson", _ujson_dumps
+else:
+    json_backend, _dumps = "json", None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer output (compact, UTF-8) encoded with orjson when it's
+    installed, else ujson. Indented output (Accept: ...; indent=4) still
+    goes through the stock encoder.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if _dumps is None or indent is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same escaping as JSONRenderer: keep the output a JavaScript subset
+        return (
+            _dumps(data)
+            .replace("\u2028".encode(), b"\\u2028")
+            .replace("\u2029".encode(), b"\\u2029")
+        )
+
+
+class MessagePackRenderer(BaseRenderer):
+    """application/msgpack, for clients that ask for it in Accept"""
+
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=_default, use_bin_type=True)
+
+
+def _cbor_default(encoder, value):
+    encoder.encode(_default(value))
+
+
+class CBORRenderer(BaseRenderer):
+    """application/cbor, for clients that ask for it in Accept"""
+
+    media_type = "application/cbor"
+    format = "cbor"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return cbor2.dumps(data, default=_cbor_default)
@@ -0,0 +1,14 @@
+# accounts/signals.py
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import user_cache
+from .models import CustomUser
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Any save (role change, deactivation, password) drops the cached user."""
+    user_cache.invalidate(instance.id)
@@ -0,0 +1,167 @@
+# accounts/tests/test_presence.py
+
+import json
+import threading
+import time
+from unittest import mock
+
+import fakeredis
+from asgiref.sync import async_to_sync
+from channels.layers import InMemoryChannelLayer
+from django.test import SimpleTestCase, override_settings
+
+from accounts import presence
+from accounts.models import CustomUser
+
+
+class PresenceTests(SimpleTestCase):
+    """Presence state and delta sequencing, against an in-memory Redis"""
+
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis(decode_responses=True)
+        for patcher in (
+            mock.patch.object(presence, "_client", self.redis),
+            # Registered scripts are bound to the client
+            mock.patch.dict(presence._scripts, clear=True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.alice = CustomUser(id=1, username="alice", role="user")
+        self.bob = CustomUser(id=2, username="bob", role="admin")
+
+    def pending(self):
+        """Queued deltas as (type, seq, user id)"""
+        return [
+            (delta["type"], delta["seq"], delta["user"]["id"])
+            for delta in map(json.loads, self.redis.lrange(presence.PENDING_KEY, 0, -1))
+        ]
+
+    def online_ids(self):
+        return [user["id"] for user in presence.get_online_users()]
+
+    def expired(self):
+        """Connections registered inside this block have already expired"""
+        return override_settings(PRESENCE_TTL=-1)
+
+    def test_deltas_are_queued_in_sequence(self):
+        self.assertTrue(presence.add_connection(self.alice, "tab-1"))
+        self.assertFalse(presence.add_connection(self.alice, "tab-2"))
+        self.assertTrue(presence.add_connection(self.bob, "tab-1"))
+        self.assertFalse(presence.remove_connection(self.alice.id, "tab-1"))
+        self.assertTrue(presence.remove_connection(self.alice.id, "tab-2"))
+
+        self.assertEqual(
+            self.pending(), [("joined", 1, 1), ("joined", 2, 2), ("left", 3, 1)]
+        )
+        snapshot = json.loads(presence.snapshot_message())
+        self.assertEqual(snapshot["seq"], 3)
+        self.assertEqual(snapshot["users"], [presence.user_snapshot(self.bob)])
+
+    def test_mark_offline_drops_every_connection(self):
+        presence.add_connection(self.alice, "tab-1")
+        presence.add_connection(self.alice, "tab-2")
+
+        self.assertTrue(presence.mark_offline(self.alice.id))
+        self.assertFalse(presence.mark_offline(self.alice.id))
+        self.assertEqual(self.online_ids(), [])
+        self.assertEqual(self.redis.zcard(presence.CONNECTIONS_KEY), 0)
+        self.assertEqual(self.pending(), [("joined", 1, 1), ("left", 2, 1)])
+
+    def test_sweep_expires_sockets_that_stopped_pinging(self):
+        with self.expired():
+            presence.add_connection(self.alice, "tab-1")
+        presence.add_connection(self.bob, "tab-1")
+
+        self.assertEqual(presence.sweep(), 1)
+        self.assertEqual(self.online_ids(), [self.bob.id])
+        self.assertEqual(self.pending()[-1], ("left", 3, 1))
+
+    def test_sweep_keeps_users_with_a_live_socket(self):
+        with self.expired():
+            presence.add_connection(self.alice, "tab-1")
+        presence.add_connection(self.alice, "tab-2")
+
+        self.assertEqual(presence.sweep(), 0)
+        self.assertEqual(self.online_ids(), [self.alice.id])
+        self.assertEqual(self.pending(), [("joined", 1, 1)])
+
+    def test_ping_pushes_back_expiry(self):
+        with self.expired():
+            presence.add_connection(self.alice, "tab-1")
+
+        self.assertFalse(presence.refresh_connection(self.alice, "tab-1"))
+        self.assertEqual(presence.sweep(), 0)
+        self.assertEqual(self.online_ids(), [self.alice.id])
+
+    def test_ping_after_expiry_registers_socket_again(self):
+        with self.expired():
+            presence.add_connection(self.alice, "tab-1")
+        presence.sweep()
+        self.assertEqual(self.online_ids(), [])
+
+        self.assertTrue(presence.refresh_connection(self.alice, "tab-1"))
+        self.assertEqual(self.online_ids(), [self.alice.id])
+        self.assertEqual(
+            self.pending(), [("joined", 1, 1), ("left", 2, 1), ("joined", 3, 1)]
+        )
+        # Registered like any open socket: closing it takes the user offline
+        self.assertTrue(presence.remove_connection(self.alice.id, "tab-1"))
+
+    def test_flush_sends_one_update_per_group(self):
+        layer = InMemoryChannelLayer()
+        legacy = async_to_sync(layer.new_channel)()
+        delta = async_to_sync(layer.new_channel)()
+        async_to_sync(layer.group_add)(presence.ONLINE_USERS_GROUP, legacy)
+        async_to_sync(layer.group_add)(presence.DELTA_GROUP, delta)
+        presence.add_connection(self.alice, "tab-1")
+        presence.add_connection(self.bob, "tab-1")
+
+        token = presence._acquire_flush_lock()
+        self.assertIsNotNone(token)
+        # Everyone else's changes wait for the flush already scheduled
+        self.assertIsNone(presence._acquire_flush_lock())
+        with mock.patch.object(presence, "get_channel_layer", return_value=layer):
+            self.assertIsNone(async_to_sync(presence.flush)(token))
+
+        message = async_to_sync(layer.receive)(legacy)
+        self.assertEqual(
+            json.loads(message["payload"])["users"],
+            [presence.user_snapshot(self.alice), presence.user_snapshot(self.bob)],
+        )
+        message = async_to_sync(layer.receive)(delta)
+        self.assertEqual(
+            [json.loads(payload)["seq"] for payload in message["payloads"]], [1, 2]
+        )
+        self.assertEqual(self.pending(), [])
+        self.assertIsNotNone(presence._acquire_flush_lock())
+
+    @override_settings(PRESENCE_BROADCAST_WINDOW=0.05)
+    def test_sync_callers_share_one_flusher_loop(self):
+        layer = InMemoryChannelLayer()
+        delta = async_to_sync(layer.new_channel)()
+        async_to_sync(layer.group_add)(presence.DELTA_GROUP, delta)
+
+        def receive():
+            # The flusher loop sends before releasing the lock; receiving
+            # only then keeps this loop from waiting on the other one
+            deadline = time.monotonic() + 5
+            while self.redis.exists(presence.FLUSH_LOCK_KEY):
+                self.assertLess(time.monotonic(), deadline, "no flush")
+                time.sleep(0.01)
+            message = async_to_sync(layer.receive)(delta)
+            return [json.loads(payload)["seq"] for payload in message["payloads"]]
+
+        with mock.patch.object(presence, "get_channel_layer", return_value=layer):
+            presence.add_connection(self.alice, "tab-1")
+            presence.schedule_broadcast_sync()
+            # Coalesced into the window already scheduled
+            presence.add_connection(self.bob, "tab-1")
+            presence.schedule_broadcast_sync()
+            self.assertEqual(receive(), [1, 2])
+
+            presence.remove_connection(self.alice.id, "tab-1")
+            presence.schedule_broadcast_sync()
+            self.assertEqual(receive(), [3])
+
+        flushers = [t for t in threading.enumerate() if t.name == "presence-flusher"]
+        self.assertEqual(flushers, [presence._flusher_thread])
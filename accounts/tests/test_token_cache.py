@@ -0,0 +1,101 @@
+# accounts/tests/test_token_cache.py
+
+from unittest import mock
+
+import fakeredis
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts import presence, token_cache
+from accounts.lru import LRUCache
+from accounts.models import CustomUser
+
+
+class TokenCacheTests(TestCase):
+    """Validated access tokens: cached per process, revocable everywhere"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username="token-user", password="unused-password"
+        )
+
+    def setUp(self):
+        cache.clear()
+        for patcher in (
+            mock.patch.object(token_cache, "_local", LRUCache(16)),
+            mock.patch.object(token_cache, "_revoked_local", LRUCache(16)),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.raw = str(AccessToken.for_user(self.user))
+        self.validate = mock.Mock(side_effect=AccessToken)
+
+    def get(self, raw=None):
+        return token_cache.get_validated_token(raw or self.raw, self.validate)
+
+    def other_process(self):
+        """Forget this process's cache, as a fresh worker would"""
+        token_cache._local = LRUCache(16)
+        token_cache._revoked_local = LRUCache(16)
+
+    def test_validated_once(self):
+        first = self.get()
+        self.assertIs(self.get(), first)
+        self.assertEqual(self.validate.call_count, 1)
+
+    def test_bad_tokens_are_not_cached(self):
+        for _ in range(2):
+            with self.assertRaises(Exception):
+                self.get("not-a-token")
+        self.assertEqual(self.validate.call_count, 2)
+
+    def test_revoked_in_this_process(self):
+        token_cache.revoke(self.get())
+        with self.assertRaisesMessage(InvalidToken, "Token has been revoked"):
+            self.get()
+
+    def test_revoked_in_another_process(self):
+        token_cache.revoke(self.get())
+        self.other_process()
+        with self.assertRaisesMessage(InvalidToken, "Token has been revoked"):
+            self.get()
+        with self.assertRaisesMessage(InvalidToken, "Token has been revoked"):
+            async_to_sync(token_cache.aget_validated_token)(self.raw, self.validate)
+
+    def test_cached_validation_expires_after_ttl(self):
+        # A revocation recorded by another process only (shared cache)
+        with override_settings(TOKEN_CACHE_TTL=0):
+            token = self.get()
+        cache.set(token_cache._revoked_key(token["jti"]), True)
+        with self.assertRaisesMessage(InvalidToken, "Token has been revoked"):
+            self.get()
+
+    def test_other_tokens_stay_valid(self):
+        token_cache.revoke(self.get())
+        other = str(AccessToken.for_user(self.user))
+        self.assertEqual(self.get(other)["user_id"], str(self.user.id))
+
+    def test_logout_revokes_the_access_token(self):
+        for patcher in (
+            mock.patch.object(presence, "_client", fakeredis.FakeRedis()),
+            mock.patch.object(presence, "schedule_broadcast_sync"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        client = Client()
+        client.cookies[settings.SIMPLE_JWT["AUTH_COOKIE"]] = self.raw
+        self.assertEqual(client.get(reverse("accounts:user")).status_code, 200)
+
+        self.assertEqual(client.post(reverse("accounts:logout")).status_code, 200)
+        # The logout response deletes the cookie; a copy of the token is
+        # rejected all the same
+        client.cookies[settings.SIMPLE_JWT["AUTH_COOKIE"]] = self.raw
+        self.assertEqual(client.get(reverse("accounts:user")).status_code, 401)
+        self.other_process()
+        self.assertEqual(client.get(reverse("accounts:user")).status_code, 401)
@@ -0,0 +1,118 @@
+# accounts/token_cache.py
+
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .lru import LRUCache
+
+_local = LRUCache(settings.TOKEN_CACHE_SIZE)
+_revoked_local = LRUCache(settings.TOKEN_CACHE_SIZE)
+_lock = threading.Lock()
+_counters = {"hits": 0, "misses": 0}
+
+
+def _token_key(raw_token):
+    if isinstance(raw_token, str):
+        raw_token = raw_token.encode()
+    return hashlib.sha256(raw_token).hexdigest()
+
+
+def _revoked_key(jti):
+    return f"revoked_token_{jti}"
+
+
+def _count(name):
+    with _lock:
+        _counters[name] += 1
+
+
+def get_validated_token(raw_token, validate=AccessToken):
+    """
+    Return the validated token for raw_token, verifying signature and
+    claims only on a cache miss. Raises InvalidToken (or whatever
+    `validate` raises) for bad or revoked tokens.
+
+    Entries live until the token's `exp`, but at most TOKEN_CACHE_TTL
+    seconds, so a logout in another process is honoured within that time.
+    """
+    key = _token_key(raw_token)
+    token = _local_token(key)
+    if token is not None:
+        return token
+
+    _count("misses")
+    token = validate(raw_token)
+
+    jti = token.get(api_settings.JTI_CLAIM)
+    if jti and cache.get(_revoked_key(jti)):
+        raise InvalidToken("Token has been revoked")
+
+    _remember(key, token)
+    return token
+
+
+async def aget_validated_token(raw_token, validate=AccessToken):
+    """get_validated_token() for async code: the shared cache is awaited"""
+    key = _token_key(raw_token)
+    token = _local_token(key)
+    if token is not None:
+        return token
+
+    _count("misses")
+    token = validate(raw_token)
+
+    jti = token.get(api_settings.JTI_CLAIM)
+    if jti and await cache.aget(_revoked_key(jti)):
+        raise InvalidToken("Token has been revoked")
+
+    _remember(key, token)
+    return token
+
+
+def _local_token(key):
+    """Token from the in-process cache, or None; raises if revoked since"""
+    token = _local.get(key)
+    if token is None:
+        return None
+    if _revoked_local.get(token.get(api_settings.JTI_CLAIM)):
+        _local.pop(key)
+        raise InvalidToken("Token has been revoked")
+    _count("hits")
+    return token
+
+
+def _remember(key, token):
+    expires_at = min(token["exp"], time.time() + settings.TOKEN_CACHE_TTL)
+    _local.set(key, token, expires_at)
+
+
+def revoke(token):
+    """
+    Reject this validated access token from now on (logout).
+    Recorded in the shared cache until the token would expire anyway.
+    """
+    jti = token.get(api_settings.JTI_CLAIM)
+    if not jti:
+        return
+
+    _revoked_local.set(jti, True, token["exp"])
+    remaining = int(token["exp"] - time.time())
+    if remaining > 0:
+        cache.set(_revoked_key(jti), True, timeout=remaining)
+
+
+def stats():
+    """Hit/miss counters of this process."""
+    with _lock:
+        counters = dict(_counters)
+    counters["local_size"] = len(_local)
+    lookups = counters["hits"] + counters["misses"]
+    counters["hit_rate"] = round(counters["hits"] / lookups, 4) if lookups else None
+    return counters
@@ -7,6 +7,7 @@ from .views import (
     list_users_view,
     login_view,
     logout_view,
+    metrics_view,
     refresh_view,
     register_view,
     user_view,
@@ -25,4 +26,5 @@ urlpatterns = [
     # Admin endpoints
     path("users/", list_users_view, name="list_users"),
     path("users/<int:user_id>/", delete_user_view, name="delete_user"),
+    path("metrics/", metrics_view, name="metrics"),
 ]
@@ -0,0 +1,121 @@
+# accounts/user_cache.py
+
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from config.replicas import use_primary
+
+from .lru import LRUCache
+from .models import CustomUser
+
+_local = LRUCache(settings.USER_CACHE_SIZE)
+_lock = threading.Lock()
+_counters = {"local_hits": 0, "shared_hits": 0, "misses": 0}
+
+# What authentication and permissions read. Nothing else is cached: the
+# shared cache is readable by other services and must not hold password
+# hashes or profile data.
+USER_FIELDS = ("id", "username", "role", "is_active", "is_staff", "is_superuser")
+
+# from_db() takes the values in the model's field order
+_FIELD_ORDER = [
+    field.attname
+    for field in CustomUser._meta.concrete_fields
+    if field.attname in USER_FIELDS
+]
+
+
+def _cache_key(user_id):
+    return f"auth_user_fields_{user_id}"
+
+
+def _count(name):
+    with _lock:
+        _counters[name] += 1
+
+
+def _fields(user_id):
+    """USER_FIELDS of the user; cached for minutes, so read past replication lag"""
+    with use_primary():
+        return CustomUser.objects.values(*USER_FIELDS).get(id=user_id)
+
+
+def _user(fields):
+    """
+    A new user instance for every caller, so cached data is never
+    mutated. Fields that aren't cached are deferred: reading one loads it
+    from the database, and save() only writes the cached ones.
+    """
+    values = [fields[name] for name in _FIELD_ORDER]
+    return CustomUser.from_db(DEFAULT_DB_ALIAS, _FIELD_ORDER, values)
+
+
+def get_user(user_id):
+    """
+    Return the user with this id: in-process LRU first, then the shared
+    cache, then the database. Raises CustomUser.DoesNotExist.
+    Only USER_FIELDS are loaded (see _user()).
+    """
+    # Token claims carry the id as a string, signals as an int
+    user_id = str(user_id)
+    fields = _local.get(user_id)
+    if fields is not None:
+        _count("local_hits")
+        return _user(fields)
+
+    fields = cache.get(_cache_key(user_id))
+    if fields is not None:
+        _count("shared_hits")
+    else:
+        _count("misses")
+        fields = _fields(user_id)
+        cache.set(_cache_key(user_id), fields, timeout=settings.USER_CACHE_TTL)
+
+    _local.set(user_id, fields, time.time() + settings.USER_CACHE_LOCAL_TTL)
+    return _user(fields)
+
+
+async def aget_user(user_id):
+    """get_user() for async code: the shared cache and the database are awaited"""
+    user_id = str(user_id)
+    fields = _local.get(user_id)
+    if fields is not None:
+        _count("local_hits")
+        return _user(fields)
+
+    fields = await cache.aget(_cache_key(user_id))
+    if fields is not None:
+        _count("shared_hits")
+    else:
+        _count("misses")
+        with use_primary():
+            fields = await CustomUser.objects.values(*USER_FIELDS).aget(id=user_id)
+        await cache.aset(_cache_key(user_id), fields, timeout=settings.USER_CACHE_TTL)
+
+    _local.set(user_id, fields, time.time() + settings.USER_CACHE_LOCAL_TTL)
+    return _user(fields)
+
+
+def invalidate(user_id):
+    """
+    Drop a user from both cache levels.
+    Other processes keep their local copy for at most USER_CACHE_LOCAL_TTL.
+    """
+    user_id = str(user_id)
+    _local.pop(user_id)
+    cache.delete(_cache_key(user_id))
+
+
+def stats():
+    """Hit/miss counters of this process."""
+    with _lock:
+        counters = dict(_counters)
+    counters["local_size"] = len(_local)
+    lookups = counters["local_hits"] + counters["shared_hits"] + counters["misses"]
+    hits = counters["local_hits"] + counters["shared_hits"]
+    counters["hit_rate"] = round(hits / lookups, 4) if lookups else None
+    return counters
@@ -8,10 +8,13 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.tokens import RefreshToken
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
 
+from config import pool
+from snippets import response_cache
+
+from . import presence, token_cache, user_cache
 from .models import CustomUser
+from .pagination import UserPagination
 from .permissions import IsAdmin
 from .serializers import (
     LoginSerializer,
@@ -22,15 +25,8 @@ from .serializers import (
 
 
 def broadcast_online_users():
-    """Broadcast online users list to all WebSocket connections"""
-    channel_layer = get_channel_layer()
-    async_to_sync(channel_layer.group_send)(
-        "online_users",
-        {
-            "type": "user_status_update",
-            "users": [],
-        },
-    )
+    """Broadcast online users list to all WebSocket connections (coalesced)"""
+    presence.schedule_broadcast_sync()
 
 
 def set_auth_cookies(response, access_token, refresh_token):
@@ -168,10 +164,12 @@ def logout_view(request):
         # Token is already invalid or blacklisted
         pass
 
-    # Clear user from cache BEFORE creating response
-    from django.core.cache import cache
+    # Reject the access token as well, including cached validations
+    if request.auth is not None:
+        token_cache.revoke(request.auth)
 
-    cache.delete(f"user_online_{request.user.id}")
+    # Clear user from presence BEFORE creating response
+    changed = presence.mark_offline(request.user.id)
 
     # Create response
     response = Response({"detail": "Logout successful"}, status=status.HTTP_200_OK)
@@ -180,7 +178,8 @@ def logout_view(request):
     delete_auth_cookies(response)
 
     # Broadcast to WebSocket that user list changed
-    broadcast_online_users()
+    if changed:
+        broadcast_online_users()
 
     return response
 
@@ -244,7 +243,9 @@ def user_view(request):
 
     GET /api/auth/user/
     """
-    serializer = UserSerializer(request.user)
+    # request.user only has the cached auth fields
+    user = CustomUser.objects.get(id=request.user.id)
+    serializer = UserSerializer(user)
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -252,13 +253,14 @@ def user_view(request):
 @permission_classes([IsAuthenticated, IsAdmin])
 def list_users_view(request):
     """
-    List all users (admin only).
+    List all users (admin only), newest first, cursor paginated.
 
-    GET /api/auth/users/
+    GET /api/auth/users/?cursor=...&page_size=...
     """
-    users = CustomUser.objects.all().order_by("-date_joined")
+    paginator = UserPagination()
+    users = paginator.paginate_queryset(CustomUser.objects.all(), request)
     serializer = UserListSerializer(users, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    return paginator.get_paginated_response(serializer.data)
 
 
 @api_view(["DELETE"])
@@ -289,17 +291,36 @@ def delete_user_view(request, user_id):
 
     username = user.username
 
-    # Clear user from cache
-    from django.core.cache import cache
-
-    cache.delete(f"user_online_{user.id}")
+    # Clear user from presence
+    changed = presence.mark_offline(user.id)
 
     user.delete()
 
     # Broadcast to WebSocket
-    broadcast_online_users()
+    if changed:
+        broadcast_online_users()
 
     return Response(
         {"detail": f"User '{username}' deleted successfully"},
         status=status.HTTP_200_OK,
     )
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated, IsAdmin])
+def metrics_view(request):
+    """
+    Cache and database connection pool counters of the process that
+    served the request (admin only).
+
+    GET /api/auth/metrics/
+    """
+    return Response(
+        {
+            "user_cache": user_cache.stats(),
+            "token_cache": token_cache.stats(),
+            "response_cache": response_cache.stats(),
+            "db_pool": pool.stats(),
+        },
+        status=status.HTTP_200_OK,
+    )
@@ -10,9 +10,13 @@ from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
 from accounts.routing import websocket_urlpatterns
 from accounts.middleware import JWTAuthMiddleware
+from snippets import code_search
 
 django_asgi_app = get_asgi_application()
 
+# Load the SQLite code search index in the background, not in a request
+code_search.preload()
+
 application = ProtocolTypeRouter(
     {
         "http": django_asgi_app,
@@ -0,0 +1,43 @@
+# config/pool.py
+
+from django.db import connections
+
+
+def pool_of(alias):
+    """psycopg pool of the database, or None if it isn't pooled"""
+    return getattr(connections[alias], "pool", None)
+
+
+def stats():
+    """
+    Connection pool counters per pooled database, since the process
+    started: connections in use and waiting requests now, totals after
+    """
+    result = {}
+    for alias in connections:
+        pool = pool_of(alias)
+        if pool is None:
+            continue
+        counters = pool.get_stats()
+        requests = counters.get("requests_num", 0)
+        wait_ms = counters.get("requests_wait_ms", 0)
+        queued = counters.get("requests_queued", 0)
+        result[alias] = {
+            # Includes connections the pool is still opening
+            "checked_out": counters["pool_size"] - counters["pool_available"],
+            "available": counters["pool_available"],
+            "size": counters["pool_size"],
+            "min_size": counters["pool_min"],
+            "max_size": counters["pool_max"],
+            "waiting": counters.get("requests_waiting", 0),
+            "requests": requests,
+            # Requests that found no free connection and waited for one
+            "queued": queued,
+            "wait_ms": wait_ms,
+            "avg_wait_ms": round(wait_ms / queued, 2) if queued else 0.0,
+            "timeouts": counters.get("requests_errors", 0),
+            "connections_opened": counters.get("connections_num", 0),
+            "connections_lost": counters.get("connections_lost", 0),
+            "returned_broken": counters.get("returns_bad", 0),
+        }
+    return result
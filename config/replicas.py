@@ -0,0 +1,216 @@
+# config/replicas.py
+
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager, suppress
+
+from asgiref.local import Local
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import SynchronousOnlyOperation
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# Set on clients that wrote: they read from the primary while it lasts
+PIN_COOKIE = "db_primary"
+
+# Seconds a streaming replica is behind (0 when it has replayed everything)
+POSTGRES_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+_local = Local()
+_lock = threading.Lock()
+# alias -> (healthy, time.monotonic() of the last check)
+_health = {}
+
+
+class ReadState:
+    """Where the reads of the current request go"""
+
+    def __init__(self, replica_allowed):
+        self.replica_allowed = replica_allowed
+        self.alias = None
+        self.wrote = False
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith("replica_")]
+
+
+def _current_state():
+    return getattr(_local, "state", None)
+
+
+@contextmanager
+def use_primary():
+    """
+    Read from the primary inside the block, e.g. for data that gets
+    cached: a lagging replica would keep serving it after the next write
+    """
+    state = _current_state()
+    if state is None:
+        yield
+        return
+    allowed, state.replica_allowed = state.replica_allowed, False
+    try:
+        yield
+    finally:
+        state.replica_allowed = allowed and not state.wrote
+
+
+# ==================== HEALTH ====================
+def replication_lag(alias):
+    """Seconds the replica is behind the primary; raises DatabaseError"""
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        if connection.vendor != "postgresql":
+            cursor.execute("SELECT 1")
+            return 0
+        cursor.execute(POSTGRES_LAG_SQL)
+        return float(cursor.fetchone()[0] or 0)
+
+
+def _check(alias):
+    try:
+        lag = replication_lag(alias)
+    except DatabaseError:
+        logger.warning("Replica %s is unreachable, left out", alias, exc_info=True)
+        with suppress(DatabaseError):
+            connections[alias].close()
+        return False
+    if lag > settings.REPLICA_MAX_LAG:
+        logger.warning("Replica %s is %.1fs behind, left out", alias, lag)
+        return False
+    return True
+
+
+def is_healthy(alias):
+    """
+    Last health check of the replica, redone at most every
+    REPLICA_CHECK_INTERVAL seconds per process
+    """
+    now = time.monotonic()
+    with _lock:
+        healthy, checked_at = _health.get(alias, (True, None))
+        due = checked_at is None or now - checked_at >= settings.REPLICA_CHECK_INTERVAL
+        if due:
+            # Other threads go on with the last result during the check
+            _health[alias] = (healthy, now)
+    if not due:
+        return healthy
+
+    try:
+        healthy = _check(alias)
+    except SynchronousOnlyOperation:
+        # Routed from the event loop: check from the next sync caller
+        _health[alias] = (healthy, None)
+        return healthy
+    _health[alias] = (healthy, time.monotonic())
+    return healthy
+
+
+# ==================== ROUTING ====================
+class ReplicaRouter:
+    """
+    Reads of requests let through by ReplicaMiddleware go to a healthy
+    replica, the same one for the whole request. Everything else uses
+    the primary: writes, reads after a write or inside a transaction,
+    and code running outside requests (commands, consumers).
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _current_state()
+        if state is None or not state.replica_allowed:
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        if state.alias is None:
+            healthy = [alias for alias in replica_aliases() if is_healthy(alias)]
+            state.alias = random.choice(healthy) if healthy else DEFAULT_DB_ALIAS
+        return state.alias
+
+    def db_for_write(self, model, **hints):
+        state = _current_state()
+        if state is not None:
+            # Read your own writes, for the rest of the request and after
+            state.replica_allowed = False
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication
+        if db in replica_aliases():
+            return False
+        return None
+
+
+class ReplicaMiddleware:
+    """
+    Lets safe-method requests read from a replica (ReplicaRouter), unless
+    the client is pinned to the primary: responses to requests that
+    write pin it for REPLICA_PIN_SECONDS with a cookie.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _local.state = None
+        return self.finish(request, state, response)
+
+    async def __acall__(self, request):
+        state = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _local.state = None
+        return self.finish(request, state, response)
+
+    def start(self, request):
+        replicas = bool(replica_aliases())
+        state = ReadState(
+            replicas
+            and request.method in SAFE_METHODS
+            and PIN_COOKIE not in request.COOKIES
+        )
+        _local.state = state
+        return state
+
+    def finish(self, request, state, response):
+        # Unsafe methods may also write around the ORM (raw SQL)
+        wrote = state.wrote or request.method not in SAFE_METHODS
+        if wrote and replica_aliases():
+            response.set_cookie(
+                PIN_COOKIE,
+                "1",
+                max_age=settings.REPLICA_PIN_SECONDS,
+                secure=request.is_secure(),
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
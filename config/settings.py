@@ -50,6 +50,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "config.replicas.ReplicaMiddleware",
 ]
 
 ROOT_URLCONF = "config.urls"
@@ -75,11 +76,53 @@ ASGI_APPLICATION = "config.asgi.application"
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# Size of daphne's thread pool (it reads the same env var), which runs
+# sync code outside requests: consumers' database_sync_to_async calls.
+# Same default as Python's thread pool executor.
+ASGI_THREADS = int(os.environ.get("ASGI_THREADS", min(32, (os.cpu_count() or 1) + 4)))
+
+# PostgreSQL connections come from a psycopg pool per process: requests
+# borrow one for their queries and give it back when they end, waiting up
+# to DB_POOL_TIMEOUT seconds when all are busy, so the connection count
+# stays at DB_POOL_MAX_SIZE however many requests run at once.
+# DB_POOL=false goes back to one persistent connection per thread.
+DB_POOL = os.environ.get("DB_POOL", "true").lower() == "true"
+
+DB_POOL_MAX_SIZE = int(os.environ.get("DB_POOL_MAX_SIZE", ASGI_THREADS))
+
+DB_POOL_MIN_SIZE = int(
+    os.environ.get("DB_POOL_MIN_SIZE", max(2, DB_POOL_MAX_SIZE // 4))
+)
+
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "10"))
+
+# Pooled connections are checked when borrowed (CONN_HEALTH_CHECKS) and
+# replaced after DB_POOL_MAX_LIFETIME / DB_POOL_MAX_IDLE seconds
+DB_POOL_OPTIONS = {
+    "min_size": min(DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE),
+    "max_size": DB_POOL_MAX_SIZE,
+    "timeout": DB_POOL_TIMEOUT,
+    "max_lifetime": float(os.environ.get("DB_POOL_MAX_LIFETIME", "3600")),
+    "max_idle": float(os.environ.get("DB_POOL_MAX_IDLE", "600")),
+}
+
+
+def _postgres_database(config):
+    """dj_database_url config of a PostgreSQL database, pooled if DB_POOL"""
+    if DB_POOL:
+        config["CONN_MAX_AGE"] = 0
+        config["CONN_HEALTH_CHECKS"] = True
+        config.setdefault("OPTIONS", {})["pool"] = dict(DB_POOL_OPTIONS)
+    return config
+
+
 if DATABASE_URL and DATABASE_URL.startswith("postgresql"):
     import dj_database_url
 
     DATABASES = {
-        "default": dj_database_url.config(default=DATABASE_URL, conn_max_age=60)
+        "default": _postgres_database(
+            dj_database_url.config(default=DATABASE_URL, conn_max_age=60)
+        )
     }
 else:
     DATABASES = {
@@ -89,6 +132,33 @@ else:
         }
     }
 
+# Read replicas: each DATABASE_URL_REPLICA_<NAME> env var adds a
+# "replica_<name>" database that safe-method requests read from
+# (config.replicas). Locally, a copy of the SQLite file works:
+# DATABASE_URL_REPLICA_LOCAL=sqlite:////path/to/replica.sqlite3
+for _name, _url in sorted(os.environ.items()):
+    if _name.startswith("DATABASE_URL_REPLICA_") and _url:
+        import dj_database_url
+
+        _alias = "replica_" + _name.removeprefix("DATABASE_URL_REPLICA_").lower()
+        DATABASES[_alias] = dj_database_url.parse(_url, conn_max_age=60)
+        if _url.startswith("postgresql"):
+            _postgres_database(DATABASES[_alias])
+        # Tests read the primary's test database through the replicas
+        DATABASES[_alias]["TEST"] = {"MIRROR": "default"}
+
+DATABASE_ROUTERS = ["config.replicas.ReplicaRouter"]
+
+# Clients that write read from the primary for this many seconds after
+# (should exceed the usual replication lag)
+REPLICA_PIN_SECONDS = int(os.environ.get("REPLICA_PIN_SECONDS", "10"))
+
+# Replicas are checked at most every REPLICA_CHECK_INTERVAL seconds and
+# left out while unreachable or more than REPLICA_MAX_LAG seconds behind
+REPLICA_CHECK_INTERVAL = float(os.environ.get("REPLICA_CHECK_INTERVAL", "5"))
+
+REPLICA_MAX_LAG = float(os.environ.get("REPLICA_MAX_LAG", "10"))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -143,9 +213,19 @@ REST_FRAMEWORK = {
         "accounts.authentication.CookieJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
-    "DEFAULT_RENDERER_CLASSES": ("rest_framework.renderers.JSONRenderer",),
+    # JSON by default; MessagePack and CBOR when the Accept header asks
+    "DEFAULT_RENDERER_CLASSES": (
+        "accounts.renderers.FastJSONRenderer",
+        "accounts.renderers.MessagePackRenderer",
+        "accounts.renderers.CBORRenderer",
+    ),
+    "DEFAULT_PAGINATION_CLASS": "accounts.pagination.KeysetPagination",
+    "PAGE_SIZE": int(os.environ.get("PAGE_SIZE", "100")),
 }
 
+# Upper bound for the ?page_size= query parameter of list endpoints
+MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE", "500"))
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=15),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
@@ -199,11 +279,71 @@ if ENVIRONMENT == "production":
         "https://tsapp.duckdns.org",
     ]
 
+REDIS_URL = os.environ.get("REDIS_URL", "redis://127.0.0.1:6379/0")
+
+# Presence changes inside this window (seconds) go out as one broadcast
+PRESENCE_BROADCAST_WINDOW = float(os.environ.get("PRESENCE_BROADCAST_WINDOW", "0.25"))
+
+# Sockets that don't ping for PRESENCE_TTL seconds are expired by a
+# sweeper running every PRESENCE_SWEEP_INTERVAL seconds (the frontend
+# pings every 20 seconds)
+PRESENCE_TTL = int(os.environ.get("PRESENCE_TTL", "60"))
+
+PRESENCE_SWEEP_INTERVAL = int(os.environ.get("PRESENCE_SWEEP_INTERVAL", "15"))
+
 CHANNEL_LAYERS = {
     "default": {
         "BACKEND": "channels_redis.core.RedisChannelLayer",
         "CONFIG": {
-            "hosts": [("127.0.0.1", 6379)],
+            "hosts": [REDIS_URL],
         },
     },
 }
+
+# "redis" shares cached data between workers, "locmem" keeps it per process
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "redis")
+
+if CACHE_BACKEND == "locmem":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        },
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        },
+    }
+
+# Authenticated user lookups: shared cache TTL, in-process LRU TTL and size
+USER_CACHE_TTL = int(os.environ.get("USER_CACHE_TTL", "300"))
+
+USER_CACHE_LOCAL_TTL = int(os.environ.get("USER_CACHE_LOCAL_TTL", "5"))
+
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", "1024"))
+
+# Validated JWTs: in-process LRU size and max seconds before revalidation
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", "4096"))
+
+TOKEN_CACHE_TTL = int(os.environ.get("TOKEN_CACHE_TTL", "30"))
+
+# Snippet code trigram index saved by `manage.py rebuild_code_index` (SQLite)
+CODE_SEARCH_INDEX_PATH = os.environ.get(
+    "CODE_SEARCH_INDEX_PATH", str(BASE_DIR / "code_search.idx")
+)
+
+# Max items per request on the bulk create/update/delete endpoints
+BULK_MAX_ITEMS = int(os.environ.get("BULK_MAX_ITEMS", "1000"))
+
+# Render syntax-highlighted HTML of snippets when they are saved
+SNIPPET_HIGHLIGHT = os.environ.get("SNIPPET_HIGHLIGHT", "true").lower() == "true"
+
+# Build the snippet list and section detail responses straight from
+# values() rows instead of through the serializers (snippets.rows)
+FAST_READ_PATH = os.environ.get("FAST_READ_PATH", "true").lower() == "true"
+
+# Serve the book/chapter/section/snippet read endpoints with the native
+# async views (snippets.async_views) instead of the DRF ones
+ASYNC_READ_VIEWS = os.environ.get("ASYNC_READ_VIEWS", "false").lower() == "true"
@@ -7,3 +7,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
 application = get_wsgi_application()
+
+# Load the SQLite code search index in the background, not in a request
+from snippets import code_search  # noqa: E402
+
+code_search.preload()
@@ -5,6 +5,10 @@ import { authAPI } from '../utils/api';
 
 const AuthContext = createContext(null);
 
+// Presence heartbeat: the server drops sockets that don't ping within
+// PRESENCE_TTL (60s by default)
+const PING_INTERVAL = 20000;
+
 export function AuthProvider({ children }) {
   const [user, setUser] = useState(null);
   const [loading, setLoading] = useState(true);
@@ -111,6 +115,12 @@ export function AuthProvider({ children }) {
         clearTimeout(reconnectTimeoutRef.current);
         reconnectTimeoutRef.current = null;
       }
+
+      // Keep this socket's presence alive until it closes
+      const pingInterval = setInterval(() => {
+        ws.send(JSON.stringify({ type: 'ping' }));
+      }, PING_INTERVAL);
+      ws.addEventListener('close', () => clearInterval(pingInterval));
     };
 
     ws.onmessage = (event) => {
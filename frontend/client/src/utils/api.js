@@ -75,6 +75,28 @@ async function fetchAPI(endpoint, options = {}) {
   }
 }
 
+/**
+ * Fetch every page of a cursor-paginated list endpoint
+ */
+async function fetchAllPages(endpoint) {
+  const results = [];
+  let next = endpoint;
+
+  while (next) {
+    const data = await fetchAPI(next);
+    results.push(...data.results);
+
+    if (data.next) {
+      const url = new URL(data.next);
+      next = url.pathname.slice(API_BASE_URL.length) + url.search;
+    } else {
+      next = null;
+    }
+  }
+
+  return results;
+}
+
 // ==================== AUTH API ====================
 export const authAPI = {
   register: (userData) =>
@@ -101,7 +123,7 @@ export const authAPI = {
       method: 'POST',
     }),
 
-  listUsers: () => fetchAPI('/auth/users/'),
+  listUsers: () => fetchAllPages('/auth/users/'),
 
   deleteUser: (userId) =>
     fetchAPI(`/auth/users/${userId}/`, {
@@ -112,7 +134,7 @@ export const authAPI = {
 // ==================== SNIPPETS API ====================
 export const snippetsAPI = {
   // Books
-  getBooks: () => fetchAPI('/snippets/books/'),
+  getBooks: () => fetchAllPages('/snippets/books/'),
   getBook: (id) => fetchAPI(`/snippets/books/${id}/`),
   createBook: (data) =>
     fetchAPI('/snippets/books/create/', {
@@ -130,7 +152,8 @@ export const snippetsAPI = {
     }),
 
   // Chapters
-  getChapters: (bookId) => fetchAPI(`/snippets/books/${bookId}/chapters/`),
+  getChapters: (bookId) =>
+    fetchAllPages(`/snippets/books/${bookId}/chapters/`),
   getChapter: (id) => fetchAPI(`/snippets/chapters/${id}/`),
   createChapter: (data) =>
     fetchAPI('/snippets/chapters/create/', {
@@ -149,7 +172,7 @@ export const snippetsAPI = {
 
   // Sections
   getSections: (chapterId) =>
-    fetchAPI(`/snippets/chapters/${chapterId}/sections/`),
+    fetchAllPages(`/snippets/chapters/${chapterId}/sections/`),
   getSection: (id) => fetchAPI(`/snippets/sections/${id}/`),
   createSection: (data) =>
     fetchAPI('/snippets/sections/create/', {
@@ -168,7 +191,7 @@ export const snippetsAPI = {
 
   // Snippets
   getSnippets: (sectionId) =>
-    fetchAPI(`/snippets/sections/${sectionId}/snippets/`),
+    fetchAllPages(`/snippets/sections/${sectionId}/snippets/`),
   getSnippet: (id) => fetchAPI(`/snippets/snippets/${id}/`),
   createSnippet: (data) =>
     fetchAPI('/snippets/snippets/create/', {
@@ -2,6 +2,7 @@
 
 from django.contrib import admin
 
+from .highlight import rendered_fields
 from .models import Book, Chapter, Section, Snippet
 
 
@@ -44,5 +45,11 @@ class SnippetAdmin(admin.ModelAdmin):
     )
     list_filter = ("language", "is_published", "created_at", "section__chapter__book")
     search_fields = ("title", "code", "explanation")
-    readonly_fields = ("created_at", "updated_at")
+    readonly_fields = ("line_count", "code_size", "created_at", "updated_at")
     ordering = ("section", "order")
+
+    def save_model(self, request, obj, form, change):
+        if not change or {"code", "language"} & set(form.changed_data):
+            for name, value in rendered_fields(obj.code, obj.language).items():
+                setattr(obj, name, value)
+        super().save_model(request, obj, form, change)
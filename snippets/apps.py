@@ -6,3 +6,6 @@ from django.apps import AppConfig
 class SnippetsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "snippets"
+
+    def ready(self):
+        from . import signals  # noqa: F401
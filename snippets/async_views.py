@@ -0,0 +1,361 @@
+# snippets/async_views.py
+
+from django.core.exceptions import ImproperlyConfigured
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from accounts.authentication import AsyncCookieJWTAuthentication
+
+from .conditional import ValidatedRows, asubtree_validators, conditional_tags
+from .models import Book, Chapter, Section, Snippet
+from .response_cache import acached_data
+from .rows import row_mapper
+from .serializers import (
+    BookDetailSerializer,
+    BookListSerializer,
+    ChapterDetailSerializer,
+    ChapterListSerializer,
+    ChapterMinimalSerializer,
+    SectionDetailSerializer,
+    SectionListSerializer,
+    SectionMinimalSerializer,
+    SnippetSerializer,
+)
+from .views import visible, visible_count
+
+
+async def fetch(queryset, mapper):
+    """Representations of the queryset rows, read with async for"""
+    return mapper.many([row async for row in queryset.values(*mapper.columns)])
+
+
+async def fetch_one(queryset, mapper):
+    """values() row of the first object of the queryset, or None"""
+    return await queryset.values(*mapper.columns).afirst()
+
+
+class AsyncReadView(ValidatedRows, View):
+    """
+    Async version of a cached, conditional DRF read view. Same responses
+    (authentication, content negotiation, ETag / 304, response cache,
+    keyset pagination, error bodies) but the database and the caches are
+    awaited instead of holding a worker thread for the whole request.
+
+    cache_endpoint / cache_model / cache_url_kwarg: as for
+    CachedResponseMixin. validator_*: as for ConditionalGetMixin. Views
+    implement get_data(request, user): response data, or None for a
+    missing object.
+    """
+
+    cache_endpoint = None
+    cache_model = None
+    cache_url_kwarg = "id"
+
+    authenticator = AsyncCookieJWTAuthentication()
+    negotiator = DefaultContentNegotiation()
+
+    async def get(self, request, *args, **kwargs):
+        return await self.handle(request, self.respond)
+
+    async def http_method_not_allowed(self, request, *args, **kwargs):
+        return await self.handle(request, self.method_not_allowed)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.check_validated_rows()
+        if not hasattr(cls, "get_data"):
+            raise ImproperlyConfigured(f"{cls.__name__} must implement get_data()")
+
+    async def get_validators(self, user):
+        return await asubtree_validators(*self.validator_arguments(user))
+
+    async def handle(self, request, respond):
+        request = Request(request)
+        renderers = [renderer() for renderer in api_settings.DEFAULT_RENDERER_CLASSES]
+        try:
+            renderer, media_type = self.negotiator.select_renderer(request, renderers)
+        except exceptions.NotAcceptable as e:
+            renderer, media_type = renderers[0], renderers[0].media_type
+            response = self.error_response(request, e, renderer, media_type)
+        else:
+            try:
+                request.user = await self.authenticate(request)
+                response = await respond(request, renderer, media_type)
+            except (exceptions.APIException, Http404) as e:
+                response = self.error_response(request, e, renderer, media_type)
+
+        # Headers DRF adds to every response
+        response.headers["Allow"] = ", ".join(self._allowed_methods())
+        patch_vary_headers(response, ["Accept"])
+        return response
+
+    async def authenticate(self, request):
+        """User of the request; same checks as IsAuthenticated"""
+        result = await self.authenticator.aauthenticate(request._request)
+        if result is None:
+            raise exceptions.NotAuthenticated()
+        return result[0]
+
+    async def respond(self, request, renderer, media_type):
+        user = request.user
+        validators = await self.get_validators(user)
+        etag = None
+        if validators["rows"]:
+            etag, last_modified = conditional_tags(
+                self.cache_endpoint, request, user, renderer.format, validators
+            )
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if response is not None:
+                response.headers["ETag"] = etag
+                response.headers["Last-Modified"] = http_date(last_modified)
+                return response
+
+        data = await acached_data(
+            self.cache_endpoint,
+            self.cache_model,
+            self.kwargs.get(self.cache_url_kwarg),
+            user,
+            request.GET.urlencode(),
+            lambda: self.get_data(request, user),
+        )
+        if data is None:
+            # Same message as get_object()
+            name = self.cache_model._meta.object_name
+            raise Http404(f"No {name} matches the given query.")
+
+        response = self.render(request, data, 200, renderer, media_type)
+        if etag is not None:
+            response.headers["ETag"] = etag
+            response.headers["Last-Modified"] = http_date(last_modified)
+        return response
+
+    async def method_not_allowed(self, request, renderer, media_type):
+        raise exceptions.MethodNotAllowed(request.method)
+
+    def error_response(self, request, exc, renderer, media_type):
+        """Same status, headers and body as DRF's exception handling"""
+        if isinstance(exc, Http404):
+            exc = exceptions.NotFound(*exc.args)
+        if isinstance(exc.detail, (list, dict)):
+            data = exc.detail
+        else:
+            data = {"detail": exc.detail}
+        response = self.render(request, data, exc.status_code, renderer, media_type)
+        if isinstance(
+            exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)
+        ):
+            response.headers["WWW-Authenticate"] = (
+                self.authenticator.authenticate_header(request)
+            )
+        return response
+
+    def render(self, request, data, status, renderer, media_type):
+        """
+        Rendered like a DRF Response, but as a plain HttpResponse: Django
+        would render a deferred one in a thread.
+        """
+        content = renderer.render(data, media_type, {"request": request, "view": self})
+        content_type = renderer.media_type
+        if renderer.charset is not None:
+            content_type = f"{content_type}; charset={renderer.charset}"
+        return HttpResponse(content, status=status, content_type=content_type)
+
+    async def paginate(self, request, queryset, mapper):
+        """One page of the queryset, same shape as get_paginated_response()"""
+        paginator = api_settings.DEFAULT_PAGINATION_CLASS()
+        page = await paginator.apaginate_queryset(
+            queryset.values(*mapper.columns), request, self
+        )
+        if page is None:
+            return await fetch(queryset, mapper)
+        return paginator.get_paginated_response(mapper.many(page)).data
+
+
+# ==================== BOOK VIEWS ====================
+class AsyncBookListView(AsyncReadView):
+    """List all books (users see only published, admins see all)"""
+
+    cache_endpoint = "book_list"
+    pagination_ordering = ("title",)
+
+    validator_model = Book
+    validator_relation = "chapters"
+
+    async def get_data(self, request, user):
+        queryset = Book.objects.annotate(chapters_count=visible_count("chapters", user))
+        return await self.paginate(
+            request, visible(queryset, user), row_mapper(BookListSerializer, request)
+        )
+
+
+class AsyncBookDetailView(AsyncReadView):
+    """Get single book with chapter IDs (lazy loading)"""
+
+    cache_endpoint = "book_detail"
+    cache_model = Book
+
+    validator_model = Book
+    validator_url_kwarg = "id"
+    validator_relation = "chapters"
+
+    async def get_data(self, request, user):
+        mapper = row_mapper(BookDetailSerializer, request)
+        book = await fetch_one(
+            visible(Book.objects.filter(id=self.kwargs["id"]), user), mapper
+        )
+        if book is None:
+            return None
+        chapters = await fetch(
+            visible(Chapter.objects.filter(book_id=book["id"]), user).order_by("order"),
+            row_mapper(ChapterMinimalSerializer, request),
+        )
+        return mapper.map(book, chapters=chapters, chapters_count=len(chapters))
+
+
+# ==================== CHAPTER VIEWS ====================
+class AsyncChapterListView(AsyncReadView):
+    """List chapters for a specific book"""
+
+    cache_endpoint = "chapter_list"
+    cache_model = Book
+    cache_url_kwarg = "book_id"
+    pagination_ordering = ("order", "id")
+
+    validator_model = Chapter
+    validator_url_kwarg = "book_id"
+    validator_relation = "sections"
+    validator_parent = "book"
+
+    async def get_data(self, request, user):
+        queryset = Chapter.objects.filter(book_id=self.kwargs["book_id"]).annotate(
+            sections_count=visible_count("sections", user)
+        )
+        return await self.paginate(
+            request,
+            visible(queryset, user),
+            row_mapper(ChapterListSerializer, request),
+        )
+
+
+class AsyncChapterDetailView(AsyncReadView):
+    """Get single chapter with section IDs (lazy loading)"""
+
+    cache_endpoint = "chapter_detail"
+    cache_model = Chapter
+
+    validator_model = Chapter
+    validator_url_kwarg = "id"
+    validator_relation = "sections"
+
+    async def get_data(self, request, user):
+        mapper = row_mapper(ChapterDetailSerializer, request)
+        chapter = await fetch_one(
+            visible(Chapter.objects.filter(id=self.kwargs["id"]), user), mapper
+        )
+        if chapter is None:
+            return None
+        sections = await fetch(
+            visible(Section.objects.filter(chapter_id=chapter["id"]), user).order_by(
+                "order"
+            ),
+            row_mapper(SectionMinimalSerializer, request),
+        )
+        return mapper.map(chapter, sections=sections, sections_count=len(sections))
+
+
+# ==================== SECTION VIEWS ====================
+class AsyncSectionListView(AsyncReadView):
+    """List sections for a specific chapter"""
+
+    cache_endpoint = "section_list"
+    cache_model = Chapter
+    cache_url_kwarg = "chapter_id"
+    pagination_ordering = ("order", "id")
+
+    validator_model = Section
+    validator_url_kwarg = "chapter_id"
+    validator_relation = "snippets"
+    validator_parent = "chapter"
+
+    async def get_data(self, request, user):
+        queryset = Section.objects.filter(
+            chapter_id=self.kwargs["chapter_id"]
+        ).annotate(snippets_count=visible_count("snippets", user))
+        return await self.paginate(
+            request,
+            visible(queryset, user),
+            row_mapper(SectionListSerializer, request),
+        )
+
+
+class AsyncSectionDetailView(AsyncReadView):
+    """Get single section with full snippets (loaded on demand)"""
+
+    cache_endpoint = "section_detail"
+    cache_model = Section
+
+    validator_model = Section
+    validator_url_kwarg = "id"
+    validator_relation = "snippets"
+
+    async def get_data(self, request, user):
+        mapper = row_mapper(SectionDetailSerializer, request)
+        section = await fetch_one(
+            visible(Section.objects.filter(id=self.kwargs["id"]), user), mapper
+        )
+        if section is None:
+            return None
+        snippets = await fetch(
+            visible(Snippet.objects.filter(section_id=section["id"]), user).order_by(
+                "order"
+            ),
+            row_mapper(SnippetSerializer, request),
+        )
+        return mapper.map(section, snippets=snippets, snippets_count=len(snippets))
+
+
+# ==================== SNIPPET VIEWS ====================
+class AsyncSnippetListView(AsyncReadView):
+    """List snippets for a specific section"""
+
+    cache_endpoint = "snippet_list"
+    cache_model = Section
+    cache_url_kwarg = "section_id"
+    pagination_ordering = ("order", "id")
+
+    validator_model = Snippet
+    validator_url_kwarg = "section_id"
+
+    async def get_data(self, request, user):
+        return await self.paginate(
+            request,
+            visible(Snippet.objects.filter(section_id=self.kwargs["section_id"]), user),
+            row_mapper(SnippetSerializer, request),
+        )
+
+
+class AsyncSnippetDetailView(AsyncReadView):
+    """Get single snippet"""
+
+    cache_endpoint = "snippet_detail"
+    cache_model = Snippet
+
+    validator_model = Snippet
+    validator_url_kwarg = "id"
+
+    async def get_data(self, request, user):
+        mapper = row_mapper(SnippetSerializer, request)
+        snippet = await fetch_one(
+            visible(Snippet.objects.filter(id=self.kwargs["id"]), user), mapper
+        )
+        if snippet is None:
+            return None
+        return mapper.map(snippet)
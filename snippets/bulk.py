@@ -0,0 +1,291 @@
+# snippets/bulk.py
+
+import copy
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import generics, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from accounts.parsers import CBORParser, MessagePackParser
+from accounts.permissions import IsAdmin
+
+from .signals import batched, bulk_changed
+
+
+def _int_or_none(value):
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class BulkWriteView(generics.GenericAPIView):
+    """
+    Base of the bulk endpoints (admin only). The request body is a JSON
+    list; the whole batch is written in one transaction or not at all.
+
+    Responses are aligned with the request items: the written objects on
+    success, or one error dict per item ({} for valid items) with a 400,
+    the same shape DRF uses for many=True serializers.
+
+    serializer_class: a Bulk*Serializer (see serializers.BulkItemMixin)
+    Bodies can also be MessagePack or CBOR (by Content-Type).
+    """
+
+    permission_classes = [IsAuthenticated, IsAdmin]
+    parser_classes = [
+        *api_settings.DEFAULT_PARSER_CLASSES,
+        MessagePackParser,
+        CBORParser,
+    ]
+
+    @property
+    def model(self):
+        return self.serializer_class.Meta.model
+
+    @property
+    def parent_field(self):
+        return self.serializer_class.parent_field
+
+    @property
+    def parent_attname(self):
+        return self.model._meta.get_field(self.parent_field).attname
+
+    def get_items(self):
+        items = self.request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError(
+                {"non_field_errors": ["Expected a non-empty list of items."]}
+            )
+        if len(items) > settings.BULK_MAX_ITEMS:
+            raise ValidationError(
+                {
+                    "non_field_errors": [
+                        f"At most {settings.BULK_MAX_ITEMS} items per request."
+                    ]
+                }
+            )
+        return items
+
+    def get_item_context(self, items):
+        """Serializer context with every parent the batch refers to (one query)"""
+        parent_ids = {
+            _int_or_none(item.get(self.parent_field))
+            for item in items
+            if isinstance(item, dict)
+        }
+        parent_ids.discard(None)
+        parent_model = self.model._meta.get_field(self.parent_field).related_model
+        return {
+            **self.get_serializer_context(),
+            "parents": parent_model.objects.in_bulk(parent_ids),
+        }
+
+    def check_orders(self, rows, errors):
+        """
+        Reject duplicate (parent, order) pairs among rows, a list of
+        (item index, object at its final position), and against existing
+        siblings that the batch doesn't touch. One query.
+        """
+        parent_attname = self.parent_attname
+        batch_ids = {obj.pk for _, obj in rows if obj.pk is not None}
+        parent_ids = {getattr(obj, parent_attname) for _, obj in rows}
+        siblings = self.model.objects.filter(
+            **{f"{parent_attname}__in": parent_ids}
+        ).values_list("pk", parent_attname, "order")
+        taken = {
+            (parent_id, order)
+            for pk, parent_id, order in siblings
+            if pk not in batch_ids
+        }
+
+        message = f"The fields {self.parent_field}, order must make a unique set."
+        for index, obj in rows:
+            position = (getattr(obj, parent_attname), obj.order)
+            if position in taken:
+                errors[index].setdefault("non_field_errors", []).append(message)
+            taken.add(position)
+
+    def item_ids(self, items, errors):
+        """Ids of items (ints or {"id": ...} dicts); flags bad and repeated ones"""
+        ids = []
+        for index, item in enumerate(items):
+            raw = item.get("id") if isinstance(item, dict) else item
+            item_id = _int_or_none(raw)
+            if item_id is None:
+                errors[index] = {"id": ["A valid integer is required."]}
+            elif item_id in ids:
+                errors[index] = {"id": ["Duplicate id in this request."]}
+            ids.append(item_id)
+        return ids
+
+    def invalid(self, errors):
+        return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+    def conflict(self, items, rows):
+        """
+        400 for a batch that a concurrent request beat to a (parent, order)
+        pair after check_orders(): the write was rolled back, the check
+        runs again against what that request committed
+        """
+        errors = [{} for _ in items]
+        self.check_orders(rows, errors)
+        if not any(errors):
+            message = "Conflicts with a concurrent change, try again."
+            for index, _ in rows:
+                errors[index] = {"non_field_errors": [message]}
+        return self.invalid(errors)
+
+
+class BulkCreateView(BulkWriteView):
+    """POST a list of new objects"""
+
+    def get_save_kwargs(self):
+        """Extra attributes for every created object"""
+        return {}
+
+    def post(self, request, *args, **kwargs):
+        items = self.get_items()
+        context = self.get_item_context(items)
+        serializer_class = self.get_serializer_class()
+
+        errors = [{} for _ in items]
+        rows = []
+        for index, item in enumerate(items):
+            serializer = serializer_class(data=item, context=context)
+            if serializer.is_valid():
+                obj = self.model(**serializer.validated_data, **self.get_save_kwargs())
+                rows.append((index, obj))
+            else:
+                errors[index] = serializer.errors
+
+        self.check_orders(rows, errors)
+        if any(errors):
+            return self.invalid(errors)
+
+        objects = [obj for _, obj in rows]
+        try:
+            with transaction.atomic():
+                self.model.objects.bulk_create(objects)
+                bulk_changed(
+                    self.model, {getattr(obj, self.parent_attname) for obj in objects}
+                )
+        except IntegrityError:
+            return self.conflict(items, rows)
+
+        serializer = self.get_serializer(objects, many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class BulkUpdateView(BulkWriteView):
+    """PATCH a list of partial objects, each with its "id" """
+
+    def patch(self, request, *args, **kwargs):
+        items = self.get_items()
+        errors = [{} for _ in items]
+        ids = self.item_ids(items, errors)
+        instances = self.get_queryset().in_bulk([i for i in ids if i is not None])
+        context = self.get_item_context(items)
+        serializer_class = self.get_serializer_class()
+        parent_attname = self.parent_attname
+
+        rows = []
+        fields = {"updated_at"}
+        old_positions = {}
+        for index, (item, item_id) in enumerate(zip(items, ids)):
+            if errors[index]:
+                continue
+            instance = instances.get(item_id)
+            if instance is None:
+                errors[index] = {"id": ["Not found."]}
+                continue
+            serializer = serializer_class(
+                instance, data=item, partial=True, context=context
+            )
+            if not serializer.is_valid():
+                errors[index] = serializer.errors
+                continue
+
+            old_positions[instance.pk] = (
+                getattr(instance, parent_attname),
+                instance.order,
+            )
+            for name, value in serializer.validated_data.items():
+                setattr(instance, name, value)
+                fields.add(name)
+            rows.append((index, instance))
+
+        self.check_orders(rows, errors)
+        if any(errors):
+            return self.invalid(errors)
+
+        objects = [instance for _, instance in rows]
+        now = timezone.now()
+        for instance in objects:
+            instance.updated_at = now
+        moving = [
+            instance
+            for instance in objects
+            if (getattr(instance, parent_attname), instance.order)
+            != old_positions[instance.pk]
+        ]
+        moved_parents = any(
+            getattr(instance, parent_attname) != old_positions[instance.pk][0]
+            for instance in moving
+        )
+
+        try:
+            with transaction.atomic():
+                if moving:
+                    # Unique constraints are checked row by row, so swapping
+                    # positions inside one UPDATE would collide. Park the
+                    # moving rows on unique negative orders first (real ones
+                    # are > 0).
+                    parked = []
+                    for instance in moving:
+                        placeholder = copy.copy(instance)
+                        placeholder.order = -instance.pk
+                        parked.append(placeholder)
+                    self.model.objects.bulk_update(parked, ["order"])
+                    # Restores the order of rows that only changed parent
+                    fields.add("order")
+                self.model.objects.bulk_update(objects, sorted(fields))
+                parent_ids = {getattr(instance, parent_attname) for instance in objects}
+                parent_ids.update(parent for parent, _ in old_positions.values())
+                bulk_changed(self.model, parent_ids, moved=moved_parents)
+        except IntegrityError:
+            return self.conflict(items, rows)
+
+        serializer = self.get_serializer(objects, many=True)
+        return Response(serializer.data)
+
+
+class BulkDeleteView(BulkWriteView):
+    """POST a list of ids to delete"""
+
+    def post(self, request, *args, **kwargs):
+        items = self.get_items()
+        errors = [{} for _ in items]
+        ids = self.item_ids(items, errors)
+        existing = dict(
+            self.model.objects.filter(pk__in=ids).values_list("pk", self.parent_attname)
+        )
+        for index, item_id in enumerate(ids):
+            if not errors[index] and item_id not in existing:
+                errors[index] = {"id": ["Not found."]}
+        if any(errors):
+            return self.invalid(errors)
+
+        # One invalidation for the batch instead of one per deleted row
+        with transaction.atomic(), batched():
+            self.model.objects.filter(pk__in=ids).delete()
+            bulk_changed(self.model, set(existing.values()))
+
+        return Response([{"id": item_id, "deleted": True} for item_id in ids])
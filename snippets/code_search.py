@@ -0,0 +1,422 @@
+# snippets/code_search.py
+
+import heapq
+import html
+import logging
+import marshal
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, connections
+
+from config.replicas import use_primary
+
+from .models import Snippet
+from .search import RESULT_FIELDS
+
+logger = logging.getLogger(__name__)
+
+NGRAM = 3
+
+# Bumped after every committed snippet write, so each process knows when
+# its in-memory index has to catch up with the database
+VERSION_KEY = "snippets_code_index_version"
+
+# Ids of the snippets deleted by the write that bumped the version to N,
+# kept long enough for idle processes to replay them
+DELETED_KEY = "snippets_code_index_deleted_{}"
+DELETED_TIMEOUT = 24 * 60 * 60
+
+# Versions an index can be behind and still catch up; further behind (or
+# after the counter was evicted) it is rebuilt
+MAX_CATCH_UP_VERSIONS = 1000
+
+# Catch-up re-reads rows slightly older than the newest indexed one, so a
+# long transaction committing late isn't missed
+CATCH_UP_OVERLAP = timedelta(minutes=5)
+
+# Max candidate ids verified against the database per query
+VERIFY_CHUNK = 500
+
+BUILD_CHUNK = 2000
+
+# Rows changed since the build (plus 10% of all rows) that trigger a rebuild
+OVERLAY_LIMIT = 1000
+
+# Layout of the file written by save_index(); other files are ignored
+INDEX_FORMAT = 1
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def trigrams(text):
+    return {text[i : i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+def _contains(postings, snippet_id):
+    i = bisect_left(postings, snippet_id)
+    return i < len(postings) and postings[i] == snippet_id
+
+
+class TrigramIndex:
+    """
+    Inverted index of lowercased snippet code: trigram -> sorted array of
+    snippet ids, built in bulk. Later writes go to a small overlay
+    (id -> trigram set) and mark the id's bulk postings dead until the
+    next rebuild. Only yields candidates; callers verify the substring.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.overlay = {}
+        self.dead = set()
+        # id -> updated_at of the indexed version of each snippet
+        self.updated = {}
+        self.watermark = None
+        self.version = None
+
+    @classmethod
+    def build(cls, rows):
+        """rows: (id, code, updated_at) tuples in ascending id order"""
+        index = cls()
+        postings = index.postings
+        for snippet_id, code, updated_at in rows:
+            for gram in trigrams(code.lower()):
+                if gram not in postings:
+                    postings[gram] = array("Q")
+                postings[gram].append(snippet_id)
+            index.updated[snippet_id] = updated_at
+            index._advance(updated_at)
+        return index
+
+    def _advance(self, updated_at):
+        if self.watermark is None or updated_at > self.watermark:
+            self.watermark = updated_at
+
+    def update(self, snippet_id, code, updated_at):
+        if self.updated.get(snippet_id) == updated_at:
+            return
+        self.dead.add(snippet_id)
+        self.overlay[snippet_id] = frozenset(trigrams(code.lower()))
+        self.updated[snippet_id] = updated_at
+        self._advance(updated_at)
+
+    def remove(self, snippet_id):
+        self.dead.add(snippet_id)
+        self.overlay.pop(snippet_id, None)
+        self.updated.pop(snippet_id, None)
+
+    def _bulk_candidates(self, grams):
+        lists = [self.postings.get(gram) for gram in grams]
+        if not all(lists):
+            return
+        lists.sort(key=len)
+        rarest, others = lists[0], lists[1:]
+        for snippet_id in rarest:
+            if snippet_id in self.dead:
+                continue
+            if all(_contains(postings, snippet_id) for postings in others):
+                yield snippet_id
+
+    def candidates(self, token):
+        """Ids that may contain token (3+ chars), ascending, lazily"""
+        grams = trigrams(token.lower())
+        changed = sorted(
+            snippet_id
+            for snippet_id, snippet_grams in self.overlay.items()
+            if grams <= snippet_grams
+        )
+        return heapq.merge(self._bulk_candidates(grams), changed)
+
+
+# ==================== INDEX LIFECYCLE ====================
+_lock = threading.Lock()
+_index = None
+# Thread loading or building _index in the background
+_loader = None
+# Committed deletions of this thread, stored by its next bump_version()
+_deleted = threading.local()
+
+
+def deleted(snippet_id):
+    """Record a committed snippet deletion (on_commit)"""
+    if not hasattr(_deleted, "ids"):
+        _deleted.ids = []
+    _deleted.ids.append(snippet_id)
+
+
+def bump_version():
+    ids, _deleted.ids = getattr(_deleted, "ids", []), []
+    try:
+        version = cache.incr(VERSION_KEY)
+    except ValueError:
+        # Missing counter: the next read starts a fresh one, and every
+        # index rebuilds
+        return
+    if ids:
+        cache.set(DELETED_KEY.format(version), ids, timeout=DELETED_TIMEOUT)
+
+
+def _get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def build_index(version=None):
+    """Index of all snippets, as of version (default: the current one)"""
+    if version is None:
+        version = _get_version()
+    rows = (
+        Snippet.objects.order_by("id")
+        .values_list("id", "code", "updated_at")
+        .iterator(chunk_size=BUILD_CHUNK)
+    )
+    index = TrigramIndex.build(rows)
+    index.version = version
+    return index
+
+
+def _micros(moment):
+    return None if moment is None else (moment - EPOCH) // timedelta(microseconds=1)
+
+
+def _moment(micros):
+    return None if micros is None else EPOCH + timedelta(microseconds=micros)
+
+
+def save_index(index, path=None):
+    """
+    Write index as marshalled builtins (postings as raw id arrays, times as
+    microseconds): unlike a pickle, loading the file can't run code
+    """
+    data = {
+        "format": INDEX_FORMAT,
+        "byteorder": sys.byteorder,
+        "version": index.version,
+        "watermark": _micros(index.watermark),
+        "ids": array("Q", index.updated).tobytes(),
+        "updated": array("q", map(_micros, index.updated.values())).tobytes(),
+        "postings": {gram: ids.tobytes() for gram, ids in index.postings.items()},
+        "overlay": index.overlay,
+        "dead": frozenset(index.dead),
+    }
+    with open(path or settings.CODE_SEARCH_INDEX_PATH, "wb") as f:
+        marshal.dump(data, f)
+
+
+def load_index(path=None):
+    """Index saved by rebuild_code_index, or None"""
+    try:
+        with open(path or settings.CODE_SEARCH_INDEX_PATH, "rb") as f:
+            data = marshal.load(f)
+        if data["format"] != INDEX_FORMAT or data["byteorder"] != sys.byteorder:
+            raise ValueError("written by another version or platform")
+        index = TrigramIndex()
+        index.postings = {
+            gram: array("Q", ids) for gram, ids in data["postings"].items()
+        }
+        index.updated = dict(
+            zip(array("Q", data["ids"]), map(_moment, array("q", data["updated"])))
+        )
+        index.overlay = dict(data["overlay"])
+        index.dead = set(data["dead"])
+        index.watermark = _moment(data["watermark"])
+        index.version = data["version"]
+        return index
+    except FileNotFoundError:
+        return None
+    except (EOFError, ValueError, TypeError, KeyError) as e:
+        logger.warning("Ignoring unreadable code search index: %s", e)
+        return None
+
+
+def catch_up(index, version):
+    """
+    Apply writes made by any process between the index's version and
+    version: changed rows from the database, deleted ids from the
+    DELETED_KEY entries of the versions in between. Returns False when
+    the index is too far behind and has to be rebuilt instead.
+    """
+    behind = None if index.version is None else version - index.version
+    if behind is None or not 0 <= behind <= MAX_CATCH_UP_VERSIONS:
+        return False
+
+    if index.watermark is not None:
+        changed = Snippet.objects.filter(
+            updated_at__gte=index.watermark - CATCH_UP_OVERLAP
+        ).values_list("id", "code", "updated_at")
+        for snippet_id, code, updated_at in changed:
+            index.update(snippet_id, code, updated_at)
+
+    # An expired entry leaves ids in the index: search verifies every
+    # candidate against the database, so they only cost a lookup
+    keys = [DELETED_KEY.format(n) for n in range(index.version + 1, version + 1)]
+    for ids in cache.get_many(keys).values():
+        for snippet_id in ids:
+            index.remove(snippet_id)
+
+    if len(index.overlay) > OVERLAY_LIMIT + len(index.updated) // 10:
+        # The overlay is scanned linearly: compact it after mass updates
+        return False
+    index.version = version
+    return True
+
+
+def load():
+    """
+    Make the saved index, caught up, or else a fresh build this process's
+    index. Reads the whole snippet table in the worst case: runs in the
+    background (preload()), or from commands.
+    """
+    global _index
+    with use_primary():
+        version = _get_version()
+        index = load_index()
+        if index is None or not catch_up(index, version):
+            index = build_index(version)
+    with _lock:
+        _index = index
+    return index
+
+
+def _load_in_background():
+    try:
+        load()
+    except Exception:
+        logger.exception("Loading the code search index failed")
+    finally:
+        # This thread's own connections
+        connections.close_all()
+
+
+def preload():
+    """
+    Start loading this process's index in a background thread, unless it is
+    loaded or loading already (SQLite only). Called at startup, and again
+    by searches that find no index.
+    """
+    global _loader
+    if connection.vendor != "sqlite":
+        return
+    with _lock:
+        if _index is not None or (_loader is not None and _loader.is_alive()):
+            return
+        _loader = threading.Thread(
+            target=_load_in_background, name="code-search-index", daemon=True
+        )
+        _loader.start()
+
+
+def get_index():
+    """
+    This process's index, brought up to date if anything was written, or
+    None while it is (re)built in the background
+    """
+    global _index
+    # Caught up from the primary: a lagging replica would miss writes the
+    # version already covers
+    with _lock, use_primary():
+        index = _index
+        if index is not None:
+            version = _get_version()
+            if index.version != version and not catch_up(index, version):
+                index = _index = None
+    if index is None:
+        preload()
+    return index
+
+
+def reset_index():
+    global _index
+    with _lock:
+        _index = None
+
+
+# ==================== SEARCH ====================
+def _visible_snippets(user, languages):
+    queryset = Snippet.objects.all()
+    if user.role != "admin":
+        queryset = queryset.filter(is_published=True)
+    if languages:
+        queryset = queryset.filter(language__in=languages)
+    return queryset
+
+
+def _indexed_ids(index, token, queryset, limit, offset):
+    """Verify index candidates in id order until the page is filled"""
+    wanted = offset + limit
+    matches = []
+    candidates = index.candidates(token)
+    # Most candidates of a 3+ char token are real matches: start with a
+    # chunk close to the page size and grow it when they aren't
+    chunk_size = 2 * wanted
+    while len(matches) < wanted:
+        chunk = list(islice(candidates, min(chunk_size, VERIFY_CHUNK)))
+        if not chunk:
+            break
+        chunk_size *= 2
+        matches.extend(
+            queryset.filter(id__in=chunk, code__icontains=token)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+    return matches[offset:wanted]
+
+
+def code_excerpt(code, token):
+    """Line number and HTML of the first line containing token"""
+    position = code.lower().find(token.lower())
+    if position < 0:
+        return None, ""
+    start = code.rfind("\n", 0, position) + 1
+    end = code.find("\n", position)
+    if end < 0:
+        end = len(code)
+    stop = position + len(token)
+    excerpt = (
+        html.escape(code[start:position])
+        + "<mark>"
+        + html.escape(code[position:stop])
+        + "</mark>"
+        + html.escape(code[stop:end])
+    )
+    return code.count("\n", 0, position) + 1, excerpt
+
+
+def search_code(token, user, languages=(), limit=20, offset=0):
+    """
+    Snippets whose code contains token (case-insensitive substring, so
+    identifiers like HashMap::new or async_to_sync match as typed), in id
+    order. PostgreSQL answers code__icontains from the pg_trgm index;
+    SQLite narrows candidates with the in-process trigram index first.
+    Tokens shorter than a trigram, and searches while that index is
+    loading, are a plain scan.
+    """
+    queryset = _visible_snippets(user, list(languages))
+    index = None
+    if connection.vendor == "sqlite" and len(token) >= NGRAM:
+        index = get_index()
+    if index is not None:
+        ids = _indexed_ids(index, token, queryset, limit, offset)
+        rows = Snippet.objects.filter(id__in=ids).order_by("id")
+    else:
+        rows = queryset.filter(code__icontains=token).order_by("id")[
+            offset : offset + limit
+        ]
+
+    results = []
+    for row in rows.values(*RESULT_FIELDS, "code"):
+        row["section"] = row.pop("section_id")
+        row["line"], row["excerpt"] = code_excerpt(row.pop("code"), token)
+        results.append(row)
+    return results
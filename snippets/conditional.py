@@ -0,0 +1,137 @@
+# snippets/conditional.py
+
+import hashlib
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Count, Max, Q
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def _aggregates(user, relation, parent):
+    aggregates = {
+        "updated": Max("updated_at"),
+        "rows": Count("id", distinct=True),
+    }
+    if parent is not None:
+        aggregates["parent"] = Max(parent)
+        aggregates["parent_updated"] = Max(f"{parent}__updated_at")
+    if relation is not None:
+        visible = None
+        if user.role != "admin":
+            visible = Q(**{f"{relation}__is_published": True})
+        aggregates["children_updated"] = Max(f"{relation}__updated_at", filter=visible)
+        aggregates["children"] = Count(relation, filter=visible)
+    return aggregates
+
+
+def subtree_validators(queryset, user, relation=None, parent=None):
+    """
+    max(updated_at) and row counts of the queryset rows and, if relation is
+    given, of their children visible to user. One aggregate query.
+    Counts catch deletions, which don't move max(updated_at).
+
+    parent: foreign key of rows whose representation includes fields of
+    the parent (book_title): its id and updated_at are validated too.
+    """
+    return queryset.aggregate(**_aggregates(user, relation, parent))
+
+
+async def asubtree_validators(queryset, user, relation=None, parent=None):
+    """subtree_validators() for async views"""
+    return await queryset.aaggregate(**_aggregates(user, relation, parent))
+
+
+def conditional_tags(endpoint, request, user, format, validators):
+    """
+    ETag and Last-Modified (unix time) of a response: one ETag per
+    endpoint, visibility level, representation (JSON, MessagePack,
+    CBOR) and query string
+    """
+    level = "admin" if user.role == "admin" else "user"
+    fingerprint = ":".join(
+        [endpoint, level, format, request.GET.urlencode()]
+        + [str(validators[name]) for name in sorted(validators)]
+    )
+    etag = quote_etag(hashlib.md5(fingerprint.encode()).hexdigest())
+    last_modified = int(
+        max(
+            value.timestamp()
+            for name, value in validators.items()
+            if name.endswith("updated") and value is not None
+        )
+    )
+    return etag, last_modified
+
+
+class ValidatedRows:
+    """
+    Rows a conditional view validates, declared on the class:
+
+    validator_model: model of the rows in the response
+    validator_url_kwarg: URL kwarg (and field) selecting them; None for all
+    validator_relation / validator_parent: as for subtree_validators()
+    """
+
+    validator_model = None
+    validator_url_kwarg = None
+    validator_relation = None
+    validator_parent = None
+
+    @classmethod
+    def check_validated_rows(cls):
+        if cls.validator_model is None:
+            raise ImproperlyConfigured(f"{cls.__name__} must set validator_model")
+
+    def validator_arguments(self, user):
+        """subtree_validators() arguments for this request"""
+        queryset = self.validator_model.objects.all()
+        if self.validator_url_kwarg is not None:
+            queryset = queryset.filter(
+                **{self.validator_url_kwarg: self.kwargs[self.validator_url_kwarg]}
+            )
+        if user.role != "admin":
+            # Regular users only see published rows
+            queryset = queryset.filter(is_published=True)
+        return queryset, user, self.validator_relation, self.validator_parent
+
+
+class ConditionalGetMixin(ValidatedRows):
+    """
+    ETag / Last-Modified validators for GET, answered with 304 when the
+    client already has the current version
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.check_validated_rows()
+
+    def get_validators(self):
+        return subtree_validators(*self.validator_arguments(self.request.user))
+
+    def get(self, request, *args, **kwargs):
+        validators = self.get_validators()
+        if not validators["rows"]:
+            # Missing object or empty list: nothing worth validating
+            return super().get(request, *args, **kwargs)
+
+        etag, last_modified = conditional_tags(
+            self.cache_endpoint,
+            request,
+            request.user,
+            request.accepted_renderer.format,
+            validators,
+        )
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+        response.headers["ETag"] = etag
+        response.headers["Last-Modified"] = http_date(last_modified)
+        patch_vary_headers(response, ["Accept"])
+        return response
@@ -0,0 +1,51 @@
+# snippets/highlight.py
+
+from django.conf import settings
+from pygments import highlight
+from pygments.formatters import HtmlFormatter
+from pygments.lexers import get_lexer_by_name
+from pygments.util import ClassNotFound
+
+# Snippet.language values that aren't Pygments lexer names
+LEXER_NAMES = {"other": "text"}
+
+# Query parameter asking read endpoints for code_html
+HIGHLIGHT_PARAM = "highlight"
+
+
+def render(code, language):
+    """Highlighted HTML of code, or "" when SNIPPET_HIGHLIGHT is off"""
+    if not settings.SNIPPET_HIGHLIGHT:
+        return ""
+    try:
+        lexer = get_lexer_by_name(LEXER_NAMES.get(language, language), stripnl=False)
+    except ClassNotFound:
+        lexer = get_lexer_by_name("text", stripnl=False)
+    return highlight(code, lexer, HtmlFormatter(cssclass="highlight"))
+
+
+def rendered_fields(code, language):
+    """Denormalized Snippet columns derived from code and language"""
+    return {
+        "code_html": render(code, language),
+        "line_count": len(code.splitlines()),
+        "code_size": len(code.encode("utf-8")),
+    }
+
+
+def render_batch(rows):
+    """
+    Rendered fields for (id, section_id, code, language) rows.
+    Runs in render_snippets' worker processes: no database access here.
+    """
+    return [
+        (snippet_id, section_id, rendered_fields(code, language))
+        for snippet_id, section_id, code, language in rows
+    ]
+
+
+def wants_html(request):
+    """Did the client ask for code_html (?highlight=1)?"""
+    if request is None:
+        return False
+    return request.query_params.get(HIGHLIGHT_PARAM) in ("1", "true")
@@ -0,0 +1,215 @@
+# snippets/management/commands/benchmark_async_reads.py
+
+import asyncio
+import itertools
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import override_settings
+from django.urls import path
+from rest_framework_simplejwt.tokens import AccessToken
+
+from snippets import async_views, views
+from snippets.models import Book, Chapter, Section, Snippet
+
+# (route, sync view, async view) of the endpoints the readers cycle through
+ROUTES = [
+    ("books/<int:id>/", views.BookDetailView, async_views.AsyncBookDetailView),
+    ("chapters/<int:id>/", views.ChapterDetailView, async_views.AsyncChapterDetailView),
+    (
+        "chapters/<int:chapter_id>/sections/",
+        views.SectionListView,
+        async_views.AsyncSectionListView,
+    ),
+    ("sections/<int:id>/", views.SectionDetailView, async_views.AsyncSectionDetailView),
+    (
+        "sections/<int:section_id>/snippets/",
+        views.SnippetListView,
+        async_views.AsyncSnippetListView,
+    ),
+]
+
+# Both versions of every endpoint, under /sync/ and /async/
+BenchmarkURLs = type(
+    "BenchmarkURLs",
+    (),
+    {
+        "urlpatterns": [
+            path(f"sync/{route}", view.as_view()) for route, view, _ in ROUTES
+        ]
+        + [path(f"async/{route}", view.as_view()) for route, _, view in ROUTES]
+    },
+)
+
+# Requests made here cache object -> book mappings and users under the ids
+# of rows deleted afterwards (and maybe reused): they go to a private cache
+PRIVATE_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "benchmark-async-reads",
+    }
+}
+
+
+def percentile(samples, n):
+    return statistics.quantiles(samples, n=100, method="inclusive")[n - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Latency of the read endpoints under concurrent readers, DRF views vs "
+        "the native async views, through the ASGI handler"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--readers", type=int, default=500)
+        parser.add_argument(
+            "--requests", type=int, default=10, help="Requests per reader"
+        )
+        parser.add_argument("--sections", type=int, default=10)
+        parser.add_argument("--snippets", type=int, default=20)
+        parser.add_argument(
+            "--cached",
+            action="store_true",
+            help="Let the response cache answer (default: every request misses)",
+        )
+
+    def handle(self, *args, **options):
+        # Seeded rows are committed (requests run on threads and connections
+        # of their own) and deleted afterwards
+        book, user, paths, token = self._seed(options)
+        try:
+            # Requests get connections of their own, not this thread's
+            connections[DEFAULT_DB_ALIAS].close()
+            with override_settings(CACHES=PRIVATE_CACHES, ROOT_URLCONF=BenchmarkURLs):
+                asyncio.run(self._run(paths, token, options))
+        finally:
+            book.delete()
+            user.delete()
+
+    def _seed(self, options):
+        user = get_user_model().objects.create(
+            username=f"benchmark-{time.time()}", role="user"
+        )
+        book = Book.objects.create(title="Benchmark", is_published=True)
+        chapter = Chapter.objects.create(
+            book=book, title="Benchmark", order=1, is_published=True
+        )
+        paths = [f"books/{book.id}/", f"chapters/{chapter.id}/"]
+        paths.append(f"chapters/{chapter.id}/sections/")
+        for number in range(options["sections"]):
+            section = Section.objects.create(
+                chapter=chapter,
+                title=f"Section {number}",
+                order=number + 1,
+                is_published=True,
+            )
+            Snippet.objects.bulk_create(
+                Snippet(
+                    section=section,
+                    title=f"Snippet {n}",
+                    code=f"print({n})\n" * 10,
+                    explanation="Explains the code",
+                    order=n + 1,
+                    is_published=True,
+                    created_by=user,
+                )
+                for n in range(options["snippets"])
+            )
+            paths += [f"sections/{section.id}/", f"sections/{section.id}/snippets/"]
+        return book, user, paths, str(AccessToken.for_user(user))
+
+    async def _run(self, paths, token, options):
+        self.counter = itertools.count()
+        handler = ASGIHandler()
+        cookie = f"{settings.SIMPLE_JWT['AUTH_COOKIE']}={token}".encode()
+        mismatches = 0
+        for url in paths:
+            sync = await self._get(handler, f"/sync/{url}", b"", cookie)
+            async_ = await self._get(handler, f"/async/{url}", b"", cookie)
+            if sync[0] != 200 or (
+                sync[1].replace(b"/sync/", b"/") != async_[1].replace(b"/async/", b"/")
+            ):
+                mismatches += 1
+        if mismatches:
+            raise CommandError(f"{mismatches} endpoints answer differently")
+
+        self.stdout.write(
+            f"{options['readers']} concurrent readers x {options['requests']} "
+            f"requests over {len(paths)} endpoints"
+            + (" (response cache on)" if options["cached"] else "")
+        )
+        for mode in ("sync", "async"):
+            await self._load(handler, cookie, mode, paths, options, warmup=True)
+            samples, elapsed = await self._load(handler, cookie, mode, paths, options)
+            self.stdout.write(
+                f"{mode:>6}  p50={percentile(samples, 50):8.1f}ms  "
+                f"p99={percentile(samples, 99):8.1f}ms  "
+                f"max={max(samples):8.1f}ms  {len(samples) / elapsed:7.0f} req/s"
+            )
+
+    async def _load(self, handler, cookie, mode, paths, options, warmup=False):
+        """Latencies (ms) of all requests, and the wall time (s)"""
+        readers = 10 if warmup else options["readers"]
+        samples = []
+
+        async def reader(number):
+            for n in range(options["requests"]):
+                url = f"/{mode}/{paths[(number + n) % len(paths)]}"
+                # A new query string per request misses the response cache
+                query = b"" if options["cached"] else f"r={next(self.counter)}".encode()
+                started = time.perf_counter()
+                status, _ = await self._get(handler, url, query, cookie)
+                samples.append((time.perf_counter() - started) * 1000)
+                if status != 200:
+                    raise CommandError(f"{url}: {status}")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(reader(number) for number in range(readers)))
+        return samples, time.perf_counter() - started
+
+    async def _get(self, handler, url, query, cookie):
+        """
+        Status and body of a GET through the ASGI handler, as daphne would
+        send it: each request in a thread-sensitive context of its own
+        (AsyncClient runs every sync view on one thread instead)
+        """
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": url,
+            "raw_path": url.encode(),
+            "query_string": query,
+            "headers": [(b"host", b"localhost"), (b"cookie", cookie)],
+            "client": ("127.0.0.1", 0),
+            "server": ("localhost", 80),
+        }
+        body_sent = False
+        status = None
+        body = []
+
+        async def receive():
+            nonlocal body_sent
+            if body_sent:
+                # The client stays connected until the response is sent
+                await asyncio.Future()
+            body_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                body.append(message.get("body", b""))
+
+        await handler(scope, receive, send)
+        return status, b"".join(body)
@@ -0,0 +1,126 @@
+# snippets/management/commands/benchmark_code_search.py
+
+import random
+import statistics
+import time
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from snippets import code_search
+from snippets.models import Book, Chapter, Section, Snippet
+
+DEFAULT_TOKENS = ["HashMap::new", "async_to_sync", "fn main()", "useEffect", "zzz_nope"]
+
+# Building blocks for synthetic snippets (--seed)
+SEED_LINES = [
+    "let mut map = HashMap::new();",
+    "from asgiref.sync import async_to_sync",
+    "fn main() {",
+    "useEffect(() => {}, []);",
+    "for item in items:",
+    "    total += item.price * item.quantity",
+    "SELECT id, title FROM snippets_snippet WHERE is_published;",
+    "const result = await fetch(url);",
+    'println!("{}", value);',
+    "return sorted(values, key=lambda v: v.order)",
+]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Compare code search latency: trigram index vs a plain icontains scan"
+
+    def add_arguments(self, parser):
+        parser.add_argument("tokens", nargs="*", default=DEFAULT_TOKENS)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--page-size", type=int, default=20)
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Insert this many synthetic snippets first (rolled back at the end)",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                if options["seed"]:
+                    self._seed(options["seed"])
+                    # A token present in a single seeded snippet
+                    options["tokens"] = [
+                        *options["tokens"],
+                        f"id_{options['seed'] - 1}",
+                    ]
+                self._run(options)
+                raise Rollback
+        except Rollback:
+            pass
+        # The in-memory index may hold rolled back rows
+        code_search.reset_index()
+
+    def _seed(self, count):
+        book = Book.objects.create(title=f"Benchmark {time.time()}")
+        chapter = Chapter.objects.create(book=book, title="Benchmark", order=1)
+        section = Section.objects.create(chapter=chapter, title="Benchmark", order=1)
+        rng = random.Random(0)
+        Snippet.objects.bulk_create(
+            (
+                Snippet(
+                    section=section,
+                    title=f"Snippet {n}",
+                    code="\n".join(rng.choices(SEED_LINES, k=8)) + f"\n# id_{n}",
+                    order=n,
+                    is_published=True,
+                )
+                for n in range(count)
+            ),
+            batch_size=2000,
+        )
+        self.stdout.write(f"Seeded {count} snippets")
+
+    def _time(self, function, repeat):
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = function()
+            samples.append((time.perf_counter() - started) * 1000)
+        return result, samples
+
+    def _run(self, options):
+        admin = SimpleNamespace(role="admin")
+        page_size = options["page_size"]
+        self.stdout.write(f"Snippets: {Snippet.objects.count()}")
+
+        code_search.reset_index()
+        started = time.perf_counter()
+        # In this thread: the seeded rows aren't committed
+        code_search.load()
+        self.stdout.write(f"Index ready in {(time.perf_counter() - started):.2f}s")
+
+        for token in options["tokens"]:
+            indexed, indexed_ms = self._time(
+                lambda: code_search.search_code(token, admin, limit=page_size),
+                options["repeat"],
+            )
+            scanned, scan_ms = self._time(
+                lambda: list(
+                    Snippet.objects.filter(code__icontains=token)
+                    .order_by("id")
+                    .values_list("id", flat=True)[:page_size]
+                ),
+                options["repeat"],
+            )
+            if [row["id"] for row in indexed] != scanned:
+                self.stderr.write(f"{token!r}: results differ from icontains")
+            self.stdout.write(
+                f"{token!r:>18} hits={len(indexed):>3}  "
+                f"index p50={statistics.median(indexed_ms):7.2f}ms "
+                f"max={max(indexed_ms):7.2f}ms  |  "
+                f"icontains p50={statistics.median(scan_ms):7.2f}ms "
+                f"max={max(scan_ms):7.2f}ms"
+            )
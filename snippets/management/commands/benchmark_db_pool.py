@@ -0,0 +1,193 @@
+# snippets/management/commands/benchmark_db_pool.py
+
+import asyncio
+import statistics
+import threading
+import time
+
+import psycopg
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import JsonResponse
+from django.test.utils import override_settings
+from django.urls import path
+
+from config import pool
+
+# Client connections to the database, other than the sampler's own
+CONNECTIONS_SQL = """
+    SELECT count(*) FROM pg_stat_activity
+    WHERE datname = current_database()
+      AND backend_type = 'client backend'
+      AND pid <> pg_backend_pid()
+"""
+
+
+def probe(request):
+    """One query that keeps the connection busy for ?ms milliseconds"""
+    with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+        cursor.execute("SELECT pg_sleep(%s)", [int(request.GET["ms"]) / 1000])
+    return JsonResponse({})
+
+
+BenchmarkURLs = type("BenchmarkURLs", (), {"urlpatterns": [path("probe/", probe)]})
+
+
+def percentile(samples, n):
+    return statistics.quantiles(samples, n=100, method="inclusive")[n - 1]
+
+
+class Sampler(threading.Thread):
+    """
+    Peak connections the server sees and peak pool usage, polled from a
+    connection of its own (outside the pool) while a level runs
+    """
+
+    def __init__(self, interval):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.connections = 0
+        self.checked_out = 0
+        self.waiting = 0
+
+    def run(self):
+        params = connections[DEFAULT_DB_ALIAS].settings_dict
+        with psycopg.connect(
+            dbname=params["NAME"],
+            user=params["USER"] or None,
+            password=params["PASSWORD"] or None,
+            host=params["HOST"] or None,
+            port=params["PORT"] or None,
+            autocommit=True,
+        ) as connection:
+            while not self.stopped.wait(self.interval):
+                count = connection.execute(CONNECTIONS_SQL).fetchone()[0]
+                self.connections = max(self.connections, count)
+                stats = pool.stats().get(DEFAULT_DB_ALIAS)
+                if stats:
+                    self.checked_out = max(self.checked_out, stats["checked_out"])
+                    self.waiting = max(self.waiting, stats["waiting"])
+
+
+class Command(BaseCommand):
+    help = (
+        "Connections PostgreSQL sees as concurrent requests grow, with the "
+        "connection pool (DB_POOL, default) or without it (DB_POOL=false)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency", type=int, nargs="+", default=[1, 8, 32, 128, 512]
+        )
+        parser.add_argument(
+            "--requests", type=int, default=20, help="Requests per client"
+        )
+        parser.add_argument(
+            "--query-ms", type=int, default=5, help="Time each request's query takes"
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[DEFAULT_DB_ALIAS]
+        if connection.vendor != "postgresql":
+            raise CommandError("Needs PostgreSQL: set DATABASE_URL")
+        pool_of = pool.pool_of(DEFAULT_DB_ALIAS)
+        if pool_of is None:
+            self.stdout.write("Pool: off (one connection per thread)")
+        else:
+            self.stdout.write(
+                f"Pool: {pool_of.min_size}-{pool_of.max_size} connections, "
+                f"{pool_of.timeout:g}s timeout"
+            )
+        # Requests get connections of their own, not this thread's
+        connection.close()
+
+        self.stdout.write(
+            f"{'clients':>7} {'req/s':>7} {'p50 ms':>8} {'p99 ms':>8} {'errors':>6} "
+            f"{'server conns':>12} {'checked out':>11} {'waiting':>7} "
+            f"{'avg wait ms':>11}"
+        )
+        with override_settings(ROOT_URLCONF=BenchmarkURLs):
+            for clients in options["concurrency"]:
+                self._level(clients, options)
+        self.stdout.write(self.style.SUCCESS("Done"))
+
+    def _level(self, clients, options):
+        before = pool.stats().get(DEFAULT_DB_ALIAS, {})
+        sampler = Sampler(interval=0.01)
+        sampler.start()
+        try:
+            samples, errors, elapsed = asyncio.run(self._load(clients, options))
+        finally:
+            sampler.stopped.set()
+            sampler.join()
+        after = pool.stats().get(DEFAULT_DB_ALIAS, {})
+
+        queued = after.get("queued", 0) - before.get("queued", 0)
+        wait_ms = after.get("wait_ms", 0) - before.get("wait_ms", 0)
+        avg_wait = f"{wait_ms / queued:.1f}" if queued else "-"
+        pooled = sampler.checked_out if after else "-"
+        waiting = sampler.waiting if after else "-"
+        self.stdout.write(
+            f"{clients:>7} {len(samples) / elapsed:>7.0f} "
+            f"{percentile(samples, 50):>8.1f} {percentile(samples, 99):>8.1f} "
+            f"{errors:>6} {sampler.connections:>12} {pooled:>11} {waiting:>7} "
+            f"{avg_wait:>11}"
+        )
+
+    async def _load(self, clients, options):
+        """Latencies (ms), failed requests and wall time (s) of one level"""
+        handler = ASGIHandler()
+        query = f"ms={options['query_ms']}".encode()
+        samples = []
+        errors = 0
+
+        async def run_client():
+            nonlocal errors
+            for _ in range(options["requests"]):
+                started = time.perf_counter()
+                status = await self._get(handler, "/probe/", query)
+                samples.append((time.perf_counter() - started) * 1000)
+                errors += status != 200
+
+        started = time.perf_counter()
+        await asyncio.gather(*(run_client() for _ in range(clients)))
+        return samples, errors, time.perf_counter() - started
+
+    async def _get(self, handler, url, query):
+        """
+        Status of a GET through the ASGI handler, as daphne would send it
+        (AsyncClient runs every sync view on one thread instead)
+        """
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": url,
+            "raw_path": url.encode(),
+            "query_string": query,
+            "headers": [(b"host", b"localhost")],
+            "client": ("127.0.0.1", 0),
+            "server": ("localhost", 80),
+        }
+        body_sent = False
+        status = None
+
+        async def receive():
+            nonlocal body_sent
+            if body_sent:
+                # The client stays connected until the response is sent
+                await asyncio.Future()
+            body_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        await handler(scope, receive, send)
+        return status
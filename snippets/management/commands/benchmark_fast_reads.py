@@ -0,0 +1,121 @@
+# snippets/management/commands/benchmark_fast_reads.py
+
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from snippets.highlight import rendered_fields
+from snippets.models import Book, Chapter, Section, Snippet
+from snippets.rows import row_mapper
+from snippets.serializers import SnippetSerializer
+
+from .benchmark_code_search import SEED_LINES
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare building snippet responses with SnippetSerializer vs the "
+        "values() fast path (snippets.rows), per 1k rows"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1000)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument(
+            "--highlight", action="store_true", help="Include code_html"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                section_id = self._seed(options["rows"])
+                self._run(section_id, options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _seed(self, count):
+        author = get_user_model().objects.order_by("id").first()
+        book = Book.objects.create(title=f"Benchmark {time.time()}")
+        chapter = Chapter.objects.create(book=book, title="Benchmark", order=1)
+        section = Section.objects.create(chapter=chapter, title="Benchmark", order=1)
+        rng = random.Random(0)
+        snippets = []
+        for n in range(count):
+            code = "\n".join(rng.choices(SEED_LINES, k=rng.randint(5, 40)))
+            snippets.append(
+                Snippet(
+                    section=section,
+                    title=f"Snippet {n}",
+                    code=code,
+                    explanation="Explains the code",
+                    order=n + 1,
+                    is_published=True,
+                    created_by=author,
+                    **rendered_fields(code, "python"),
+                )
+            )
+        Snippet.objects.bulk_create(snippets, batch_size=2000)
+        return section.id
+
+    def _time(self, function, repeat):
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            function()
+            samples.append((time.perf_counter() - started) * 1000)
+        return statistics.median(samples)
+
+    def _run(self, section_id, options):
+        query = {"highlight": "1"} if options["highlight"] else {}
+        request = Request(APIRequestFactory().get("/", query))
+        context = {"request": request}
+        queryset = Snippet.objects.filter(section_id=section_id).order_by("order")
+        if not options["highlight"]:
+            queryset = queryset.defer("code_html")
+        mapper = row_mapper(SnippetSerializer, request)
+        rows = options["rows"]
+        per_1k = 1000 / rows
+
+        instances = list(queryset.select_related("created_by"))
+        values = list(queryset.values(*mapper.columns))
+        if SnippetSerializer(instances, many=True, context=context).data != (
+            mapper.many(values)
+        ):
+            self.stderr.write("Fast path output differs from the serializer")
+
+        timings = {
+            "serializer: build": lambda: SnippetSerializer(
+                instances, many=True, context=context
+            ).data,
+            "fast path: build": lambda: mapper.many(values),
+            "serializer: query + build": lambda: SnippetSerializer(
+                queryset.select_related("created_by"), many=True, context=context
+            ).data,
+            "fast path: query + build": lambda: mapper.many(
+                queryset.values(*mapper.columns)
+            ),
+        }
+        results = {
+            name: self._time(function, options["repeat"])
+            for name, function in timings.items()
+        }
+
+        self.stdout.write(f"{rows} snippets, p50 of {options['repeat']} runs")
+        for name, ms in results.items():
+            self.stdout.write(
+                f"{name:>26}  {ms:8.2f}ms  ({ms * per_1k:7.2f}ms per 1k rows)"
+            )
+        for step in ("build", "query + build"):
+            speedup = results[f"serializer: {step}"] / results[f"fast path: {step}"]
+            self.stdout.write(f"Speedup ({step}): {speedup:.1f}x")
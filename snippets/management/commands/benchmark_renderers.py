@@ -0,0 +1,127 @@
+# snippets/management/commands/benchmark_renderers.py
+
+import json
+import random
+import statistics
+import time
+
+import cbor2
+import msgpack
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from accounts import renderers
+from snippets.highlight import rendered_fields
+from snippets.models import Book, Chapter, Section, Snippet
+from snippets.serializers import SectionDetailSerializer
+
+from .benchmark_code_search import SEED_LINES
+
+RENDERERS = [
+    ("json (stock)", JSONRenderer(), json.loads),
+    (
+        f"json ({renderers.json_backend})",
+        renderers.FastJSONRenderer(),
+        json.loads,
+    ),
+    ("msgpack", renderers.MessagePackRenderer(), msgpack.unpackb),
+    ("cbor", renderers.CBORRenderer(), cbor2.loads),
+]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Compare encode time and payload size of the API renderers on sections"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sections",
+            type=int,
+            default=3,
+            help="Benchmark the N sections with the most snippets",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Benchmark a synthetic section of N snippets (rolled back)",
+        )
+        parser.add_argument(
+            "--highlight", action="store_true", help="Include code_html"
+        )
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                if options["seed"]:
+                    sections = [self._seed(options["seed"])]
+                else:
+                    sections = list(
+                        Section.objects.annotate(count=Count("snippets"))
+                        .filter(count__gt=0)
+                        .order_by("-count")
+                        .values_list("id", flat=True)[: options["sections"]]
+                    )
+                if not sections:
+                    raise CommandError("No sections with snippets, try --seed")
+                for section_id in sections:
+                    self._run(section_id, options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _seed(self, count):
+        book = Book.objects.create(title=f"Benchmark {time.time()}")
+        chapter = Chapter.objects.create(book=book, title="Benchmark", order=1)
+        section = Section.objects.create(chapter=chapter, title="Benchmark", order=1)
+        rng = random.Random(0)
+        snippets = []
+        for n in range(count):
+            code = "\n".join(rng.choices(SEED_LINES, k=rng.randint(5, 40)))
+            snippets.append(
+                Snippet(
+                    section=section,
+                    title=f"Snippet {n}",
+                    code=code,
+                    language="python",
+                    explanation="Explains the code — with “quotes” and ünïcode. " * 3,
+                    order=n + 1,
+                    is_published=True,
+                    **rendered_fields(code, "python"),
+                )
+            )
+        Snippet.objects.bulk_create(snippets, batch_size=2000)
+        return section.id
+
+    def _run(self, section_id, options):
+        query = {"highlight": "1"} if options["highlight"] else {}
+        request = Request(APIRequestFactory().get("/", query))
+        section = Section.objects.prefetch_related(
+            "snippets", "snippets__created_by"
+        ).get(id=section_id)
+        data = SectionDetailSerializer(section, context={"request": request}).data
+        self.stdout.write(
+            f"Section {section_id}: {len(section.snippets.all())} snippets"
+        )
+
+        expected = json.loads(JSONRenderer().render(data))
+        for name, renderer, decode in RENDERERS:
+            samples = []
+            for _ in range(options["repeat"]):
+                started = time.perf_counter()
+                payload = renderer.render(data)
+                samples.append((time.perf_counter() - started) * 1000)
+            if decode(payload) != expected:
+                self.stderr.write(f"{name}: decoded payload differs from JSON")
+            self.stdout.write(
+                f"{name:>16}  p50={statistics.median(samples):8.3f}ms  "
+                f"max={max(samples):8.3f}ms  size={len(payload):>9} bytes"
+            )
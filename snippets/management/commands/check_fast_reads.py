@@ -0,0 +1,178 @@
+# snippets/management/commands/check_fast_reads.py
+
+import time
+from urllib.parse import parse_qsl, urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+from django.test.utils import override_settings
+from django.urls import resolve, reverse
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from snippets.highlight import rendered_fields
+from snippets.models import Book, Chapter, Section, Snippet
+from snippets.response_cache import book_id_for, bump_book
+
+# Snippets per seeded section: empty, single, several pages
+SEED_SECTIONS = [0, 1, 7, 130]
+
+# Requests made here cache object -> book mappings and users under the ids
+# of rows that get rolled back (and reused): they go to a private cache
+PRIVATE_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "check-fast-reads",
+    }
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Check that the fast read path (FAST_READ_PATH) renders byte-for-byte "
+        "the same responses as the serializers"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sections",
+            type=int,
+            default=5,
+            help="Also check the N existing sections with the most snippets",
+        )
+        parser.add_argument("--page-size", type=int, default=50)
+        parser.add_argument(
+            "--no-seed",
+            action="store_true",
+            help="Only check existing sections, without seeding edge cases",
+        )
+
+    def handle(self, *args, **options):
+        self.page_size = options["page_size"]
+        try:
+            with override_settings(CACHES=PRIVATE_CACHES), transaction.atomic():
+                sections = []
+                if not options["no_seed"]:
+                    sections += self._seed()
+                sections += (
+                    Section.objects.annotate(count=Count("snippets"))
+                    .order_by("-count")
+                    .values_list("id", flat=True)[: options["sections"]]
+                )
+                mismatches = self._check(list(dict.fromkeys(sections)))
+                raise Rollback
+        except Rollback:
+            pass
+
+        if mismatches:
+            raise CommandError(f"{mismatches} responses differ")
+        self.stdout.write(self.style.SUCCESS("Fast read path matches the serializers"))
+
+    def _seed(self):
+        """Sections covering the edge cases: unpublished rows, no author..."""
+        author = get_user_model().objects.order_by("id").first()
+        book = Book.objects.create(title=f"Fast reads {time.time()}", is_published=True)
+        chapter = Chapter.objects.create(
+            book=book, title="Fast reads", order=1, is_published=True
+        )
+        sections = []
+        for number, count in enumerate(SEED_SECTIONS, 1):
+            section = Section.objects.create(
+                chapter=chapter,
+                title=f"Section “{number}”",
+                order=number,
+                is_published=number != 2,
+            )
+            snippets = []
+            for n in range(count):
+                code = f"def f_{n}():\n    return '{n} ü  '\n" * (n % 5 + 1)
+                language = ["python", "rust", "other"][n % 3]
+                snippets.append(
+                    Snippet(
+                        section=section,
+                        title=f"Snippet {n} <b>",
+                        code=code,
+                        language=language,
+                        explanation="" if n % 4 else "Explained — “quoted”",
+                        order=n + 1 + (n % 3) * 0.25,
+                        is_published=n % 3 != 1,
+                        created_by=author if n % 2 else None,
+                        **rendered_fields(code, language),
+                    )
+                )
+            Snippet.objects.bulk_create(snippets)
+            sections.append(section.id)
+        return sections
+
+    def _get(self, path, query, user, fast):
+        """Rendered response of a GET, bypassing the response cache"""
+        match = resolve(path)
+        section_id = match.kwargs.get("id", match.kwargs.get("section_id"))
+        book_id = book_id_for(Section, section_id)
+        if book_id is not None:
+            bump_book(book_id)
+
+        # Pagination links are absolute: the host must be an allowed one
+        request = APIRequestFactory(SERVER_NAME="localhost").get(path, query)
+        force_authenticate(request, user=user)
+        with override_settings(FAST_READ_PATH=fast):
+            response = match.func(request, *match.args, **match.kwargs)
+            response.render()
+        return response
+
+    def _compare(self, label, path, query, user):
+        """Compare one response; returns the next page's query, if any"""
+        slow = self._get(path, query, user, fast=False)
+        fast = self._get(path, query, user, fast=True)
+        if (slow.status_code, slow.content) != (fast.status_code, fast.content):
+            self.stdout.write(self.style.ERROR(f"DIFF  {label}"))
+            self.stdout.write(
+                f"  serializers: {slow.status_code} {slow.content[:300]!r}"
+            )
+            self.stdout.write(
+                f"  fast:        {fast.status_code} {fast.content[:300]!r}"
+            )
+            return None, 1
+        next_url = slow.data.get("next") if slow.status_code == 200 else None
+        return next_url, 0
+
+    def _check(self, sections):
+        User = get_user_model()
+        users = [
+            User(username="fast-reads-admin", role="admin"),
+            User(username="fast-reads-user", role="user"),
+        ]
+        mismatches = 0
+        checked = 0
+        for section_id in sections:
+            for user in users:
+                for highlight in ({}, {"highlight": "1"}):
+                    variant = f"{user.role}, html" if highlight else user.role
+                    label = f"section {section_id} ({variant})"
+                    path = reverse("snippets:section_detail", kwargs={"id": section_id})
+                    _, failed = self._compare(f"{label} detail", path, highlight, user)
+                    mismatches += failed
+                    checked += 1
+
+                    path = reverse(
+                        "snippets:snippet_list", kwargs={"section_id": section_id}
+                    )
+                    query = {**highlight, "page_size": self.page_size}
+                    page = 1
+                    while query is not None:
+                        next_url, failed = self._compare(
+                            f"{label} list page {page}", path, query, user
+                        )
+                        mismatches += failed
+                        checked += 1
+                        query = None
+                        if next_url:
+                            query = dict(parse_qsl(urlsplit(next_url).query))
+                            page += 1
+        self.stdout.write(f"Compared {checked} responses in {len(sections)} sections")
+        return mismatches
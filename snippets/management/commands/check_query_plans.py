@@ -0,0 +1,251 @@
+# snippets/management/commands/check_query_plans.py
+
+import json
+import re
+import time
+import uuid
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import resolve, reverse
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from snippets.models import Book, Chapter, Section, Snippet
+
+# Read endpoints of snippets/views.py: (URL name, URL kwarg -> seeded
+# object, query string). Code search is left out: on SQLite its first
+# request builds the in-memory index, which reads every snippet by design.
+ENDPOINTS = [
+    ("book_list", {}, {}),
+    ("book_detail", {"id": "book"}, {}),
+    ("book_toc", {"id": "book"}, {}),
+    ("chapter_list", {"book_id": "book"}, {}),
+    ("chapter_detail", {"id": "chapter"}, {}),
+    ("section_list", {"chapter_id": "chapter"}, {}),
+    ("section_detail", {"id": "section"}, {}),
+    ("snippet_list", {"section_id": "section"}, {}),
+    ("snippet_detail", {"id": "snippet"}, {}),
+    ("snippet_detail", {"id": "snippet"}, {"highlight": "1"}),
+    ("snippet_search", {}, {"q": "total"}),
+]
+
+# Scans that are the point of the query: the book list reads every
+# visible book (chapter counts, validators over the whole list)
+ALLOWED_SCANS = {
+    ("book_list", "snippets_book"),
+    ("book_list", "snippets_chapter"),
+}
+
+# SQLite reads every row of a table (or walks a whole index of it) for
+# "SCAN <table or alias>"; FTS5 lookups show up as "SCAN ... VIRTUAL TABLE"
+SQLITE_SCAN = re.compile(r"^SCAN (\w+)(?: USING (?:COVERING )?INDEX \w+)?$")
+
+# Aliases Django gives repeated tables in joins ("snippets_book" T4)
+TABLE_ALIAS = re.compile(r'"(\w+)" (T\d+)\b')
+
+# Requests made here cache object -> book mappings and users under the ids
+# of rows that get rolled back (and reused): they go to a private cache
+PRIVATE_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "check-query-plans",
+    }
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN every query of the snippets read endpoints against a large "
+        "seeded dataset and fail if any does a sequential scan"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--books", type=int, default=20)
+        parser.add_argument("--chapters", type=int, default=20, help="Per book")
+        parser.add_argument("--sections", type=int, default=10, help="Per chapter")
+        parser.add_argument("--snippets", type=int, default=25, help="Per section")
+        parser.add_argument(
+            "--no-seed",
+            action="store_true",
+            help="Check against the existing data instead of seeding",
+        )
+        parser.add_argument(
+            "--verbose-plans", action="store_true", help="Print every plan"
+        )
+
+    def handle(self, *args, **options):
+        self.verbose = options["verbose_plans"]
+        try:
+            with override_settings(CACHES=PRIVATE_CACHES), transaction.atomic():
+                if not options["no_seed"]:
+                    self._seed(options)
+                # Fresh statistics, so the planner sees the seeded sizes
+                with connection.cursor() as cursor:
+                    cursor.execute("ANALYZE")
+                failures = self._check()
+                raise Rollback
+        except Rollback:
+            pass
+
+        if failures:
+            raise CommandError(f"{len(failures)} queries with sequential scans")
+        self.stdout.write(self.style.SUCCESS("No sequential scans"))
+
+    # ==================== DATA ====================
+    def _seed(self, options):
+        started = time.perf_counter()
+        prefix = f"Query plans {uuid.uuid4().hex[:8]}"
+        books = Book.objects.bulk_create(
+            Book(title=f"{prefix} {n}", is_published=n % 2 == 0)
+            for n in range(options["books"])
+        )
+        chapters = self._seed_children(Chapter, "book", books, options["chapters"])
+        sections = self._seed_children(
+            Section, "chapter", chapters, options["sections"]
+        )
+        snippets = self._seed_children(
+            Snippet,
+            "section",
+            sections,
+            options["snippets"],
+            code="total = sum(item.price for item in items)",
+        )
+        self.stdout.write(
+            f"Seeded {len(books)} books, {len(chapters)} chapters, "
+            f"{len(sections)} sections, {len(snippets)} snippets "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+
+    def _seed_children(self, model, parent_field, parents, count, **fields):
+        """count children per parent, every other one published"""
+        return model.objects.bulk_create(
+            (
+                model(
+                    **{parent_field: parent},
+                    title=f"{model._meta.verbose_name} {n}",
+                    order=n + 1,
+                    is_published=n % 2 == 0,
+                    **fields,
+                )
+                for parent in parents
+                for n in range(count)
+            ),
+            batch_size=2000,
+        )
+
+    def _targets(self):
+        """A published object at each level, with published children"""
+        snippet = (
+            Snippet.objects.filter(
+                is_published=True,
+                section__is_published=True,
+                section__chapter__is_published=True,
+                section__chapter__book__is_published=True,
+            )
+            .select_related("section__chapter")
+            .order_by("-id")
+            .first()
+        )
+        if snippet is None:
+            raise CommandError("No published snippet in a published book")
+        return {
+            "book": snippet.section.chapter.book_id,
+            "chapter": snippet.section.chapter_id,
+            "section": snippet.section_id,
+            "snippet": snippet.id,
+        }
+
+    # ==================== PLANS ====================
+    def _check(self):
+        User = get_user_model()
+        users = [
+            User(username="query-plans-admin", role="admin"),
+            User(username="query-plans-user", role="user"),
+        ]
+        tables = {
+            model._meta.db_table
+            for model in apps.get_app_config("snippets").get_models()
+        }
+        targets = self._targets()
+        # Pagination links are absolute: the host must be an allowed one
+        factory = APIRequestFactory(SERVER_NAME="localhost")
+        failures = []
+
+        for name, url_kwargs, query in ENDPOINTS:
+            path = reverse(
+                f"snippets:{name}",
+                kwargs={kwarg: targets[level] for kwarg, level in url_kwargs.items()},
+            )
+            for user in users:
+                # A query string of its own bypasses the response cache
+                request = factory.get(path, {**query, "plans": uuid.uuid4().hex})
+                force_authenticate(request, user=user)
+                match = resolve(path)
+                with CaptureQueriesContext(connection) as queries:
+                    response = match.func(request, *match.args, **match.kwargs)
+                if response.status_code != 200:
+                    raise CommandError(f"{path} as {user.role}: {response.status_code}")
+
+                selects = [
+                    captured["sql"]
+                    for captured in queries.captured_queries
+                    if captured["sql"].lstrip().upper().startswith("SELECT")
+                ]
+                scanned = []
+                for sql in selects:
+                    plan, scans = self._explain(sql)
+                    scans = [
+                        table
+                        for table in scans
+                        if table in tables and (name, table) not in ALLOWED_SCANS
+                    ]
+                    if scans:
+                        scanned.append((sql, plan, scans))
+                    elif self.verbose:
+                        self.stdout.write(f"{sql}\n{plan}\n")
+
+                label = f"{name} ({user.role}){' ?' + '&'.join(query) if query else ''}"
+                if not scanned:
+                    self.stdout.write(f"OK    {label}: {len(selects)} queries")
+                    continue
+                failures.extend(scanned)
+                self.stdout.write(self.style.ERROR(f"SCAN  {label}"))
+                for sql, plan, scans in scanned:
+                    self.stdout.write(f"  {', '.join(scans)}: {sql}\n{plan}\n")
+        return failures
+
+    def _explain(self, sql):
+        """Readable plan of sql and the tables it reads sequentially"""
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                nodes = [plan[0]["Plan"]]
+                scans = []
+                while nodes:
+                    node = nodes.pop()
+                    if node["Node Type"] == "Seq Scan":
+                        scans.append(node["Relation Name"])
+                    nodes.extend(node.get("Plans", []))
+                cursor.execute(f"EXPLAIN {sql}")
+                text = "\n".join(f"    {row[0]}" for row in cursor.fetchall())
+                return text, scans
+
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            details = [row[-1] for row in cursor.fetchall()]
+            aliases = {alias: table for table, alias in TABLE_ALIAS.findall(sql)}
+            scans = [
+                aliases.get(match.group(1), match.group(1))
+                for match in map(SQLITE_SCAN.match, details)
+                if match is not None
+            ]
+            return "\n".join(f"    {detail}" for detail in details), scans
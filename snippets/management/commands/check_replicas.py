@@ -0,0 +1,116 @@
+# snippets/management/commands/check_replicas.py
+
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, transaction
+from django.http import JsonResponse
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from config import replicas
+from snippets.models import Book
+
+
+def probe(request):
+    """Where this request reads books from (after a write with ?write)"""
+    if "write" in request.GET:
+        # Goes through the router like any write, changes nothing
+        Book.objects.filter(id=-1).update(title="")
+    if "primary" in request.GET:
+        with replicas.use_primary():
+            return JsonResponse({"reads": Book.objects.all().db})
+    queryset = Book.objects.all()
+    queryset.exists()
+    return JsonResponse({"reads": queryset.db})
+
+
+class Command(BaseCommand):
+    help = (
+        "Health of the read replicas (DATABASE_URL_REPLICA_*) and a check "
+        "of which database each kind of request reads from"
+    )
+
+    def handle(self, *args, **options):
+        aliases = replicas.replica_aliases()
+        if not aliases:
+            raise CommandError("No replicas: set DATABASE_URL_REPLICA_<NAME>")
+
+        healthy = []
+        for alias in aliases:
+            try:
+                lag = replicas.replication_lag(alias)
+            except DatabaseError as e:
+                self.stdout.write(self.style.ERROR(f"{alias}: unreachable ({e})"))
+                continue
+            if lag > settings.REPLICA_MAX_LAG:
+                self.stdout.write(self.style.WARNING(f"{alias}: {lag:.1f}s behind"))
+                continue
+            self.stdout.write(f"{alias}: ok, {lag:.1f}s behind")
+            healthy.append(alias)
+        if not healthy:
+            raise CommandError("No healthy replica to route reads to")
+
+        failures = self._check_routing(healthy)
+        if failures:
+            raise CommandError(f"{failures} routing checks failed")
+        self.stdout.write(self.style.SUCCESS("Reads and writes are routed as expected"))
+
+    def _request(self, method="get", query=None, cookies=None):
+        """Database the probe view read from, and the response"""
+        request = getattr(RequestFactory(), method)("/", query or {})
+        request.COOKIES.update(cookies or {})
+        response = replicas.ReplicaMiddleware(probe)(request)
+        return json.loads(response.content)["reads"], response
+
+    def _check_routing(self, healthy):
+        replicas._health.clear()
+        pinned = {replicas.PIN_COOKIE: "1"}
+        failures = 0
+
+        def expect(label, reads, allowed):
+            nonlocal failures
+            ok = reads in allowed
+            failures += not ok
+            line = f"{label}: reads from {reads}"
+            self.stdout.write(line if ok else self.style.ERROR(f"{line} (FAIL)"))
+
+        reads, response = self._request()
+        expect("GET", reads, healthy)
+        if replicas.PIN_COOKIE in response.cookies:
+            failures += 1
+            self.stdout.write(self.style.ERROR("GET pinned the client (FAIL)"))
+
+        reads, response = self._request(query={"write": 1})
+        expect("GET that writes first", reads, [DEFAULT_DB_ALIAS])
+        if replicas.PIN_COOKIE not in response.cookies:
+            failures += 1
+            self.stdout.write(self.style.ERROR("Write did not pin the client (FAIL)"))
+
+        reads, response = self._request("post")
+        expect("POST", reads, [DEFAULT_DB_ALIAS])
+        if replicas.PIN_COOKIE not in response.cookies:
+            failures += 1
+            self.stdout.write(self.style.ERROR("POST did not pin the client (FAIL)"))
+
+        reads, _ = self._request(cookies=pinned)
+        expect("GET pinned after a write", reads, [DEFAULT_DB_ALIAS])
+
+        reads, _ = self._request(query={"primary": 1})
+        expect("GET in use_primary()", reads, [DEFAULT_DB_ALIAS])
+
+        with transaction.atomic():
+            reads, _ = self._request()
+        expect("GET in a transaction", reads, [DEFAULT_DB_ALIAS])
+
+        # Every replica over the lag limit: left out at the next check
+        replicas._health.clear()
+        with override_settings(REPLICA_MAX_LAG=-1):
+            reads, _ = self._request()
+        expect("GET with all replicas lagging", reads, [DEFAULT_DB_ALIAS])
+        replicas._health.clear()
+
+        reads, _ = self._request()
+        expect("GET after they recover", reads, healthy)
+        return failures
@@ -0,0 +1,31 @@
+# snippets/management/commands/export_book.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from snippets.models import Book
+from snippets.transfer import export_book
+
+
+class Command(BaseCommand):
+    help = "Export a book with its chapters, sections and snippets as NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("book", help="Book title or id")
+        parser.add_argument(
+            "-o", "--output", help="File to write (default: standard output)"
+        )
+
+    def handle(self, *args, **options):
+        lookup = {"title": options["book"]}
+        if options["book"].isdigit():
+            lookup = {"id": int(options["book"])}
+        book = Book.objects.select_related("created_by").filter(**lookup).first()
+        if book is None:
+            raise CommandError(f"Book {options['book']!r} not found")
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as output:
+                output.writelines(export_book(book))
+        else:
+            for line in export_book(book):
+                self.stdout.write(line, ending="")
@@ -0,0 +1,48 @@
+# snippets/management/commands/import_book.py
+
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from snippets.transfer import TransferError, import_book
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a book exported with export_book. Existing rows (same book "
+        "title, parent and order) are skipped, so an interrupted import can "
+        "be run again to resume it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="NDJSON file, or - for standard input")
+        parser.add_argument(
+            "--user",
+            help="Username set as author when the exported one doesn't exist",
+        )
+
+    def handle(self, *args, **options):
+        user = None
+        if options["user"]:
+            user = get_user_model().objects.filter(username=options["user"]).first()
+            if user is None:
+                raise CommandError(f"User {options['user']!r} not found")
+
+        try:
+            if options["path"] == "-":
+                result = import_book(sys.stdin, user=user)
+            else:
+                with open(options["path"], encoding="utf-8") as lines:
+                    result = import_book(lines, user=user)
+        except (OSError, TransferError) as e:
+            raise CommandError(str(e))
+
+        book = result.pop("book")
+        state = "created" if book["created"] else "existing"
+        self.stdout.write(f"Book {book['title']!r} (id {book['id']}, {state})")
+        for level, counts in result.items():
+            self.stdout.write(
+                f"  {level}: {counts['created']} created, {counts['existing']} existing"
+            )
+        self.stdout.write(self.style.SUCCESS("Import finished"))
@@ -0,0 +1,80 @@
+# snippets/management/commands/render_snippets.py
+
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from snippets.highlight import render_batch
+from snippets.models import Snippet
+from snippets.signals import bulk_changed
+
+RENDERED_FIELDS = ["code_html", "line_count", "code_size", "updated_at"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Render highlighted HTML and line/size metadata of snippets in "
+        "parallel (by default only snippets that were never rendered)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all", action="store_true", help="Re-render every snippet"
+        )
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument("--batch-size", type=int, default=200)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        queryset = Snippet.objects.order_by("id")
+        if not options["all"]:
+            queryset = queryset.filter(code_html="")
+        ids = list(queryset.values_list("id", flat=True))
+        if not ids:
+            self.stdout.write("Nothing to render")
+            return
+
+        batch_size = options["batch_size"]
+        workers = max(1, options["workers"])
+        # Workers only render; "spawn" keeps them away from this process's
+        # database connections
+        context = multiprocessing.get_context("spawn")
+        rendered = 0
+        with ProcessPoolExecutor(workers, mp_context=context) as pool:
+            # At most two batches per worker in flight: bounded memory
+            in_flight = deque()
+            for start in range(0, len(ids), batch_size):
+                rows = list(
+                    Snippet.objects.filter(
+                        id__in=ids[start : start + batch_size]
+                    ).values_list("id", "section_id", "code", "language")
+                )
+                in_flight.append(pool.submit(render_batch, rows))
+                if len(in_flight) >= 2 * workers:
+                    rendered += self._save(in_flight.popleft().result())
+            while in_flight:
+                rendered += self._save(in_flight.popleft().result())
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rendered {rendered} snippets with {workers} workers "
+                f"in {time.perf_counter() - started:.2f}s"
+            )
+        )
+
+    def _save(self, results):
+        now = timezone.now()
+        objects = [
+            Snippet(pk=snippet_id, updated_at=now, **fields)
+            for snippet_id, _, fields in results
+        ]
+        with transaction.atomic():
+            Snippet.objects.bulk_update(objects, RENDERED_FIELDS)
+            bulk_changed(Snippet, {section_id for _, section_id, _ in results})
+        return len(objects)
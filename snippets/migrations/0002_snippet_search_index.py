@@ -0,0 +1,82 @@
+# Full-text search index for snippets: a generated tsvector column with a
+# GIN index on PostgreSQL, an external-content FTS5 table kept in sync by
+# triggers on SQLite. Other databases fall back to icontains search.
+
+from django.db import migrations
+
+from snippets.vendor_sql import run_for_vendor
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE snippets_snippet ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A')
+        || setweight(to_tsvector('simple', coalesce(explanation, '')), 'B')
+        || setweight(to_tsvector('simple', coalesce(code, '')), 'C')
+    ) STORED
+    """,
+    """
+    CREATE INDEX snippets_snippet_search_idx
+    ON snippets_snippet USING GIN (search_vector)
+    """,
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS snippets_snippet_search_idx",
+    "ALTER TABLE snippets_snippet DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE snippets_snippet_fts USING fts5(
+        title, explanation, code,
+        content='snippets_snippet', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER snippets_snippet_fts_insert AFTER INSERT ON snippets_snippet
+    BEGIN
+        INSERT INTO snippets_snippet_fts(rowid, title, explanation, code)
+        VALUES (new.id, new.title, new.explanation, new.code);
+    END
+    """,
+    """
+    CREATE TRIGGER snippets_snippet_fts_delete AFTER DELETE ON snippets_snippet
+    BEGIN
+        INSERT INTO snippets_snippet_fts(snippets_snippet_fts, rowid, title, explanation, code)
+        VALUES ('delete', old.id, old.title, old.explanation, old.code);
+    END
+    """,
+    """
+    CREATE TRIGGER snippets_snippet_fts_update AFTER UPDATE ON snippets_snippet
+    BEGIN
+        INSERT INTO snippets_snippet_fts(snippets_snippet_fts, rowid, title, explanation, code)
+        VALUES ('delete', old.id, old.title, old.explanation, old.code);
+        INSERT INTO snippets_snippet_fts(rowid, title, explanation, code)
+        VALUES (new.id, new.title, new.explanation, new.code);
+    END
+    """,
+    "INSERT INTO snippets_snippet_fts(snippets_snippet_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS snippets_snippet_fts_insert",
+    "DROP TRIGGER IF EXISTS snippets_snippet_fts_delete",
+    "DROP TRIGGER IF EXISTS snippets_snippet_fts_update",
+    "DROP TABLE IF EXISTS snippets_snippet_fts",
+]
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("snippets", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_for_vendor({"postgresql": POSTGRES_FORWARD, "sqlite": SQLITE_FORWARD}),
+            run_for_vendor(
+                {"postgresql": POSTGRES_BACKWARD, "sqlite": SQLITE_BACKWARD}
+            ),
+        ),
+    ]
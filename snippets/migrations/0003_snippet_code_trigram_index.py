@@ -0,0 +1,33 @@
+# Trigram index for substring search in snippet code on PostgreSQL.
+# Built over UPPER(code), the expression Django's icontains lookup
+# compares, so plain code__icontains filters can use it.
+# SQLite uses the in-process index in snippets/code_search.py instead.
+
+from django.db import migrations
+
+from snippets.vendor_sql import run_for_vendor
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    CREATE INDEX snippets_snippet_code_trgm_idx
+    ON snippets_snippet USING GIN (UPPER(code) gin_trgm_ops)
+    """,
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS snippets_snippet_code_trgm_idx",
+]
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("snippets", "0002_snippet_search_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_for_vendor({"postgresql": POSTGRES_FORWARD}),
+            run_for_vendor({"postgresql": POSTGRES_BACKWARD}),
+        ),
+    ]
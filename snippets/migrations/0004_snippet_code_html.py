@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("snippets", "0003_snippet_code_trigram_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="snippet",
+            name="code_html",
+            field=models.TextField(
+                blank=True, editable=False, help_text="Syntax-highlighted code"
+            ),
+        ),
+        migrations.AddField(
+            model_name="snippet",
+            name="line_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="snippet",
+            name="code_size",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="Size of the code in bytes (UTF-8)",
+            ),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 6.0.1 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("snippets", "0004_snippet_code_html"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(
+                condition=models.Q(("is_published", True)),
+                fields=["title"],
+                name="book_published_title_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="chapter",
+            index=models.Index(
+                condition=models.Q(("is_published", True)),
+                fields=["book", "order", "id"],
+                name="chapter_published_order_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="section",
+            index=models.Index(
+                condition=models.Q(("is_published", True)),
+                fields=["chapter", "order", "id"],
+                name="section_published_order_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="snippet",
+            index=models.Index(
+                condition=models.Q(("is_published", True)),
+                fields=["section", "order", "id"],
+                name="snippet_published_order_idx",
+            ),
+        ),
+    ]
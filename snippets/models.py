@@ -21,6 +21,14 @@ class Book(models.Model):
 
     class Meta:
         ordering = ["title"]
+        indexes = [
+            # Book list for regular users: published books by title
+            models.Index(
+                fields=["title"],
+                condition=models.Q(is_published=True),
+                name="book_published_title_idx",
+            ),
+        ]
         verbose_name = "Book"
         verbose_name_plural = "Books"
 
@@ -28,9 +36,32 @@ class Book(models.Model):
         return self.title
 
 
-class Chapter(models.Model):
+class Child(models.Model):
+    """
+    Chapter, section or snippet: remembers the parent it was loaded with,
+    so saving it can tell a move without reading the row again
+    """
+
+    # Attname of the foreign key to the parent
+    parent_field = None
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Not set when the parent was deferred
+        if cls.parent_field in instance.__dict__:
+            instance._loaded_parent_id = instance.__dict__[cls.parent_field]
+        return instance
+
+
+class Chapter(Child):
     """Chapter in a book (e.g., 'Chapter 3: Common Programming Concepts')"""
 
+    parent_field = "book_id"
+
     book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name="chapters")
     title = models.CharField(max_length=255)
     order = models.FloatField(
@@ -43,6 +74,14 @@ class Chapter(models.Model):
     class Meta:
         ordering = ["book", "order"]
         unique_together = ["book", "order"]
+        indexes = [
+            # Published children of a book in keyset order ("order", "id")
+            models.Index(
+                fields=["book", "order", "id"],
+                condition=models.Q(is_published=True),
+                name="chapter_published_order_idx",
+            ),
+        ]
         verbose_name = "Chapter"
         verbose_name_plural = "Chapters"
 
@@ -50,9 +89,11 @@ class Chapter(models.Model):
         return f"{self.book.title} - Chapter {self.order}: {self.title}"
 
 
-class Section(models.Model):
+class Section(Child):
     """Section in a chapter (e.g., 'Section 3.1: Variables and Mutability')"""
 
+    parent_field = "chapter_id"
+
     chapter = models.ForeignKey(
         Chapter, on_delete=models.CASCADE, related_name="sections"
     )
@@ -67,6 +108,14 @@ class Section(models.Model):
     class Meta:
         ordering = ["chapter", "order"]
         unique_together = ["chapter", "order"]
+        indexes = [
+            # Published children of a chapter in keyset order ("order", "id")
+            models.Index(
+                fields=["chapter", "order", "id"],
+                condition=models.Q(is_published=True),
+                name="section_published_order_idx",
+            ),
+        ]
         verbose_name = "Section"
         verbose_name_plural = "Sections"
 
@@ -74,7 +123,7 @@ class Section(models.Model):
         return f"{self.chapter} - Section {self.order}: {self.title}"
 
 
-class Snippet(models.Model):
+class Snippet(Child):
     """Code snippet with explanation"""
 
     LANGUAGE_CHOICES = [
@@ -92,6 +141,8 @@ class Snippet(models.Model):
         ("other", "Other"),
     ]
 
+    parent_field = "section_id"
+
     section = models.ForeignKey(
         Section, on_delete=models.CASCADE, related_name="snippets"
     )
@@ -113,12 +164,28 @@ class Snippet(models.Model):
         null=True,
         related_name="snippets",
     )
+    # Rendered from code/language on save (snippets.highlight)
+    code_html = models.TextField(
+        blank=True, editable=False, help_text="Syntax-highlighted code"
+    )
+    line_count = models.PositiveIntegerField(default=0, editable=False)
+    code_size = models.PositiveIntegerField(
+        default=0, editable=False, help_text="Size of the code in bytes (UTF-8)"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["section", "order"]
         unique_together = ["section", "order"]
+        indexes = [
+            # Published children of a section in keyset order ("order", "id")
+            models.Index(
+                fields=["section", "order", "id"],
+                condition=models.Q(is_published=True),
+                name="snippet_published_order_idx",
+            ),
+        ]
         verbose_name = "Snippet"
         verbose_name_plural = "Snippets"
 
@@ -0,0 +1,247 @@
+# snippets/ordering.py
+
+import math
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import generics
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from accounts.permissions import IsAdmin
+
+from .signals import bulk_changed
+
+# Gaps narrower than this (relative to the keys) are rebalanced instead of
+# being split again, long before floats run out of precision
+MIN_GAP = 1e-9
+
+# Attempts when a concurrent write took the key we computed
+ATTEMPTS = 3
+
+
+def key_between(lower, upper):
+    """
+    Order key strictly between two neighbour keys (None: no neighbour on
+    that side), or None when the gap is too narrow and the siblings need
+    a rebalance. Keys stay > 0.
+    """
+    if lower is None and upper is None:
+        return 1.0
+    if upper is None:
+        return math.floor(lower) + 1.0
+    if lower is None:
+        lower = 0.0
+    if upper - lower < MIN_GAP * max(1.0, abs(upper)):
+        return None
+    return (lower + upper) / 2
+
+
+def _retry(operation):
+    """Run operation in a transaction, again if a concurrent write won a key"""
+    for attempt in range(ATTEMPTS):
+        try:
+            with transaction.atomic():
+                return operation()
+        except IntegrityError:
+            if attempt == ATTEMPTS - 1:
+                raise
+
+
+def _lock_parent(model, parent_field, parent_id):
+    """
+    Lock the parent row, serializing key changes among its children
+    (row lock on PostgreSQL; SQLite serializes writers anyway).
+    """
+    parent_model = model._meta.get_field(parent_field).related_model
+    locked = (
+        parent_model.objects.select_for_update()
+        .filter(pk=parent_id)
+        .values_list("pk", flat=True)
+    )
+    if not list(locked):
+        raise ValidationError({parent_field: [f'Invalid pk "{parent_id}".']})
+
+
+def _rebalanced(keys, max_key):
+    """
+    New keys for ids in this order: consecutive integers above every
+    current key, so a single UPDATE can never collide with a key still
+    in use, whatever order the database applies it in.
+    """
+    base = math.floor(max_key) + 1.0
+    return {pk: base + i for i, pk in enumerate(keys)}
+
+
+def _write_keys(model, parent_attname, parent_id, keys, now):
+    """One bulk_update of the order (and parent) of the ids in keys"""
+    objects = [
+        model(pk=pk, order=order, updated_at=now, **{parent_attname: parent_id})
+        for pk, order in keys.items()
+    ]
+    model.objects.bulk_update(objects, ["order", parent_attname, "updated_at"])
+
+
+def move(obj, parent_field, parent_id, position, anchor_id):
+    """
+    Move obj right after (position="after") or before the sibling
+    anchor_id under parent_id, or first/last when anchor_id is None.
+    Only obj gets a new key, unless the gap is exhausted: then all the
+    parent's children are rebalanced with one bulk_update.
+    Constant number of queries; returns True if it rebalanced.
+    """
+    model = type(obj)
+    parent_attname = model._meta.get_field(parent_field).attname
+    old_parent_id = getattr(obj, parent_attname)
+    now = timezone.now()
+
+    def operation():
+        _lock_parent(model, parent_field, parent_id)
+        siblings = model.objects.filter(**{parent_attname: parent_id}).exclude(
+            pk=obj.pk
+        )
+
+        anchor = None
+        if anchor_id is not None:
+            anchor = siblings.filter(pk=anchor_id).values_list("order", flat=True)
+            anchor = anchor.first()
+            if anchor is None:
+                raise ValidationError(
+                    {position: [f"Not a sibling of this {model._meta.model_name}."]}
+                )
+
+        if position == "after":
+            lower = anchor
+            following = siblings if lower is None else siblings.filter(order__gt=lower)
+            upper = following.order_by("order").values_list("order", flat=True)
+            upper = upper.first()
+        else:
+            upper = anchor
+            preceding = siblings if upper is None else siblings.filter(order__lt=upper)
+            lower = preceding.order_by("-order").values_list("order", flat=True)
+            lower = lower.first()
+
+        key = key_between(lower, upper)
+        if key is not None:
+            model.objects.filter(pk=obj.pk).update(
+                order=key, updated_at=now, **{parent_attname: parent_id}
+            )
+            rebalanced = False
+        else:
+            current = list(siblings.order_by("order").values_list("pk", "order"))
+            before = [
+                pk for pk, order in current if lower is not None and order <= lower
+            ]
+            after = [pk for pk, order in current if lower is None or order > lower]
+            max_key = max((order for _, order in current), default=0.0)
+            if old_parent_id == parent_id:
+                max_key = max(max_key, obj.order)
+            keys = _rebalanced(before + [obj.pk] + after, max_key)
+            _write_keys(model, parent_attname, parent_id, keys, now)
+            key = keys[obj.pk]
+            rebalanced = True
+
+        bulk_changed(
+            model,
+            {old_parent_id, parent_id},
+            moved=old_parent_id != parent_id,
+        )
+        return key, rebalanced
+
+    key, rebalanced = _retry(operation)
+    obj.order = key
+    setattr(obj, parent_attname, parent_id)
+    obj.updated_at = now
+    return rebalanced
+
+
+def reorder(model, parent_field, parent_id, ids):
+    """
+    Put all children of parent_id in the order of ids (which must list
+    each of them once) with one bulk_update. Returns {id: new key}.
+    """
+    parent_attname = model._meta.get_field(parent_field).attname
+
+    def operation():
+        _lock_parent(model, parent_field, parent_id)
+        current = dict(
+            model.objects.filter(**{parent_attname: parent_id}).values_list(
+                "pk", "order"
+            )
+        )
+        if len(ids) != len(set(ids)) or set(ids) != set(current):
+            raise ValidationError(
+                {"ids": ["Must list every child of this parent exactly once."]}
+            )
+        if not ids:
+            return {}
+        keys = _rebalanced(ids, max(current.values()))
+        _write_keys(model, parent_attname, parent_id, keys, timezone.now())
+        bulk_changed(model, {parent_id})
+        return keys
+
+    return _retry(operation)
+
+
+def _id_or_none(data, name):
+    value = data.get(name)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValidationError({name: ["A valid integer is required."]})
+    return value
+
+
+# ==================== VIEWS ====================
+class MoveView(generics.GenericAPIView):
+    """
+    POST {"after": <sibling id or null>} or {"before": <sibling id or null>},
+    optionally with the parent field to move to another parent (admin only).
+    null means first ("after") or last ("before") position.
+    """
+
+    permission_classes = [IsAuthenticated, IsAdmin]
+    lookup_field = "id"
+    parent_field = None
+
+    def post(self, request, *args, **kwargs):
+        obj = self.get_object()
+        data = request.data if isinstance(request.data, dict) else {}
+        positions = [name for name in ("after", "before") if name in data]
+        if len(positions) != 1:
+            raise ValidationError(
+                {"non_field_errors": ['Give exactly one of "after" or "before".']}
+            )
+        position = positions[0]
+        anchor_id = _id_or_none(data, position)
+        if anchor_id == obj.pk:
+            raise ValidationError({position: ["Can't move next to itself."]})
+
+        parent_id = _id_or_none(data, self.parent_field)
+        if parent_id is None:
+            parent_id = getattr(obj, f"{self.parent_field}_id")
+
+        move(obj, self.parent_field, parent_id, position, anchor_id)
+        return Response(self.get_serializer(obj).data)
+
+
+class ReorderView(generics.GenericAPIView):
+    """
+    POST {"ids": [...]}: every child of the parent in the URL, in the new
+    order (admin only). Responds with the new keys.
+    """
+
+    permission_classes = [IsAuthenticated, IsAdmin]
+    model = None
+    parent_field = None
+
+    def post(self, request, *args, **kwargs):
+        ids = request.data.get("ids") if isinstance(request.data, dict) else None
+        if not isinstance(ids, list) or not all(
+            isinstance(pk, int) and not isinstance(pk, bool) for pk in ids
+        ):
+            raise ValidationError({"ids": ["Expected a list of ids."]})
+
+        keys = reorder(self.model, self.parent_field, self.kwargs["id"], ids)
+        return Response([{"id": pk, "order": keys[pk]} for pk in ids])
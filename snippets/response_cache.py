@@ -0,0 +1,235 @@
+# snippets/response_cache.py
+
+import hashlib
+import threading
+import time
+
+from django.core.cache import cache
+from rest_framework.response import Response
+
+from config.replicas import use_primary
+
+from .models import Book, Chapter, Section, Snippet
+
+RESPONSE_CACHE_TIMEOUT = 60 * 60
+
+# Bumped when any book or chapter changes (titles, counts in the book list)
+BOOK_LIST_VERSION_KEY = "snippets_version_book_list"
+
+# Bumped when an object moves to another parent, invalidating all
+# cached object -> book mappings at once
+GENERATION_KEY = "snippets_generation"
+
+# How to find the book of each model with a single values_list query
+BOOK_LOOKUPS = {
+    Chapter: "book_id",
+    Section: "chapter__book_id",
+    Snippet: "section__chapter__book_id",
+}
+
+_lock = threading.Lock()
+_counters = {}
+
+
+def visibility(user):
+    """Cache partition: admins see unpublished content, users don't"""
+    return "admin" if user.role == "admin" else "user"
+
+
+def _count(endpoint, outcome):
+    with _lock:
+        endpoint_counters = _counters.setdefault(endpoint, {"hits": 0, "misses": 0})
+        endpoint_counters[outcome] += 1
+
+
+def _book_version_key(book_id):
+    return f"snippets_version_book_{book_id}"
+
+
+def _get_counter(key):
+    """
+    Read a version counter, creating it if missing. New counters start at
+    the current time in ms, so an evicted counter never reuses old values.
+    """
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        value = cache.get(key)
+    return value
+
+
+def _bump_counter(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Missing counter: the next read starts a fresh one
+        pass
+
+
+async def _aget_counter(key):
+    value = await cache.aget(key)
+    if value is None:
+        await cache.aadd(key, int(time.time() * 1000), timeout=None)
+        value = await cache.aget(key)
+    return value
+
+
+def bump_book(book_id):
+    _bump_counter(_book_version_key(book_id))
+
+
+def bump_book_list():
+    _bump_counter(BOOK_LIST_VERSION_KEY)
+
+
+def bump_generation():
+    _bump_counter(GENERATION_KEY)
+
+
+def book_id_for(model, object_id):
+    """Book an object belongs to (cached), or None if it doesn't exist"""
+    if model is Book:
+        return object_id
+
+    generation = _get_counter(GENERATION_KEY)
+    key = _book_key(model, object_id, generation)
+    book_id = cache.get(key)
+    if book_id is None:
+        with use_primary():
+            book_id = (
+                model.objects.filter(id=object_id)
+                .values_list(BOOK_LOOKUPS[model], flat=True)
+                .first()
+            )
+        if book_id is not None:
+            cache.set(key, book_id, timeout=RESPONSE_CACHE_TIMEOUT)
+    return book_id
+
+
+def _book_key(model, object_id, generation):
+    return f"snippets_book_of_{model._meta.model_name}_{object_id}_g{generation}"
+
+
+async def abook_id_for(model, object_id):
+    """book_id_for() for async views"""
+    if model is Book:
+        return object_id
+
+    generation = await _aget_counter(GENERATION_KEY)
+    key = _book_key(model, object_id, generation)
+    book_id = await cache.aget(key)
+    if book_id is None:
+        with use_primary():
+            book_id = (
+                await model.objects.filter(id=object_id)
+                .values_list(BOOK_LOOKUPS[model], flat=True)
+                .afirst()
+            )
+        if book_id is not None:
+            await cache.aset(key, book_id, timeout=RESPONSE_CACHE_TIMEOUT)
+    return book_id
+
+
+def _response_key(endpoint, object_id, user, version, query):
+    key = f"snippets_response_{endpoint}_{object_id}_{visibility(user)}_v{version}"
+    if query:
+        key += "_" + hashlib.md5(query.encode()).hexdigest()
+    return key
+
+
+def response_key(endpoint, model, object_id, user, query=""):
+    """
+    Cache key of one endpoint response for a visibility level and query
+    string (page cursor), embedding the version of the book it depends
+    on. Bumping the version makes all older entries unreachable, so
+    invalidation is O(1).
+    Returns None if the object doesn't exist (not cached).
+    """
+    if model is None:
+        version = _get_counter(BOOK_LIST_VERSION_KEY)
+    else:
+        book_id = book_id_for(model, object_id)
+        if book_id is None:
+            return None
+        version = _get_counter(_book_version_key(book_id))
+    return _response_key(endpoint, object_id, user, version, query)
+
+
+async def acached_data(endpoint, model, object_id, user, query, build):
+    """
+    Response data from the cache (same keys as CachedResponseMixin), or
+    from await build(), cached if it returns data rather than None
+    """
+    if model is None:
+        version = await _aget_counter(BOOK_LIST_VERSION_KEY)
+    else:
+        book_id = await abook_id_for(model, object_id)
+        version = None
+        if book_id is not None:
+            version = await _aget_counter(_book_version_key(book_id))
+
+    if version is None:
+        return await build()
+
+    key = _response_key(endpoint, object_id, user, version, query)
+    data = await cache.aget(key)
+    if data is not None:
+        _count(endpoint, "hits")
+        return data
+    _count(endpoint, "misses")
+
+    with use_primary():
+        data = await build()
+    if data is not None:
+        await cache.aset(key, data, timeout=RESPONSE_CACHE_TIMEOUT)
+    return data
+
+
+def stats():
+    """Hit/miss counters of this process, per endpoint"""
+    with _lock:
+        counters = {name: dict(values) for name, values in _counters.items()}
+    for values in counters.values():
+        lookups = values["hits"] + values["misses"]
+        values["hit_rate"] = round(values["hits"] / lookups, 4) if lookups else None
+    return counters
+
+
+class CachedResponseMixin:
+    """
+    Serve GET responses from the versioned response cache.
+
+    cache_endpoint: name of the endpoint in keys and metrics
+    cache_model: model of the object in the URL (None for the book list)
+    cache_url_kwarg: URL kwarg holding that object's id
+    """
+
+    cache_endpoint = None
+    cache_model = None
+    cache_url_kwarg = "id"
+
+    def get(self, request, *args, **kwargs):
+        key = response_key(
+            self.cache_endpoint,
+            self.cache_model,
+            self.kwargs.get(self.cache_url_kwarg),
+            request.user,
+            request.GET.urlencode(),
+        )
+        if key is None:
+            return super().get(request, *args, **kwargs)
+
+        data = cache.get(key)
+        if data is not None:
+            _count(self.cache_endpoint, "hits")
+            return Response(data)
+        _count(self.cache_endpoint, "misses")
+
+        # Cached responses are built from the primary: a lagging replica
+        # would leave pre-write data cached under the new version
+        with use_primary():
+            response = super().get(request, *args, **kwargs)
+
+        if response.status_code == 200:
+            cache.set(key, response.data, timeout=RESPONSE_CACHE_TIMEOUT)
+        return response
@@ -0,0 +1,168 @@
+# snippets/search.py
+
+import html
+
+from django.db import connection, connections, router
+
+from .models import Snippet
+
+# Highlight markers used inside the database; the surrounding text is
+# HTML-escaped before they are turned into <mark> tags
+START_MARK = "\x02"
+STOP_MARK = "\x03"
+
+# Columns returned for every hit, in this order
+RESULT_FIELDS = ("id", "section_id", "title", "language", "order", "is_published")
+
+POSTGRES_HEADLINE_OPTIONS = (
+    f'StartSel="{START_MARK}", StopSel="{STOP_MARK}", '
+    "MaxFragments=2, MaxWords=20, MinWords=5"
+)
+TITLE_HEADLINE_OPTIONS = (
+    f'StartSel="{START_MARK}", StopSel="{STOP_MARK}", HighlightAll=true'
+)
+
+# ts_headline is expensive, so it only runs on the rows of the page
+POSTGRES_SEARCH_SQL = """
+    SELECT {fields}, rank,
+        ts_headline('simple', title, query, %s) AS title_highlight,
+        ts_headline(
+            'simple', coalesce(explanation, '') || E'\\n' || code, query, %s
+        ) AS excerpt
+    FROM (
+        SELECT s.*, ts_rank(s.search_vector, query) AS rank, query
+        FROM snippets_snippet s, websearch_to_tsquery('simple', %s) query
+        WHERE s.search_vector @@ query {filters}
+        ORDER BY rank DESC, s.id
+        LIMIT %s OFFSET %s
+    ) hits
+    ORDER BY rank DESC, id
+"""
+
+# bm25() is lower-is-better; title matches weigh most, then explanation
+SQLITE_SEARCH_SQL = """
+    SELECT {fields}, -bm25(snippets_snippet_fts, 10.0, 4.0, 1.0) AS rank,
+        highlight(snippets_snippet_fts, 0, %s, %s) AS title_highlight,
+        snippet(snippets_snippet_fts, -1, %s, %s, '…', 24) AS excerpt
+    FROM snippets_snippet_fts
+    JOIN snippets_snippet s ON s.id = snippets_snippet_fts.rowid
+    WHERE snippets_snippet_fts MATCH %s {filters}
+    ORDER BY rank DESC, s.id
+    LIMIT %s OFFSET %s
+"""
+
+
+def _columns(alias=""):
+    return ", ".join(alias + connection.ops.quote_name(f) for f in RESULT_FIELDS)
+
+
+def _filters(user, languages, alias):
+    """WHERE fragments and params for visibility and language filters"""
+    clauses, params = [], []
+    if user.role != "admin":
+        clauses.append(f"AND {alias}is_published")
+    if languages:
+        placeholders = ", ".join(["%s"] * len(languages))
+        clauses.append(f"AND {alias}language IN ({placeholders})")
+        params.extend(languages)
+    return " ".join(clauses), params
+
+
+def fts5_query(text):
+    """
+    Quote every term, so user input can't use (or break on) FTS5 query
+    syntax. Terms are ANDed, like websearch_to_tsquery does.
+    """
+    terms = text.split()
+    return " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def render_highlight(text):
+    """Escape text for HTML and turn the database markers into <mark>"""
+    if text is None:
+        return ""
+    return html.escape(text).replace(START_MARK, "<mark>").replace(STOP_MARK, "</mark>")
+
+
+def _read_connection():
+    """Where the ORM would read snippets from: raw SQL skips the routers"""
+    return connections[router.db_for_read(Snippet)]
+
+
+def _postgres_search(query, user, languages, limit, offset):
+    filters, filter_params = _filters(user, languages, "s.")
+    sql = POSTGRES_SEARCH_SQL.format(fields=_columns(), filters=filters)
+    params = [
+        TITLE_HEADLINE_OPTIONS,
+        POSTGRES_HEADLINE_OPTIONS,
+        query,
+        *filter_params,
+        limit,
+        offset,
+    ]
+    with _read_connection().cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _sqlite_search(query, user, languages, limit, offset):
+    match = fts5_query(query)
+    if not match:
+        return []
+    filters, filter_params = _filters(user, languages, "s.")
+    sql = SQLITE_SEARCH_SQL.format(fields=_columns("s."), filters=filters)
+    params = [
+        START_MARK,
+        STOP_MARK,
+        START_MARK,
+        STOP_MARK,
+        match,
+        *filter_params,
+        limit,
+        offset,
+    ]
+    with _read_connection().cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _fallback_search(query, user, languages, limit, offset):
+    """Unindexed icontains search for databases without full-text support"""
+    queryset = Snippet.objects.filter(title__icontains=query) | (
+        Snippet.objects.filter(explanation__icontains=query)
+        | Snippet.objects.filter(code__icontains=query)
+    )
+    if user.role != "admin":
+        queryset = queryset.filter(is_published=True)
+    if languages:
+        queryset = queryset.filter(language__in=languages)
+    rows = queryset.order_by("id").values_list(*RESULT_FIELDS)[offset : offset + limit]
+    return [(*row, 0.0, row[2], "") for row in rows]
+
+
+SEARCH_BACKENDS = {
+    "postgresql": _postgres_search,
+    "sqlite": _sqlite_search,
+}
+
+
+def search_snippets(query, user, languages=(), limit=20, offset=0):
+    """
+    Ranked full-text search over snippet titles, explanations and code.
+    Regular users only get published snippets. Returns dicts with the
+    snippet fields plus rank, title_highlight and excerpt (HTML-escaped,
+    matches wrapped in <mark>).
+    """
+    backend = SEARCH_BACKENDS.get(connection.vendor, _fallback_search)
+    rows = backend(query, user, list(languages), limit, offset)
+
+    results = []
+    for row in rows:
+        hit = dict(zip(RESULT_FIELDS, row))
+        rank, title_highlight, excerpt = row[len(RESULT_FIELDS) :]
+        hit["section"] = hit.pop("section_id")
+        hit["rank"] = round(float(rank), 6)
+        hit["title_highlight"] = render_highlight(title_highlight)
+        hit["excerpt"] = render_highlight(excerpt)
+        results.append(hit)
+    return results
@@ -1,7 +1,9 @@
 # snippets/serializers.py
 
 from rest_framework import serializers
+from rest_framework.validators import UniqueTogetherValidator
 
+from .highlight import rendered_fields, wants_html
 from .models import Book, Chapter, Section, Snippet
 
 
@@ -25,10 +27,28 @@ class SnippetSerializer(serializers.ModelSerializer):
             "is_published",
             "created_by",
             "created_by_username",
+            "code_html",
+            "line_count",
+            "code_size",
             "created_at",
             "updated_at",
         )
-        read_only_fields = ("id", "created_by", "created_at", "updated_at")
+        read_only_fields = (
+            "id",
+            "created_by",
+            "code_html",
+            "line_count",
+            "code_size",
+            "created_at",
+            "updated_at",
+        )
+
+    def get_fields(self):
+        """code_html only when asked for (?highlight=1): it's large"""
+        fields = super().get_fields()
+        if not wants_html(self.context.get("request")):
+            fields.pop("code_html")
+        return fields
 
     def validate_order(self, value):
         """Ensure order is positive"""
@@ -36,6 +56,17 @@ class SnippetSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Order must be greater than 0")
         return value
 
+    def validate(self, attrs):
+        """Render the code once per edit instead of once per view"""
+        attrs = super().validate(attrs)
+        if "code" in attrs or "language" in attrs:
+            code = attrs.get("code", getattr(self.instance, "code", ""))
+            language = attrs.get(
+                "language", getattr(self.instance, "language", "python")
+            )
+            attrs.update(rendered_fields(code, language))
+        return attrs
+
 
 # ==================== LIGHTWEIGHT SERIALIZERS (IDs only) ====================
 class ChapterMinimalSerializer(serializers.ModelSerializer):
@@ -59,7 +90,7 @@ class SectionDetailSerializer(serializers.ModelSerializer):
     """Section with full snippets - only loaded when section is clicked"""
 
     snippets = SnippetSerializer(many=True, read_only=True)
-    snippets_count = serializers.IntegerField(source="snippets.count", read_only=True)
+    snippets_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Section
@@ -76,12 +107,16 @@ class SectionDetailSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ("id", "created_at", "updated_at")
 
+    def get_snippets_count(self, obj):
+        """Counted from the prefetched rows, no extra query"""
+        return len(obj.snippets.all())
+
 
 class ChapterDetailSerializer(serializers.ModelSerializer):
     """Chapter with minimal sections - sections details loaded on demand"""
 
     sections = SectionMinimalSerializer(many=True, read_only=True)
-    sections_count = serializers.IntegerField(source="sections.count", read_only=True)
+    sections_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Chapter
@@ -98,12 +133,16 @@ class ChapterDetailSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ("id", "created_at", "updated_at")
 
+    def get_sections_count(self, obj):
+        """Counted from the prefetched rows, no extra query"""
+        return len(obj.sections.all())
+
 
 class BookDetailSerializer(serializers.ModelSerializer):
     """Book with minimal chapters - chapter details loaded on demand"""
 
     chapters = ChapterMinimalSerializer(many=True, read_only=True)
-    chapters_count = serializers.IntegerField(source="chapters.count", read_only=True)
+    chapters_count = serializers.SerializerMethodField()
     created_by_username = serializers.CharField(
         source="created_by.username", read_only=True
     )
@@ -124,12 +163,17 @@ class BookDetailSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ("id", "created_by", "created_at", "updated_at")
 
+    def get_chapters_count(self, obj):
+        """Counted from the prefetched rows, no extra query"""
+        return len(obj.chapters.all())
+
 
 # ==================== LIST SERIALIZERS (for admin/listings) ====================
 class BookListSerializer(serializers.ModelSerializer):
     """Lightweight serializer for listing books"""
 
-    chapters_count = serializers.IntegerField(source="chapters.count", read_only=True)
+    # Annotated by the list view
+    chapters_count = serializers.IntegerField(read_only=True)
     created_by_username = serializers.CharField(
         source="created_by.username", read_only=True
     )
@@ -151,7 +195,8 @@ class ChapterListSerializer(serializers.ModelSerializer):
     """Lightweight serializer for listing chapters"""
 
     book_title = serializers.CharField(source="book.title", read_only=True)
-    sections_count = serializers.IntegerField(source="sections.count", read_only=True)
+    # Annotated by the list view
+    sections_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Chapter
@@ -171,7 +216,8 @@ class SectionListSerializer(serializers.ModelSerializer):
     """Lightweight serializer for listing sections"""
 
     chapter_title = serializers.CharField(source="chapter.title", read_only=True)
-    snippets_count = serializers.IntegerField(source="snippets.count", read_only=True)
+    # Annotated by the list view
+    snippets_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Section
@@ -248,4 +294,55 @@ class SectionSerializer(serializers.ModelSerializer):
         """Ensure order is positive"""
         if value <= 0:
             raise serializers.ValidationError("Order must be greater than 0")
-        return value
\ No newline at end of file
+        return value
+
+
+# ==================== BULK SERIALIZERS ====================
+class PreloadedParentField(serializers.PrimaryKeyRelatedField):
+    """Parent FK looked up in the rows the bulk view loaded for the batch"""
+
+    def to_internal_value(self, data):
+        try:
+            return self.context["parents"][int(data)]
+        except KeyError:
+            self.fail("does_not_exist", pk_value=data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+
+
+class BulkItemMixin:
+    """
+    One item of a bulk write: same fields and validation as the wrapped
+    serializer, without a query per item. The parent comes from rows
+    preloaded for the whole batch, and the (parent, order) uniqueness
+    check is done in memory by the bulk view instead of per row.
+    """
+
+    parent_field = None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        parent_model = self.Meta.model._meta.get_field(self.parent_field).related_model
+        fields[self.parent_field] = PreloadedParentField(
+            queryset=parent_model.objects.all()
+        )
+        return fields
+
+    def get_validators(self):
+        return [
+            validator
+            for validator in super().get_validators()
+            if not isinstance(validator, UniqueTogetherValidator)
+        ]
+
+
+class BulkChapterSerializer(BulkItemMixin, ChapterSerializer):
+    parent_field = "book"
+
+
+class BulkSectionSerializer(BulkItemMixin, SectionSerializer):
+    parent_field = "chapter"
+
+
+class BulkSnippetSerializer(BulkItemMixin, SnippetSerializer):
+    parent_field = "section"
@@ -0,0 +1,158 @@
+# snippets/signals.py
+
+import threading
+from contextlib import contextmanager
+from functools import partial
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import code_search, response_cache
+from .models import Book, Chapter, Section, Snippet
+
+# Parent model of each model (its parent_field) and how to reach the book from it
+PARENTS = {
+    Chapter: (None, None),
+    Section: (Chapter, "book_id"),
+    Snippet: (Section, "chapter__book_id"),
+}
+
+_batch = threading.local()
+
+
+@contextmanager
+def batched():
+    """
+    Skip per-object invalidation for deletes inside this block; the
+    caller bumps once for the whole batch with bulk_changed().
+    """
+    _batch.active = True
+    try:
+        yield
+    finally:
+        _batch.active = False
+
+
+def _book_of_parent(model, parent_id):
+    parent_model, lookup = PARENTS[model]
+    if parent_model is None:
+        return parent_id
+    return (
+        parent_model.objects.filter(id=parent_id).values_list(lookup, flat=True).first()
+    )
+
+
+def _bump_after_commit(book_ids, book_list=False, generation=False):
+    """
+    Bump versions only once the write is visible, so a concurrent reader
+    can't cache old data under the new version.
+    """
+
+    def bump():
+        for book_id in book_ids:
+            if book_id is not None:
+                response_cache.bump_book(book_id)
+        if book_list:
+            response_cache.bump_book_list()
+        if generation:
+            response_cache.bump_generation()
+
+    transaction.on_commit(bump)
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def book_changed(sender, instance, **kwargs):
+    _bump_after_commit([instance.id], book_list=True)
+    if "origin" in kwargs:
+        # Deleting a book also deletes its snippets
+        transaction.on_commit(code_search.bump_version)
+
+
+@receiver(pre_save, sender=Chapter)
+@receiver(pre_save, sender=Section)
+@receiver(pre_save, sender=Snippet)
+def remember_old_parent(sender, instance, **kwargs):
+    """
+    Moving an object to another parent also changes the old book. Objects
+    loaded from the database already know it (Child.from_db); only ones
+    built by hand with a pk, or with the parent deferred, read it here.
+    """
+    if instance.pk is None or hasattr(instance, "_loaded_parent_id"):
+        return
+    instance._loaded_parent_id = (
+        sender.objects.filter(pk=instance.pk)
+        .values_list(sender.parent_field, flat=True)
+        .first()
+    )
+
+
+@receiver(post_delete, sender=Snippet)
+def snippet_deleted(sender, instance, **kwargs):
+    """
+    Code search indexes drop the id at the next version bump (connected
+    before content_changed, so its on_commit runs before the bump)
+    """
+    transaction.on_commit(partial(code_search.deleted, instance.id))
+
+
+@receiver(post_save, sender=Chapter)
+@receiver(post_save, sender=Section)
+@receiver(post_save, sender=Snippet)
+@receiver(post_delete, sender=Chapter)
+@receiver(post_delete, sender=Section)
+@receiver(post_delete, sender=Snippet)
+def content_changed(sender, instance, origin=None, **kwargs):
+    if getattr(_batch, "active", False):
+        return
+    if origin is not None and origin is not instance:
+        if not isinstance(origin, QuerySet) or origin.model is not sender:
+            # Cascaded from the object being deleted: its own signal bumps
+            # the book and the code search version, with one lookup
+            return
+    parent_id = getattr(instance, sender.parent_field)
+    if isinstance(origin, QuerySet):
+        # One lookup and one bump per parent for the whole queryset
+        seen = origin.__dict__.setdefault("_deleted_from_parents", set())
+        if parent_id in seen:
+            return
+        seen.add(parent_id)
+    book_ids = {_book_of_parent(sender, parent_id)}
+
+    old_parent_id = getattr(instance, "_loaded_parent_id", None)
+    moved = old_parent_id is not None and old_parent_id != parent_id
+    if moved:
+        book_ids.add(_book_of_parent(sender, old_parent_id))
+    if "created" in kwargs:
+        # The instance may be saved again
+        instance._loaded_parent_id = parent_id
+
+    # Chapter counts are part of the book list
+    _bump_after_commit(book_ids, book_list=sender is Chapter, generation=moved)
+
+    # Deleting a chapter or section also deletes its snippets
+    if sender is Snippet or origin is not None:
+        transaction.on_commit(code_search.bump_version)
+
+
+def bulk_changed(model, parent_ids, moved=False):
+    """
+    Bulk writes send no per-object signals (bulk_create/bulk_update) or
+    skip them (batched()): bump the books of these parents once for the
+    whole batch (one query).
+    """
+    parent_model, lookup = PARENTS[model]
+    if parent_model is None:
+        book_ids = set(parent_ids)
+    else:
+        book_ids = set(
+            parent_model.objects.filter(id__in=parent_ids).values_list(
+                lookup, flat=True
+            )
+        )
+    _bump_after_commit(book_ids, book_list=model is Chapter, generation=moved)
+
+    # Deleting chapters or sections also deletes their snippets
+    transaction.on_commit(code_search.bump_version)
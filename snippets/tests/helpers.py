@@ -0,0 +1,19 @@
+# snippets/tests/helpers.py
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+def make_user(username, role="user"):
+    return get_user_model().objects.create_user(
+        username=username, password="unused-password", role=role
+    )
+
+
+def client_for(user):
+    """Test client authenticated like the frontend: access token cookie"""
+    client = Client()
+    client.cookies[settings.SIMPLE_JWT["AUTH_COOKIE"]] = str(AccessToken.for_user(user))
+    return client
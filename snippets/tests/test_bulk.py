@@ -0,0 +1,218 @@
+# snippets/tests/test_bulk.py
+
+from unittest import mock
+
+import msgpack
+from django.test import TestCase
+from django.urls import reverse
+
+from snippets.bulk import BulkWriteView
+from snippets.models import Book, Chapter, Section, Snippet
+
+from .helpers import client_for, make_user
+
+UNIQUE = "The fields {}, order must make a unique set."
+
+
+class BulkTests(TestCase):
+    """Bulk create/update/delete endpoints"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user("bulk-admin", role="admin")
+        cls.user = make_user("bulk-user")
+        cls.book = Book.objects.create(title="Bulk", is_published=True)
+        cls.other_book = Book.objects.create(title="Other", is_published=True)
+        cls.chapters = [
+            Chapter.objects.create(book=cls.book, title=f"Chapter {n}", order=n)
+            for n in (1, 2, 3)
+        ]
+
+    def setUp(self):
+        self.client = client_for(self.admin)
+
+    def post(self, name, items, method="post"):
+        return getattr(self.client, method)(
+            reverse(f"snippets:{name}"), items, content_type="application/json"
+        )
+
+    def orders(self, book):
+        return list(
+            Chapter.objects.filter(book=book)
+            .order_by("order")
+            .values_list("title", "order")
+        )
+
+    def concurrent_chapter(self, book, order):
+        """
+        check_orders() that passes, then sees a concurrent request commit
+        a chapter at (book, order) before the batch is written
+        """
+        check_orders = BulkWriteView.check_orders
+
+        def check_then_commit(view, rows, errors):
+            check_orders(view, rows, errors)
+            if not Chapter.objects.filter(book=book, order=order).exists():
+                Chapter.objects.create(book=book, title="Concurrent", order=order)
+
+        return mock.patch.object(
+            BulkWriteView, "check_orders", autospec=True, side_effect=check_then_commit
+        )
+
+    # ==================== CREATE ====================
+    def test_create(self):
+        response = self.post(
+            "chapter_bulk_create",
+            [
+                {"book": self.book.id, "title": "Four", "order": 4},
+                {"book": self.other_book.id, "title": "One", "order": 1},
+            ],
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([item["title"] for item in response.json()], ["Four", "One"])
+        self.assertTrue(all(item["id"] for item in response.json()))
+        self.assertEqual(self.orders(self.other_book), [("One", 1.0)])
+
+    def test_create_msgpack_body(self):
+        response = self.client.post(
+            reverse("snippets:chapter_bulk_create"),
+            msgpack.packb([{"book": self.book.id, "title": "Packed", "order": 9}]),
+            content_type="application/msgpack",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Chapter.objects.filter(title="Packed").exists())
+
+    def test_create_errors_are_aligned_with_items(self):
+        response = self.post(
+            "chapter_bulk_create",
+            [
+                {"book": self.book.id, "title": "Fine", "order": 10},
+                {"book": self.book.id, "order": 11},
+                {"book": 0, "title": "No book", "order": 12},
+                {"book": self.book.id, "title": "Taken", "order": 1},
+                {"book": self.book.id, "title": "Repeated", "order": 10},
+            ],
+        )
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()
+        self.assertEqual(errors[0], {})
+        self.assertIn("title", errors[1])
+        self.assertIn("book", errors[2])
+        self.assertEqual(errors[3], {"non_field_errors": [UNIQUE.format("book")]})
+        self.assertEqual(errors[4], {"non_field_errors": [UNIQUE.format("book")]})
+        self.assertEqual(Chapter.objects.count(), 3)
+
+    def test_create_concurrent_conflict_is_a_400(self):
+        items = [
+            {"book": self.book.id, "title": "Fine", "order": 10},
+            {"book": self.book.id, "title": "Raced", "order": 11},
+        ]
+        with self.concurrent_chapter(self.book, 11):
+            response = self.post("chapter_bulk_create", items)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json(), [{}, {"non_field_errors": [UNIQUE.format("book")]}]
+        )
+        self.assertFalse(Chapter.objects.filter(title__in=["Fine", "Raced"]).exists())
+
+    def test_create_rejects_empty_and_oversized_batches(self):
+        self.assertEqual(self.post("chapter_bulk_create", []).status_code, 400)
+        self.assertEqual(self.post("chapter_bulk_create", {}).status_code, 400)
+        with self.settings(BULK_MAX_ITEMS=1):
+            items = [
+                {"book": self.book.id, "title": "A", "order": 10},
+                {"book": self.book.id, "title": "B", "order": 11},
+            ]
+            self.assertEqual(self.post("chapter_bulk_create", items).status_code, 400)
+
+    def test_admin_only(self):
+        self.client = client_for(self.user)
+        response = self.post(
+            "chapter_bulk_create", [{"book": self.book.id, "title": "X", "order": 9}]
+        )
+        self.assertEqual(response.status_code, 403)
+
+    # ==================== UPDATE ====================
+    def test_update_swaps_orders(self):
+        first, second, _ = self.chapters
+        response = self.post(
+            "chapter_bulk_update",
+            [{"id": first.id, "order": 2}, {"id": second.id, "order": 1}],
+            method="patch",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.orders(self.book),
+            [("Chapter 2", 1.0), ("Chapter 1", 2.0), ("Chapter 3", 3.0)],
+        )
+
+    def test_update_moves_to_another_parent(self):
+        chapter = self.chapters[0]
+        response = self.post(
+            "chapter_bulk_update",
+            [{"id": chapter.id, "book": self.other_book.id, "title": "Moved"}],
+            method="patch",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.orders(self.other_book), [("Moved", 1.0)])
+
+    def test_update_errors(self):
+        first, second, _ = self.chapters
+        response = self.post(
+            "chapter_bulk_update",
+            [
+                {"id": first.id, "order": 3},
+                {"id": 0, "title": "Missing"},
+                {"id": first.id, "title": "Again"},
+                {"title": "No id"},
+            ],
+            method="patch",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json(),
+            [
+                {"non_field_errors": [UNIQUE.format("book")]},
+                {"id": ["Not found."]},
+                {"id": ["Duplicate id in this request."]},
+                {"id": ["A valid integer is required."]},
+            ],
+        )
+        self.assertEqual(Chapter.objects.get(id=first.id).order, 1.0)
+
+    def test_update_concurrent_conflict_is_a_400(self):
+        first, second, _ = self.chapters
+        items = [{"id": first.id, "title": "Renamed"}, {"id": second.id, "order": 7}]
+        with self.concurrent_chapter(self.book, 7):
+            response = self.post("chapter_bulk_update", items, method="patch")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json(), [{}, {"non_field_errors": [UNIQUE.format("book")]}]
+        )
+        self.assertEqual(Chapter.objects.get(id=first.id).title, "Chapter 1")
+        self.assertEqual(Chapter.objects.get(id=second.id).order, 2.0)
+
+    # ==================== DELETE ====================
+    def test_delete_cascades(self):
+        chapter = self.chapters[0]
+        section = Section.objects.create(chapter=chapter, title="S", order=1)
+        Snippet.objects.create(section=section, title="X", code="x", order=1)
+        response = self.post(
+            "chapter_bulk_delete", [chapter.id, {"id": self.chapters[1].id}]
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            [
+                {"id": chapter.id, "deleted": True},
+                {"id": self.chapters[1].id, "deleted": True},
+            ],
+        )
+        self.assertEqual(self.orders(self.book), [("Chapter 3", 3.0)])
+        self.assertFalse(Snippet.objects.exists())
+
+    def test_delete_is_all_or_nothing(self):
+        response = self.post("chapter_bulk_delete", [self.chapters[0].id, 0])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), [{}, {"id": ["Not found."]}])
+        self.assertEqual(Chapter.objects.count(), 3)
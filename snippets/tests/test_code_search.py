@@ -0,0 +1,140 @@
+# snippets/tests/test_code_search.py
+
+import marshal
+import os
+import pickle
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from snippets import code_search
+from snippets.models import Book, Chapter, Section, Snippet
+
+ADMIN = SimpleNamespace(role="admin")
+USER = SimpleNamespace(role="user")
+
+
+class CodeSearchTests(TestCase):
+    """In-process trigram index used by code search on SQLite"""
+
+    @classmethod
+    def setUpTestData(cls):
+        book = Book.objects.create(title="Search", is_published=True)
+        chapter = Chapter.objects.create(book=book, title="Search", order=1)
+        cls.section = Section.objects.create(chapter=chapter, title="Search", order=1)
+        cls.snippets = [
+            cls.snippet(code, n, is_published=n != 2)
+            for n, code in enumerate(
+                [
+                    "let mut map = HashMap::new();",
+                    "from asgiref.sync import async_to_sync",
+                    "map = HashMap::new() # draft",
+                    "fn main() {}",
+                ]
+            )
+        ]
+
+    @classmethod
+    def snippet(cls, code, order, is_published=True):
+        return Snippet.objects.create(
+            section=cls.section,
+            title=f"Snippet {order}",
+            code=code,
+            order=order,
+            is_published=is_published,
+        )
+
+    def setUp(self):
+        cache.clear()
+        code_search.reset_index()
+        self.addCleanup(code_search.reset_index)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "code_search.idx")
+        self.settings_override = self.settings(CODE_SEARCH_INDEX_PATH=self.path)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        # Background loads would read outside the test transaction
+        patcher = mock.patch.object(code_search, "preload")
+        self.preload = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def ids(self, token, user=ADMIN, **kwargs):
+        return [row["id"] for row in code_search.search_code(token, user, **kwargs)]
+
+    def test_scans_while_no_index_is_loaded(self):
+        self.assertEqual(
+            self.ids("hashmap::NEW"), [self.snippets[0].id, self.snippets[2].id]
+        )
+        # The request started a background load instead of building one
+        self.preload.assert_called_once_with()
+        self.assertIsNone(code_search._index)
+
+    def test_indexed_results_match_a_scan(self):
+        code_search.load()
+        for token in ("HashMap::new", "async_to_sync", "fn main()", "zzz", "ap"):
+            for user in (ADMIN, USER):
+                with self.subTest(token=token, role=user.role):
+                    expected = list(
+                        code_search._visible_snippets(user, [])
+                        .filter(code__icontains=token)
+                        .order_by("id")
+                        .values_list("id", flat=True)
+                    )
+                    self.assertEqual(self.ids(token, user), expected)
+        self.assertEqual(self.ids("map", limit=1, offset=1), [self.snippets[2].id])
+        self.preload.assert_not_called()
+
+    def test_index_catches_up_with_writes(self):
+        code_search.load()
+        with self.captureOnCommitCallbacks(execute=True):
+            added = self.snippet("let set = HashSet::new();", 9)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.snippets[0].delete()
+        self.assertEqual(self.ids("::new"), [self.snippets[2].id, added.id])
+
+    def test_too_far_behind_is_rebuilt_in_the_background(self):
+        index = code_search.load()
+        cache.set(
+            code_search.VERSION_KEY,
+            index.version + code_search.MAX_CATCH_UP_VERSIONS + 1,
+        )
+        self.assertEqual(self.ids("fn main"), [self.snippets[3].id])
+        self.preload.assert_called_once_with()
+        self.assertIsNone(code_search._index)
+
+    def test_saved_index_round_trips(self):
+        index = code_search.build_index()
+        index.update(self.snippets[3].id, "fn other() {}", self.snippets[3].updated_at)
+        code_search.save_index(index)
+
+        loaded = code_search.load_index()
+        for attribute in ("postings", "overlay", "dead", "updated", "watermark"):
+            self.assertEqual(getattr(loaded, attribute), getattr(index, attribute))
+        self.assertEqual(loaded.version, index.version)
+        self.assertEqual(
+            list(loaded.candidates("hashmap")), list(index.candidates("hashmap"))
+        )
+
+    def test_load_uses_the_saved_index(self):
+        code_search.save_index(code_search.build_index())
+        with mock.patch.object(code_search, "build_index") as build_index:
+            code_search.load()
+        build_index.assert_not_called()
+        self.assertEqual(self.ids("async_to"), [self.snippets[1].id])
+
+    def test_unreadable_files_are_ignored(self):
+        for content in (
+            b"",
+            b"not an index",
+            pickle.dumps(code_search.build_index()),
+            marshal.dumps({"format": 0}),
+        ):
+            with self.subTest(content=content[:20]):
+                with open(self.path, "wb") as f:
+                    f.write(content)
+                with self.assertLogs(code_search.logger, "WARNING"):
+                    self.assertIsNone(code_search.load_index())
@@ -0,0 +1,161 @@
+# snippets/tests/test_fast_reads.py
+
+from datetime import datetime, timezone
+from urllib.parse import parse_qsl, urlsplit
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import path
+
+from snippets import async_views, views
+from snippets.highlight import rendered_fields
+from snippets.models import Book, Chapter, Section, Snippet
+
+from .helpers import client_for, make_user
+
+# (route, DRF view, async view) of every list and detail endpoint
+ROUTES = [
+    ("books/", views.BookListView, async_views.AsyncBookListView),
+    ("books/<int:id>/", views.BookDetailView, async_views.AsyncBookDetailView),
+    (
+        "books/<int:book_id>/chapters/",
+        views.ChapterListView,
+        async_views.AsyncChapterListView,
+    ),
+    ("chapters/<int:id>/", views.ChapterDetailView, async_views.AsyncChapterDetailView),
+    (
+        "chapters/<int:chapter_id>/sections/",
+        views.SectionListView,
+        async_views.AsyncSectionListView,
+    ),
+    ("sections/<int:id>/", views.SectionDetailView, async_views.AsyncSectionDetailView),
+    (
+        "sections/<int:section_id>/snippets/",
+        views.SnippetListView,
+        async_views.AsyncSnippetListView,
+    ),
+    ("snippets/<int:id>/", views.SnippetDetailView, async_views.AsyncSnippetDetailView),
+]
+
+# Both versions of every endpoint, under /sync/ and /async/
+urlpatterns = [path(f"sync/{route}", view.as_view()) for route, view, _ in ROUTES] + [
+    path(f"async/{route}", view.as_view()) for route, _, view in ROUTES
+]
+
+# Snippets per section: empty, single, several pages (page_size=2)
+SECTION_SIZES = [0, 1, 5]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class FastReadPathTests(TestCase):
+    """
+    The values() RowMapper responses (FAST_READ_PATH and the async views)
+    are byte-identical to the serializers'
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user("fast-admin", role="admin")
+        cls.user = make_user("fast-user")
+        # No author: null created_by / created_by_username
+        cls.book = Book.objects.create(title="Fast “reads”", is_published=True)
+        Book.objects.create(title="Draft", is_published=False, created_by=cls.admin)
+        cls.chapter = Chapter.objects.create(
+            book=cls.book, title="Chapter <1>", order=1, is_published=True
+        )
+        Chapter.objects.create(book=cls.book, title="Draft", order=1.5)
+        cls.sections = []
+        for number, size in enumerate(SECTION_SIZES, 1):
+            section = Section.objects.create(
+                chapter=cls.chapter,
+                title=f"Section {number}",
+                order=number,
+                is_published=number != 2,
+            )
+            cls.sections.append(section)
+            for n in range(size):
+                code = f"def f_{n}():\n    return 'ü {n}'\n" * (n + 1)
+                language = ["python", "rust", "other"][n % 3]
+                Snippet.objects.create(
+                    section=section,
+                    title=f"Snippet {n} <b>",
+                    code=code,
+                    language=language,
+                    explanation="" if n % 2 else "Explained — “quoted”",
+                    order=n + 1 + n * 0.25,
+                    is_published=n != 1,
+                    created_by=cls.admin if n % 2 else None,
+                    **rendered_fields(code, language),
+                )
+        cls.snippet = Snippet.objects.filter(created_by=None).first()
+        # Whole seconds: isoformat() leaves out the microseconds
+        Snippet.objects.filter(id=cls.snippet.id).update(
+            created_at=datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        )
+
+    def setUp(self):
+        self.clients = {
+            "admin": client_for(self.admin),
+            "user": client_for(self.user),
+        }
+
+    def _urls(self):
+        section = self.sections[-1]
+        return [
+            "books/",
+            f"books/{self.book.id}/",
+            f"books/{self.book.id}/chapters/",
+            f"chapters/{self.chapter.id}/",
+            f"chapters/{self.chapter.id}/sections/",
+            *(f"sections/{section.id}/" for section in self.sections),
+            *(f"sections/{section.id}/snippets/" for section in self.sections),
+            f"snippets/{self.snippet.id}/",
+            f"snippets/{section.snippets.order_by('id').last().id}/",
+        ]
+
+    def _get(self, client, url, query):
+        # Every request is built, not answered from the response cache
+        cache.clear()
+        response = client.get(url, query)
+        content = response.content.replace(b"/sync/", b"/").replace(b"/async/", b"/")
+        return response.status_code, response["Content-Type"], content
+
+    def _assert_same(self, role, url, query):
+        """Compare one page of all three versions; returns the next page query"""
+        client = self.clients[role]
+        with override_settings(FAST_READ_PATH=False):
+            expected = self._get(client, f"/sync/{url}", query)
+        with override_settings(FAST_READ_PATH=True):
+            fast = self._get(client, f"/sync/{url}", query)
+        native = self._get(client, f"/async/{url}", query)
+        self.assertEqual(fast, expected, "FAST_READ_PATH")
+        self.assertEqual(native, expected, "async view")
+
+        response = client.get(f"/sync/{url}", query)
+        next_url = response.json().get("next") if response.status_code == 200 else None
+        if not isinstance(next_url, str):
+            return None
+        return dict(parse_qsl(urlsplit(next_url).query))
+
+    def _assert_endpoints_match(self):
+        for role in self.clients:
+            for extra in ({}, {"highlight": "1"}):
+                for url in self._urls():
+                    query = {**extra, "page_size": 2}
+                    while query is not None:
+                        next_query = None
+                        with self.subTest(role=role, url=url, query=query):
+                            next_query = self._assert_same(role, url, query)
+                        query = next_query
+
+    def test_responses_match_serializers(self):
+        self._assert_endpoints_match()
+
+    def test_responses_match_serializers_in_local_time(self):
+        with override_settings(TIME_ZONE="America/New_York"):
+            self._assert_endpoints_match()
+
+    def test_missing_objects_match(self):
+        for url in ("books/0/", "sections/0/", "snippets/0/", "sections/0/snippets/"):
+            with self.subTest(url=url):
+                self._assert_same("user", url, {})
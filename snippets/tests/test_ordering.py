@@ -0,0 +1,194 @@
+# snippets/tests/test_ordering.py
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from snippets.models import Book, Chapter, Section, Snippet
+from snippets.ordering import key_between, move
+
+from .helpers import client_for, make_user
+
+
+class KeyBetweenTests(SimpleTestCase):
+    def test_keys(self):
+        self.assertEqual(key_between(None, None), 1.0)
+        self.assertEqual(key_between(3.5, None), 4.0)
+        self.assertEqual(key_between(None, 1.0), 0.5)
+        self.assertEqual(key_between(1.0, 2.0), 1.5)
+
+    def test_keys_stay_positive(self):
+        upper = 1.0
+        for _ in range(20):
+            upper = key_between(None, upper)
+            self.assertGreater(upper, 0)
+
+    def test_exhausted_gap(self):
+        self.assertIsNone(key_between(1.0, 1.0 + 1e-12))
+        self.assertIsNone(key_between(1e6, 1e6 + 1e-4))
+
+
+class OrderingTests(TestCase):
+    """Move and reorder endpoints"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user("order-admin", role="admin")
+        cls.user = make_user("order-user")
+        cls.book = Book.objects.create(title="Ordering", is_published=True)
+        cls.other_book = Book.objects.create(title="Other", is_published=True)
+        cls.chapters = [
+            Chapter.objects.create(book=cls.book, title=title, order=n)
+            for n, title in enumerate("ABC", 1)
+        ]
+
+    def setUp(self):
+        self.client = client_for(self.admin)
+
+    def titles(self, book):
+        return list(
+            Chapter.objects.filter(book=book)
+            .order_by("order")
+            .values_list("title", flat=True)
+        )
+
+    def move(self, chapter, **data):
+        return self.client.post(
+            reverse("snippets:chapter_move", kwargs={"id": chapter.id}),
+            data,
+            content_type="application/json",
+        )
+
+    def reorder(self, book, ids):
+        return self.client.post(
+            reverse("snippets:chapter_reorder", kwargs={"id": book.id}),
+            {"ids": ids},
+            content_type="application/json",
+        )
+
+    # ==================== MOVE ====================
+    def test_move_after_and_before(self):
+        a, b, c = self.chapters
+        response = self.move(a, after=b.id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["order"], 2.5)
+        self.assertEqual(self.titles(self.book), ["B", "A", "C"])
+
+        self.assertEqual(self.move(c, before=b.id).status_code, 200)
+        self.assertEqual(self.titles(self.book), ["C", "B", "A"])
+
+    def test_move_first_and_last(self):
+        a, b, c = self.chapters
+        self.assertEqual(self.move(c, after=None).status_code, 200)
+        self.assertEqual(self.titles(self.book), ["C", "A", "B"])
+        self.assertEqual(self.move(c, before=None).status_code, 200)
+        self.assertEqual(self.titles(self.book), ["A", "B", "C"])
+
+    def test_move_only_touches_the_moved_row(self):
+        a, b, c = self.chapters
+        self.move(c, after=a.id)
+        self.assertEqual(Chapter.objects.get(id=a.id).order, 1.0)
+        self.assertEqual(Chapter.objects.get(id=b.id).order, 2.0)
+        self.assertEqual(Chapter.objects.get(id=c.id).order, 1.5)
+
+    def test_move_to_another_parent(self):
+        a = self.chapters[0]
+        moved = Chapter.objects.create(book=self.other_book, title="X", order=1)
+        response = self.move(a, book=self.other_book.id, before=moved.id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["book"], self.other_book.id)
+        self.assertEqual(self.titles(self.other_book), ["A", "X"])
+        self.assertEqual(self.titles(self.book), ["B", "C"])
+
+    def test_narrow_gap_rebalances(self):
+        a, b, c = self.chapters
+        Chapter.objects.filter(id=b.id).update(order=1.0 + 1e-12)
+        response = self.move(c, after=a.id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.titles(self.book), ["A", "C", "B"])
+        orders = list(
+            Chapter.objects.filter(book=self.book)
+            .order_by("order")
+            .values_list("order", flat=True)
+        )
+        # Consecutive integers above every previous key
+        self.assertEqual(orders, [4.0, 5.0, 6.0])
+
+    def test_rebalance_query_count_is_constant(self):
+        def rebalance_queries(book, count):
+            chapters = [
+                Chapter.objects.create(book=book, title=str(n), order=1.0 + n * 1e-13)
+                for n in range(count)
+            ]
+            with CaptureQueriesContext(connection) as queries:
+                self.assertTrue(
+                    move(chapters[-1], "book", book.id, "after", chapters[0].id)
+                )
+            return len(queries)
+
+        small = rebalance_queries(Book.objects.create(title="Small"), 3)
+        large = rebalance_queries(Book.objects.create(title="Large"), 40)
+        self.assertEqual(large, small)
+
+    def test_move_errors(self):
+        a, b, _ = self.chapters
+        stranger = Chapter.objects.create(book=self.other_book, title="X", order=1)
+        for data, field in [
+            ({}, "non_field_errors"),
+            ({"after": b.id, "before": b.id}, "non_field_errors"),
+            ({"after": a.id}, "after"),
+            ({"after": stranger.id}, "after"),
+            ({"before": "b"}, "before"),
+            ({"after": None, "book": 0}, "book"),
+        ]:
+            with self.subTest(data=data):
+                response = self.move(a, **data)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(field, response.json())
+        self.assertEqual(self.titles(self.book), ["A", "B", "C"])
+
+    def test_move_other_models(self):
+        section = Section.objects.create(chapter=self.chapters[0], title="S", order=1)
+        snippets = [
+            Snippet.objects.create(section=section, title=str(n), code="x", order=n)
+            for n in (1, 2)
+        ]
+        response = self.client.post(
+            reverse("snippets:snippet_move", kwargs={"id": snippets[1].id}),
+            {"after": None},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            list(section.snippets.order_by("order").values_list("title", flat=True)),
+            ["2", "1"],
+        )
+
+    # ==================== REORDER ====================
+    def test_reorder(self):
+        a, b, c = self.chapters
+        response = self.reorder(self.book, [c.id, a.id, b.id])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            [
+                {"id": c.id, "order": 4.0},
+                {"id": a.id, "order": 5.0},
+                {"id": b.id, "order": 6.0},
+            ],
+        )
+        self.assertEqual(self.titles(self.book), ["C", "A", "B"])
+
+    def test_reorder_must_list_every_child_once(self):
+        a, b, c = self.chapters
+        for ids in ([a.id, b.id], [a.id, b.id, c.id, a.id], [a.id, b.id, 0], "x"):
+            with self.subTest(ids=ids):
+                self.assertEqual(self.reorder(self.book, ids).status_code, 400)
+        self.assertEqual(self.titles(self.book), ["A", "B", "C"])
+
+    def test_admin_only(self):
+        self.client = client_for(self.user)
+        a, b, _ = self.chapters
+        self.assertEqual(self.move(a, after=b.id).status_code, 403)
+        self.assertEqual(self.reorder(self.book, [b.id, a.id]).status_code, 403)
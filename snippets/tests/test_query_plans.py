@@ -0,0 +1,24 @@
+# snippets/tests/test_query_plans.py
+
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+
+class QueryPlansTests(TestCase):
+    """check_query_plans as a regression test: no read query scans a table"""
+
+    # The repo's hosts, without the "testserver" the test runner adds
+    @override_settings(ALLOWED_HOSTS=["localhost"])
+    def test_read_endpoints_use_indexes(self):
+        out = StringIO()
+        call_command(
+            "check_query_plans",
+            books=4,
+            chapters=4,
+            sections=4,
+            snippets=5,
+            stdout=out,
+        )
+        self.assertIn("No sequential scans", out.getvalue())
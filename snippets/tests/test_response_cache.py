@@ -0,0 +1,173 @@
+# snippets/tests/test_response_cache.py
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import include, path, reverse
+
+from snippets import response_cache
+from snippets.async_views import AsyncSnippetDetailView
+from snippets.models import Book, Chapter, Section, Snippet
+
+from .helpers import client_for, make_user
+
+urlpatterns = [
+    path("api/snippets/", include("snippets.urls")),
+    path("async/snippets/<int:id>/", AsyncSnippetDetailView.as_view()),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class ResponseCacheTests(TestCase):
+    """Cached read responses are refreshed by every write to their book"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user("cache-admin", role="admin")
+        cls.user = make_user("cache-user")
+        cls.book = Book.objects.create(title="Cached", is_published=True)
+        cls.other_book = Book.objects.create(title="Other", is_published=True)
+        cls.chapter = Chapter.objects.create(
+            book=cls.book, title="Chapter", order=1, is_published=True
+        )
+        cls.section = Section.objects.create(
+            chapter=cls.chapter, title="Section", order=1, is_published=True
+        )
+        cls.snippet = Snippet.objects.create(
+            section=cls.section, title="Snippet", code="x", order=1, is_published=True
+        )
+        other_chapter = Chapter.objects.create(
+            book=cls.other_book, title="Other", order=1, is_published=True
+        )
+        cls.other_section = Section.objects.create(
+            chapter=other_chapter, title="Other", order=1, is_published=True
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = client_for(self.admin)
+
+    def get(self, name, client=None, **kwargs):
+        """(data, served from the cache) of a read endpoint"""
+        hits = response_cache.stats().get(name, {}).get("hits", 0)
+        response = (client or self.client).get(
+            reverse(f"snippets:{name}", kwargs=kwargs)
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json(), response_cache.stats()[name]["hits"] > hits
+
+    def titles(self, name, **kwargs):
+        data, cached = self.get(name, **kwargs)
+        return [item["title"] for item in data["results"]], cached
+
+    def write(self):
+        """Run the on_commit version bumps of the writes in this block"""
+        return self.captureOnCommitCallbacks(execute=True)
+
+    def test_second_read_is_a_hit(self):
+        first, cached = self.get("book_detail", id=self.book.id)
+        self.assertFalse(cached)
+        second, cached = self.get("book_detail", id=self.book.id)
+        self.assertTrue(cached)
+        self.assertEqual(second, first)
+
+    def test_save_refreshes_the_book(self):
+        self.get("snippet_detail", id=self.snippet.id)
+        self.get("snippet_list", section_id=self.section.id)
+        with self.write():
+            self.snippet.title = "Renamed"
+            self.snippet.save()
+
+        data, cached = self.get("snippet_detail", id=self.snippet.id)
+        self.assertEqual((data["title"], cached), ("Renamed", False))
+        self.assertEqual(
+            self.titles("snippet_list", section_id=self.section.id),
+            (["Renamed"], False),
+        )
+
+    def test_other_books_stay_cached(self):
+        self.get("section_list", chapter_id=self.chapter.id)
+        with self.write():
+            Snippet.objects.create(section=self.other_section, title="New", order=1)
+        _, cached = self.get("section_list", chapter_id=self.chapter.id)
+        self.assertTrue(cached)
+
+    def test_chapter_changes_refresh_the_book_list(self):
+        self.get("book_list")
+        with self.write():
+            Chapter.objects.create(book=self.book, title="Second", order=2)
+        _, cached = self.get("book_list")
+        self.assertFalse(cached)
+
+    def test_delete_refreshes_the_book(self):
+        self.get("chapter_list", book_id=self.book.id)
+        with self.write():
+            self.client.delete(
+                reverse("snippets:chapter_delete", kwargs={"id": self.chapter.id})
+            )
+        self.assertEqual(self.titles("chapter_list", book_id=self.book.id), ([], False))
+
+    def test_move_refreshes_both_books(self):
+        self.get("snippet_list", section_id=self.section.id)
+        self.get("snippet_list", section_id=self.other_section.id)
+        self.get("snippet_detail", id=self.snippet.id)
+        with self.write():
+            response = self.client.post(
+                reverse("snippets:snippet_move", kwargs={"id": self.snippet.id}),
+                {"section": self.other_section.id, "after": None},
+                content_type="application/json",
+            )
+            self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(
+            self.titles("snippet_list", section_id=self.section.id), ([], False)
+        )
+        self.assertEqual(
+            self.titles("snippet_list", section_id=self.other_section.id),
+            (["Snippet"], False),
+        )
+        data, cached = self.get("snippet_detail", id=self.snippet.id)
+        self.assertEqual((data["section"], cached), (self.other_section.id, False))
+        # Now cached under the snippet's new book: its writes refresh it
+        with self.write():
+            Snippet.objects.filter(id=self.snippet.id).update(title="Moved")
+            self.other_book.save()
+        data, cached = self.get("snippet_detail", id=self.snippet.id)
+        self.assertEqual((data["title"], cached), ("Moved", False))
+
+    def test_bulk_writes_refresh_the_book(self):
+        self.get("chapter_list", book_id=self.book.id)
+        with self.write():
+            response = self.client.patch(
+                reverse("snippets:chapter_bulk_update"),
+                [{"id": self.chapter.id, "title": "Bulk"}],
+                content_type="application/json",
+            )
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.titles("chapter_list", book_id=self.book.id), (["Bulk"], False)
+        )
+
+    def test_users_and_admins_are_cached_apart(self):
+        with self.write():
+            Snippet.objects.create(section=self.section, title="Draft", order=2)
+        user = client_for(self.user)
+        self.assertEqual(
+            self.titles("snippet_list", section_id=self.section.id),
+            (["Snippet", "Draft"], False),
+        )
+        data, cached = self.get("snippet_list", client=user, section_id=self.section.id)
+        self.assertEqual([item["title"] for item in data["results"]], ["Snippet"])
+        self.assertFalse(cached)
+
+    def test_async_views_share_the_cache(self):
+        data, _ = self.get("snippet_detail", id=self.snippet.id)
+        hits = response_cache.stats()["snippet_detail"]["hits"]
+        response = self.client.get(f"/async/snippets/{self.snippet.id}/")
+        self.assertEqual(response.json(), data)
+        self.assertEqual(response_cache.stats()["snippet_detail"]["hits"], hits + 1)
+
+        with self.write():
+            Snippet.objects.filter(id=self.snippet.id).update(title="Async")
+            self.book.save()
+        response = self.client.get(f"/async/snippets/{self.snippet.id}/")
+        self.assertEqual(response.json()["title"], "Async")
@@ -0,0 +1,48 @@
+# snippets/toc.py
+
+from .models import Chapter, Section, Snippet
+
+TOC_FIELDS = ("id", "title", "order", "is_published")
+
+
+def build_toc(book, user):
+    """
+    Chapter -> section -> snippet title tree of a book.
+    Three values() queries regardless of book size, grouped in Python.
+    """
+    chapters = Chapter.objects.filter(book_id=book.id)
+    sections = Section.objects.filter(chapter__book_id=book.id)
+    snippets = Snippet.objects.filter(section__chapter__book_id=book.id)
+
+    if user.role != "admin":
+        chapters = chapters.filter(is_published=True)
+        sections = sections.filter(is_published=True)
+        snippets = snippets.filter(is_published=True)
+
+    toc_chapters = []
+    chapters_by_id = {}
+    for chapter in chapters.order_by("order").values(*TOC_FIELDS):
+        chapter["sections"] = []
+        chapters_by_id[chapter["id"]] = chapter
+        toc_chapters.append(chapter)
+
+    # Children of hidden parents have no parent entry and are dropped
+    sections_by_id = {}
+    for section in sections.order_by("order").values(*TOC_FIELDS, "chapter_id"):
+        chapter = chapters_by_id.get(section.pop("chapter_id"))
+        if chapter is not None:
+            section["snippets"] = []
+            sections_by_id[section["id"]] = section
+            chapter["sections"].append(section)
+
+    for snippet in snippets.order_by("order").values(*TOC_FIELDS, "section_id"):
+        section = sections_by_id.get(snippet.pop("section_id"))
+        if section is not None:
+            section["snippets"].append(snippet)
+
+    return {
+        "id": book.id,
+        "title": book.title,
+        "is_published": book.is_published,
+        "chapters": toc_chapters,
+    }
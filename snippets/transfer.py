@@ -0,0 +1,266 @@
+# snippets/transfer.py
+
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .highlight import rendered_fields
+from .models import Book, Chapter, Section, Snippet
+from .signals import bulk_changed
+
+# Rows fetched per query while exporting, rows written per transaction
+# while importing
+EXPORT_CHUNK = 2000
+IMPORT_BATCH = 500
+
+BOOK_FIELDS = ("title", "description", "is_published")
+
+# Record type -> (model, parent field, exported fields), parents first
+LEVELS = {
+    "chapter": (Chapter, "book", ("title", "order", "is_published")),
+    "section": (Section, "chapter", ("title", "order", "is_published")),
+    "snippet": (
+        Snippet,
+        "section",
+        ("title", "code", "language", "explanation", "order", "is_published"),
+    ),
+}
+
+
+class TransferError(Exception):
+    """Malformed or inconsistent import data"""
+
+
+def _line(record):
+    return json.dumps(record, ensure_ascii=False) + "\n"
+
+
+# ==================== EXPORT ====================
+def export_book(book):
+    """
+    NDJSON lines of a book and its whole tree: the book, then chapters,
+    sections and snippets, parents before children. Rows are streamed
+    with iterator(), so memory stays bounded for any book size.
+    """
+    record = {"type": "book", **{field: getattr(book, field) for field in BOOK_FIELDS}}
+    record["created_by"] = book.created_by.username if book.created_by else None
+    yield _line(record)
+
+    querysets = {
+        "chapter": Chapter.objects.filter(book=book).order_by("order"),
+        "section": Section.objects.filter(chapter__book=book).order_by(
+            "chapter_id", "order"
+        ),
+        "snippet": Snippet.objects.filter(section__chapter__book=book).order_by(
+            "section_id", "order"
+        ),
+    }
+    for kind, queryset in querysets.items():
+        _, parent, fields = LEVELS[kind]
+        columns = ["id", f"{parent}_id", *fields]
+        if kind == "snippet":
+            columns.append("created_by__username")
+        rows = queryset.values(*columns).iterator(chunk_size=EXPORT_CHUNK)
+        for row in rows:
+            record = {
+                "type": kind,
+                "id": row.pop("id"),
+                parent: row.pop(f"{parent}_id"),
+            }
+            if kind == "snippet":
+                row["created_by"] = row.pop("created_by__username")
+            record.update(row)
+            yield _line(record)
+
+
+async def aexport_book(book):
+    """
+    export_book() for ASGI responses, which read a sync iterator whole
+    before sending it: the lines are built in a worker thread, up to
+    EXPORT_CHUNK at a time, and sent as they come
+    """
+    lines = export_book(book)
+    next_chunk = sync_to_async(lambda: list(islice(lines, EXPORT_CHUNK)))
+    try:
+        while chunk := await next_chunk():
+            yield "".join(chunk)
+    finally:
+        # Closes the server-side cursor in the thread that opened it
+        await sync_to_async(lines.close)()
+
+
+# ==================== IMPORT ====================
+class _Importer:
+    """
+    Writes records in batches, one transaction per batch. Rows are matched
+    by natural key (book title, then parent + order, unique per parent),
+    so re-running an interrupted or finished import only creates what is
+    missing. Source ids are remapped to the ids of the created rows.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.book = None
+        self.book_created = False
+        # Source id -> id here, for the levels that have children
+        self.ids = {"chapter": {}, "section": {}}
+        self.users = {}
+        self.pending = []
+        self.pending_kind = None
+        self.counts = {kind: {"created": 0, "existing": 0} for kind in LEVELS}
+
+    def _user(self, username):
+        """Author by username, falling back to the importing user"""
+        if username not in self.users:
+            User = get_user_model()
+            self.users[username] = (
+                User.objects.filter(username=username).first() if username else None
+            )
+        return self.users[username] or self.user
+
+    def add(self, number, record):
+        kind = record.get("type") if isinstance(record, dict) else None
+        if kind == "book":
+            if self.book is not None:
+                raise TransferError(f"Line {number}: only one book per import")
+            self._add_book(number, record)
+        elif kind in LEVELS:
+            if self.book is None:
+                raise TransferError(f"Line {number}: the book must come first")
+            if kind != self.pending_kind:
+                self.flush()
+                self.pending_kind = kind
+            self.pending.append((number, record))
+            if len(self.pending) >= IMPORT_BATCH:
+                self.flush()
+        else:
+            raise TransferError(f"Line {number}: unknown record type {kind!r}")
+
+    def _add_book(self, number, record):
+        title = record.get("title")
+        if not isinstance(title, str) or not title:
+            raise TransferError(f"Line {number}: book title is required")
+        defaults = {
+            field: record[field] for field in BOOK_FIELDS[1:] if field in record
+        }
+        defaults["created_by"] = self._user(record.get("created_by"))
+        # A regular save: signals invalidate the book list
+        self.book, self.book_created = Book.objects.get_or_create(
+            title=title, defaults=defaults
+        )
+
+    def _build(self, kind, number, record):
+        """Unsaved row for record, with its parent remapped and fields checked"""
+        model, parent, fields = LEVELS[kind]
+        if kind == "chapter":
+            parent_id = self.book.id
+        else:
+            parent_id = self.ids[parent].get(record.get(parent))
+            if parent_id is None:
+                raise TransferError(
+                    f"Line {number}: unknown {parent} {record.get(parent)!r}"
+                )
+
+        obj = model(
+            **{f"{parent}_id": parent_id},
+            **{field: record[field] for field in fields if field in record},
+        )
+        if kind == "snippet":
+            obj.created_by = self._user(record.get("created_by"))
+        try:
+            obj.clean_fields(exclude=[parent, "created_by"])
+        except ValidationError as e:
+            raise TransferError(f"Line {number}: {e.message_dict}") from e
+        return obj
+
+    def flush(self):
+        if not self.pending:
+            return
+        kind, pending = self.pending_kind, self.pending
+        self.pending = []
+        model, parent, _ = LEVELS[kind]
+        parent_attname = f"{parent}_id"
+
+        rows = [
+            (number, record, self._build(kind, number, record))
+            for number, record in pending
+        ]
+        siblings = model.objects.filter(
+            **{
+                f"{parent_attname}__in": {
+                    getattr(obj, parent_attname) for _, _, obj in rows
+                },
+                "order__in": {obj.order for _, _, obj in rows},
+            }
+        ).values_list(parent_attname, "order", "pk")
+        existing = {(parent_id, order): pk for parent_id, order, pk in siblings}
+
+        created = []
+        for number, record, obj in rows:
+            key = (getattr(obj, parent_attname), obj.order)
+            if key in existing:
+                if existing[key] is None:
+                    raise TransferError(
+                        f"Line {number}: duplicate {parent} and order {obj.order}"
+                    )
+                obj.pk = existing[key]
+                self.counts[kind]["existing"] += 1
+            else:
+                # Placeholder until bulk_create assigns the id
+                existing[key] = None
+                created.append(obj)
+
+        if kind == "snippet":
+            for obj in created:
+                for name, value in rendered_fields(obj.code, obj.language).items():
+                    setattr(obj, name, value)
+
+        with transaction.atomic():
+            model.objects.bulk_create(created)
+            if created:
+                bulk_changed(model, {getattr(obj, parent_attname) for obj in created})
+        self.counts[kind]["created"] += len(created)
+
+        if kind in self.ids:
+            for _, record, obj in rows:
+                self.ids[kind][record.get("id")] = obj.pk
+
+    def result(self):
+        return {
+            "book": {
+                "id": self.book.id,
+                "title": self.book.title,
+                "created": self.book_created,
+            },
+            **{f"{kind}s": counts for kind, counts in self.counts.items()},
+        }
+
+
+def import_book(lines, user=None):
+    """
+    Import a book from export_book() NDJSON lines (str or bytes).
+    user is the author of rows whose exported author doesn't exist here.
+    Raises TransferError; batches written before the error stay, and
+    importing the same data again resumes where it stopped.
+    """
+    importer = _Importer(user)
+    for number, line in enumerate(lines, 1):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            raise TransferError(f"Line {number}: invalid JSON ({e})") from e
+        importer.add(number, record)
+
+    if importer.book is None:
+        raise TransferError("No book record found")
+    importer.flush()
+    return importer.result()
@@ -1,79 +1,200 @@
 # snippets/urls.py
 
+from django.conf import settings
 from django.urls import path
 
+from .async_views import (
+    AsyncBookDetailView,
+    AsyncBookListView,
+    AsyncChapterDetailView,
+    AsyncChapterListView,
+    AsyncSectionDetailView,
+    AsyncSectionListView,
+    AsyncSnippetDetailView,
+    AsyncSnippetListView,
+)
 from .views import (
     BookCreateView,
     BookDeleteView,
     BookDetailView,
+    BookExportView,
+    BookImportView,
     BookListView,
+    BookTocView,
     BookUpdateView,
+    ChapterBulkCreateView,
+    ChapterBulkDeleteView,
+    ChapterBulkUpdateView,
     ChapterCreateView,
     ChapterDeleteView,
     ChapterDetailView,
     ChapterListView,
+    ChapterMoveView,
+    ChapterReorderView,
     ChapterUpdateView,
+    SectionBulkCreateView,
+    SectionBulkDeleteView,
+    SectionBulkUpdateView,
     SectionCreateView,
     SectionDeleteView,
     SectionDetailView,
     SectionListView,
+    SectionMoveView,
+    SectionReorderView,
     SectionUpdateView,
+    SnippetBulkCreateView,
+    SnippetBulkDeleteView,
+    SnippetBulkUpdateView,
     SnippetCreateView,
     SnippetDeleteView,
     SnippetDetailView,
     SnippetListView,
+    SnippetMoveView,
+    SnippetReorderView,
+    SnippetSearchView,
     SnippetUpdateView,
 )
 
 app_name = "snippets"
 
+
+def read_view(view, async_view):
+    """The async version of a read endpoint when ASYNC_READ_VIEWS is on"""
+    if settings.ASYNC_READ_VIEWS:
+        return async_view.as_view()
+    return view.as_view()
+
+
 urlpatterns = [
     # Book endpoints
-    path("books/", BookListView.as_view(), name="book_list"),
+    path("books/", read_view(BookListView, AsyncBookListView), name="book_list"),
     path("books/create/", BookCreateView.as_view(), name="book_create"),
-    path("books/<int:id>/", BookDetailView.as_view(), name="book_detail"),
+    path(
+        "books/<int:id>/",
+        read_view(BookDetailView, AsyncBookDetailView),
+        name="book_detail",
+    ),
+    path("books/<int:id>/toc/", BookTocView.as_view(), name="book_toc"),
+    path("books/<int:id>/export/", BookExportView.as_view(), name="book_export"),
+    path("books/import/", BookImportView.as_view(), name="book_import"),
     path("books/<int:id>/update/", BookUpdateView.as_view(), name="book_update"),
     path("books/<int:id>/delete/", BookDeleteView.as_view(), name="book_delete"),
     # Chapter endpoints
     path(
         "books/<int:book_id>/chapters/",
-        ChapterListView.as_view(),
+        read_view(ChapterListView, AsyncChapterListView),
         name="chapter_list",
     ),
     path("chapters/create/", ChapterCreateView.as_view(), name="chapter_create"),
-    path("chapters/<int:id>/", ChapterDetailView.as_view(), name="chapter_detail"),
+    path(
+        "chapters/bulk-create/",
+        ChapterBulkCreateView.as_view(),
+        name="chapter_bulk_create",
+    ),
+    path(
+        "chapters/bulk-update/",
+        ChapterBulkUpdateView.as_view(),
+        name="chapter_bulk_update",
+    ),
+    path(
+        "chapters/bulk-delete/",
+        ChapterBulkDeleteView.as_view(),
+        name="chapter_bulk_delete",
+    ),
+    path(
+        "chapters/<int:id>/",
+        read_view(ChapterDetailView, AsyncChapterDetailView),
+        name="chapter_detail",
+    ),
     path(
         "chapters/<int:id>/update/", ChapterUpdateView.as_view(), name="chapter_update"
     ),
     path(
         "chapters/<int:id>/delete/", ChapterDeleteView.as_view(), name="chapter_delete"
     ),
+    path("chapters/<int:id>/move/", ChapterMoveView.as_view(), name="chapter_move"),
+    path(
+        "books/<int:id>/chapters/reorder/",
+        ChapterReorderView.as_view(),
+        name="chapter_reorder",
+    ),
     # Section endpoints
     path(
         "chapters/<int:chapter_id>/sections/",
-        SectionListView.as_view(),
+        read_view(SectionListView, AsyncSectionListView),
         name="section_list",
     ),
     path("sections/create/", SectionCreateView.as_view(), name="section_create"),
-    path("sections/<int:id>/", SectionDetailView.as_view(), name="section_detail"),
+    path(
+        "sections/bulk-create/",
+        SectionBulkCreateView.as_view(),
+        name="section_bulk_create",
+    ),
+    path(
+        "sections/bulk-update/",
+        SectionBulkUpdateView.as_view(),
+        name="section_bulk_update",
+    ),
+    path(
+        "sections/bulk-delete/",
+        SectionBulkDeleteView.as_view(),
+        name="section_bulk_delete",
+    ),
+    path(
+        "sections/<int:id>/",
+        read_view(SectionDetailView, AsyncSectionDetailView),
+        name="section_detail",
+    ),
     path(
         "sections/<int:id>/update/", SectionUpdateView.as_view(), name="section_update"
     ),
     path(
         "sections/<int:id>/delete/", SectionDeleteView.as_view(), name="section_delete"
     ),
+    path("sections/<int:id>/move/", SectionMoveView.as_view(), name="section_move"),
+    path(
+        "chapters/<int:id>/sections/reorder/",
+        SectionReorderView.as_view(),
+        name="section_reorder",
+    ),
     # Snippet endpoints
     path(
         "sections/<int:section_id>/snippets/",
-        SnippetListView.as_view(),
+        read_view(SnippetListView, AsyncSnippetListView),
         name="snippet_list",
     ),
+    path("snippets/search/", SnippetSearchView.as_view(), name="snippet_search"),
     path("snippets/create/", SnippetCreateView.as_view(), name="snippet_create"),
-    path("snippets/<int:id>/", SnippetDetailView.as_view(), name="snippet_detail"),
+    path(
+        "snippets/bulk-create/",
+        SnippetBulkCreateView.as_view(),
+        name="snippet_bulk_create",
+    ),
+    path(
+        "snippets/bulk-update/",
+        SnippetBulkUpdateView.as_view(),
+        name="snippet_bulk_update",
+    ),
+    path(
+        "snippets/bulk-delete/",
+        SnippetBulkDeleteView.as_view(),
+        name="snippet_bulk_delete",
+    ),
+    path(
+        "snippets/<int:id>/",
+        read_view(SnippetDetailView, AsyncSnippetDetailView),
+        name="snippet_detail",
+    ),
     path(
         "snippets/<int:id>/update/", SnippetUpdateView.as_view(), name="snippet_update"
     ),
     path(
         "snippets/<int:id>/delete/", SnippetDeleteView.as_view(), name="snippet_delete"
     ),
+    path("snippets/<int:id>/move/", SnippetMoveView.as_view(), name="snippet_move"),
+    path(
+        "sections/<int:id>/snippets/reorder/",
+        SnippetReorderView.as_view(),
+        name="snippet_reorder",
+    ),
 ]
@@ -0,0 +1,16 @@
+# snippets/vendor_sql.py
+
+
+def run_for_vendor(statements):
+    """
+    RunPython function executing the SQL statements listed for the
+    connection's vendor ({"postgresql": [...], "sqlite": [...]}); other
+    databases are skipped
+    """
+
+    def run(apps, schema_editor):
+        vendor_statements = statements.get(schema_editor.connection.vendor, [])
+        for statement in vendor_statements:
+            schema_editor.execute(statement)
+
+    return run
@@ -1,7 +1,16 @@
 # snippets/views.py
 
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, StreamingHttpResponse
+from django.utils.text import slugify
+from django.db.models import Count, Prefetch, Q
 from rest_framework import generics
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
 
 from accounts.permissions import IsAdmin
 
@@ -11,6 +20,9 @@ from .serializers import (
     BookDetailSerializer,
     BookListSerializer,
     BookSerializer,
+    BulkChapterSerializer,
+    BulkSectionSerializer,
+    BulkSnippetSerializer,
     ChapterDetailSerializer,
     ChapterListSerializer,
     ChapterSerializer,
@@ -19,33 +31,105 @@ from .serializers import (
     SectionSerializer,
     SnippetSerializer,
 )
+from .conditional import ConditionalGetMixin
+from .response_cache import CachedResponseMixin
+from .bulk import BulkCreateView, BulkDeleteView, BulkUpdateView
+from .code_search import search_code
+from .highlight import wants_html
+from .ordering import MoveView, ReorderView
+from .rows import row_mapper
+from .search import search_snippets
+from .transfer import TransferError, aexport_book, export_book, import_book
+from .toc import build_toc
+
+
+def visible_count(relation, user):
+    """Count of related rows; regular users only count published ones"""
+    if user.role == "admin":
+        return Count(relation)
+    return Count(relation, filter=Q(**{f"{relation}__is_published": True}))
+
+
+def visible(queryset, user):
+    """Regular users only see published rows"""
+    if user.role == "admin":
+        return queryset
+    return queryset.filter(is_published=True)
+
+
+def visible_prefetch(relation, queryset, user):
+    """Prefetch of related rows; regular users only get published ones"""
+    if user.role != "admin":
+        queryset = queryset.filter(is_published=True)
+    return Prefetch(relation, queryset=queryset)
 
 
 # ==================== BOOK VIEWS ====================
-class BookListView(generics.ListAPIView):
+class BookListView(ConditionalGetMixin, CachedResponseMixin, generics.ListAPIView):
     """List all books (users see only published, admins see all)"""
 
+    cache_endpoint = "book_list"
+
     serializer_class = BookListSerializer
     permission_classes = [IsAuthenticated]
+    pagination_ordering = ("title",)
+
+    validator_model = Book
+    validator_relation = "chapters"
 
     def get_queryset(self):
+        queryset = Book.objects.select_related("created_by").annotate(
+            chapters_count=visible_count("chapters", self.request.user)
+        )
         if self.request.user.role == "admin":
-            return Book.objects.all()
-        return Book.objects.filter(is_published=True)
+            return queryset
+        return queryset.filter(is_published=True)
 
 
-class BookDetailView(generics.RetrieveAPIView):
+class BookDetailView(
+    ConditionalGetMixin, CachedResponseMixin, generics.RetrieveAPIView
+):
     """Get single book with chapter IDs (lazy loading)"""
 
+    cache_endpoint = "book_detail"
+    cache_model = Book
+
     serializer_class = BookDetailSerializer
     permission_classes = [IsAdminOrReadOnly]
     lookup_field = "id"
 
+    validator_model = Book
+    validator_url_kwarg = "id"
+    validator_relation = "chapters"
+
     def get_queryset(self):
         # Only prefetch chapters, not all nested data
+        queryset = Book.objects.select_related("created_by").prefetch_related(
+            visible_prefetch(
+                "chapters", Chapter.objects.order_by("order"), self.request.user
+            )
+        )
+        if self.request.user.role == "admin":
+            return queryset
+        return queryset.filter(is_published=True)
+
+
+class BookTocView(CachedResponseMixin, generics.RetrieveAPIView):
+    """Whole chapter/section/snippet title tree of a book in one response"""
+
+    cache_endpoint = "book_toc"
+    cache_model = Book
+
+    permission_classes = [IsAdminOrReadOnly]
+    lookup_field = "id"
+
+    def get_queryset(self):
         if self.request.user.role == "admin":
-            return Book.objects.prefetch_related("chapters")
-        return Book.objects.filter(is_published=True).prefetch_related("chapters")
+            return Book.objects.all()
+        return Book.objects.filter(is_published=True)
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(build_toc(self.get_object(), request.user))
 
 
 class BookCreateView(generics.CreateAPIView):
@@ -75,16 +159,71 @@ class BookDeleteView(generics.DestroyAPIView):
     lookup_field = "id"
 
 
+class BookExportView(generics.RetrieveAPIView):
+    """Stream a book with its whole tree as NDJSON (admin only)"""
+
+    queryset = Book.objects.select_related("created_by")
+    permission_classes = [IsAuthenticated, IsAdmin]
+    lookup_field = "id"
+
+    def retrieve(self, request, *args, **kwargs):
+        book = self.get_object()
+        # Served by daphne or by a WSGI server (gunicorn)
+        if isinstance(request._request, ASGIRequest):
+            lines = aexport_book(book)
+        else:
+            lines = export_book(book)
+        response = StreamingHttpResponse(lines, content_type="application/x-ndjson")
+        response["Content-Disposition"] = (
+            f'attachment; filename="{slugify(book.title) or book.id}.ndjson"'
+        )
+        return response
+
+
+class BookImportView(generics.GenericAPIView):
+    """
+    Import a book from the NDJSON of BookExportView (admin only).
+    Idempotent: rows that already exist are skipped, so a failed import
+    can simply be sent again.
+    """
+
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def post(self, request, *args, **kwargs):
+        # Read line by line from the body instead of parsing it as a whole
+        if request.stream is None:
+            raise ValidationError({"non_field_errors": ["Empty request body."]})
+        try:
+            result = import_book(request.stream, user=request.user)
+        except TransferError as e:
+            raise ValidationError({"non_field_errors": [str(e)]})
+        return Response(result)
+
+
 # ==================== CHAPTER VIEWS ====================
-class ChapterListView(generics.ListAPIView):
+class ChapterListView(ConditionalGetMixin, CachedResponseMixin, generics.ListAPIView):
     """List chapters for a specific book"""
 
+    cache_endpoint = "chapter_list"
+    cache_model = Book
+    cache_url_kwarg = "book_id"
+
     serializer_class = ChapterListSerializer
     permission_classes = [IsAuthenticated]
+    pagination_ordering = ("order", "id")
+
+    validator_model = Chapter
+    validator_url_kwarg = "book_id"
+    validator_relation = "sections"
+    validator_parent = "book"
 
     def get_queryset(self):
         book_id = self.kwargs.get("book_id")
-        queryset = Chapter.objects.filter(book_id=book_id)
+        queryset = (
+            Chapter.objects.filter(book_id=book_id)
+            .select_related("book")
+            .annotate(sections_count=visible_count("sections", self.request.user))
+        )
 
         if self.request.user.role == "user":
             queryset = queryset.filter(is_published=True)
@@ -92,18 +231,32 @@ class ChapterListView(generics.ListAPIView):
         return queryset
 
 
-class ChapterDetailView(generics.RetrieveAPIView):
+class ChapterDetailView(
+    ConditionalGetMixin, CachedResponseMixin, generics.RetrieveAPIView
+):
     """Get single chapter with section IDs (lazy loading)"""
 
+    cache_endpoint = "chapter_detail"
+    cache_model = Chapter
+
     serializer_class = ChapterDetailSerializer
     permission_classes = [IsAdminOrReadOnly]
     lookup_field = "id"
 
+    validator_model = Chapter
+    validator_url_kwarg = "id"
+    validator_relation = "sections"
+
     def get_queryset(self):
         # Only prefetch sections, not snippets
+        queryset = Chapter.objects.prefetch_related(
+            visible_prefetch(
+                "sections", Section.objects.order_by("order"), self.request.user
+            )
+        )
         if self.request.user.role == "admin":
-            return Chapter.objects.prefetch_related("sections")
-        return Chapter.objects.filter(is_published=True).prefetch_related("sections")
+            return queryset
+        return queryset.filter(is_published=True)
 
 
 class ChapterCreateView(generics.CreateAPIView):
@@ -131,15 +284,29 @@ class ChapterDeleteView(generics.DestroyAPIView):
 
 
 # ==================== SECTION VIEWS ====================
-class SectionListView(generics.ListAPIView):
+class SectionListView(ConditionalGetMixin, CachedResponseMixin, generics.ListAPIView):
     """List sections for a specific chapter"""
 
+    cache_endpoint = "section_list"
+    cache_model = Chapter
+    cache_url_kwarg = "chapter_id"
+
     serializer_class = SectionListSerializer
     permission_classes = [IsAuthenticated]
+    pagination_ordering = ("order", "id")
+
+    validator_model = Section
+    validator_url_kwarg = "chapter_id"
+    validator_relation = "snippets"
+    validator_parent = "chapter"
 
     def get_queryset(self):
         chapter_id = self.kwargs.get("chapter_id")
-        queryset = Section.objects.filter(chapter_id=chapter_id)
+        queryset = (
+            Section.objects.filter(chapter_id=chapter_id)
+            .select_related("chapter")
+            .annotate(snippets_count=visible_count("snippets", self.request.user))
+        )
 
         if self.request.user.role == "user":
             queryset = queryset.filter(is_published=True)
@@ -147,18 +314,57 @@ class SectionListView(generics.ListAPIView):
         return queryset
 
 
-class SectionDetailView(generics.RetrieveAPIView):
+class SectionDetailView(
+    ConditionalGetMixin, CachedResponseMixin, generics.RetrieveAPIView
+):
     """Get single section with full snippets (loaded on demand)"""
 
+    cache_endpoint = "section_detail"
+    cache_model = Section
+
     serializer_class = SectionDetailSerializer
     permission_classes = [IsAdminOrReadOnly]
     lookup_field = "id"
 
+    validator_model = Section
+    validator_url_kwarg = "id"
+    validator_relation = "snippets"
+
     def get_queryset(self):
         # NOW we load snippets, only when section is actually viewed
+        snippets = Snippet.objects.select_related("created_by").order_by("order")
+        if not wants_html(self.request):
+            snippets = snippets.defer("code_html")
+        queryset = Section.objects.prefetch_related(
+            visible_prefetch("snippets", snippets, self.request.user)
+        )
         if self.request.user.role == "admin":
-            return Section.objects.prefetch_related("snippets")
-        return Section.objects.filter(is_published=True).prefetch_related("snippets")
+            return queryset
+        return queryset.filter(is_published=True)
+
+    def retrieve(self, request, *args, **kwargs):
+        if not settings.FAST_READ_PATH:
+            return super().retrieve(request, *args, **kwargs)
+
+        # Same response as the serializers, from two values() queries
+        section_mapper = row_mapper(SectionDetailSerializer, request)
+        snippet_mapper = row_mapper(SnippetSerializer, request)
+        section = (
+            visible(Section.objects.filter(id=self.kwargs["id"]), request.user)
+            .values(*section_mapper.columns)
+            .first()
+        )
+        if section is None:
+            # Same message as get_object()
+            raise Http404("No Section matches the given query.")
+        snippets = snippet_mapper.many(
+            visible(Snippet.objects.filter(section_id=section["id"]), request.user)
+            .order_by("order")
+            .values(*snippet_mapper.columns)
+        )
+        return Response(
+            section_mapper.map(section, snippets=snippets, snippets_count=len(snippets))
+        )
 
 
 class SectionCreateView(generics.CreateAPIView):
@@ -186,33 +392,65 @@ class SectionDeleteView(generics.DestroyAPIView):
 
 
 # ==================== SNIPPET VIEWS ====================
-class SnippetListView(generics.ListAPIView):
+class SnippetListView(ConditionalGetMixin, CachedResponseMixin, generics.ListAPIView):
     """List snippets for a specific section"""
 
+    cache_endpoint = "snippet_list"
+    cache_model = Section
+    cache_url_kwarg = "section_id"
+
     serializer_class = SnippetSerializer
     permission_classes = [IsAuthenticated]
+    pagination_ordering = ("order", "id")
+
+    validator_model = Snippet
+    validator_url_kwarg = "section_id"
 
     def get_queryset(self):
         section_id = self.kwargs.get("section_id")
-        queryset = Snippet.objects.filter(section_id=section_id)
+        queryset = Snippet.objects.filter(section_id=section_id).select_related(
+            "created_by"
+        )
+        if not wants_html(self.request):
+            queryset = queryset.defer("code_html")
 
         if self.request.user.role == "user":
             queryset = queryset.filter(is_published=True)
 
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        if not settings.FAST_READ_PATH:
+            return super().list(request, *args, **kwargs)
+
+        # Same response as the serializer, from one values() query per page
+        mapper = row_mapper(self.get_serializer_class(), request)
+        page = self.paginate_queryset(self.get_queryset().values(*mapper.columns))
+        return self.get_paginated_response(mapper.many(page))
 
-class SnippetDetailView(generics.RetrieveAPIView):
+
+class SnippetDetailView(
+    ConditionalGetMixin, CachedResponseMixin, generics.RetrieveAPIView
+):
     """Get single snippet"""
 
+    cache_endpoint = "snippet_detail"
+    cache_model = Snippet
+
     serializer_class = SnippetSerializer
     permission_classes = [IsAdminOrReadOnly]
     lookup_field = "id"
 
+    validator_model = Snippet
+    validator_url_kwarg = "id"
+
     def get_queryset(self):
+        queryset = Snippet.objects.all()
+        if not wants_html(self.request):
+            queryset = queryset.defer("code_html")
         if self.request.user.role == "admin":
-            return Snippet.objects.all()
-        return Snippet.objects.filter(is_published=True)
+            return queryset
+        return queryset.filter(is_published=True)
 
 
 class SnippetCreateView(generics.CreateAPIView):
@@ -239,4 +477,181 @@ class SnippetDeleteView(generics.DestroyAPIView):
 
     queryset = Snippet.objects.all()
     permission_classes = [IsAuthenticated, IsAdmin]
-    lookup_field = "id"
\ No newline at end of file
+    lookup_field = "id"
+
+
+# ==================== BULK VIEWS ====================
+class ChapterBulkCreateView(BulkCreateView):
+    """Create many chapters in one transaction (admin only)"""
+
+    serializer_class = BulkChapterSerializer
+
+
+class ChapterBulkUpdateView(BulkUpdateView):
+    """Update many chapters in one transaction (admin only)"""
+
+    queryset = Chapter.objects.all()
+    serializer_class = BulkChapterSerializer
+
+
+class ChapterBulkDeleteView(BulkDeleteView):
+    """Delete many chapters in one transaction (admin only)"""
+
+    serializer_class = BulkChapterSerializer
+
+
+class SectionBulkCreateView(BulkCreateView):
+    """Create many sections in one transaction (admin only)"""
+
+    serializer_class = BulkSectionSerializer
+
+
+class SectionBulkUpdateView(BulkUpdateView):
+    """Update many sections in one transaction (admin only)"""
+
+    queryset = Section.objects.all()
+    serializer_class = BulkSectionSerializer
+
+
+class SectionBulkDeleteView(BulkDeleteView):
+    """Delete many sections in one transaction (admin only)"""
+
+    serializer_class = BulkSectionSerializer
+
+
+class SnippetBulkCreateView(BulkCreateView):
+    """Create many snippets in one transaction (admin only)"""
+
+    serializer_class = BulkSnippetSerializer
+
+    def get_save_kwargs(self):
+        return {"created_by": self.request.user}
+
+
+class SnippetBulkUpdateView(BulkUpdateView):
+    """Update many snippets in one transaction (admin only)"""
+
+    queryset = Snippet.objects.select_related("created_by")
+    serializer_class = BulkSnippetSerializer
+
+
+class SnippetBulkDeleteView(BulkDeleteView):
+    """Delete many snippets in one transaction (admin only)"""
+
+    serializer_class = BulkSnippetSerializer
+
+
+# ==================== ORDERING VIEWS ====================
+class ChapterMoveView(MoveView):
+    """Move a chapter before/after a sibling, optionally to another book"""
+
+    queryset = Chapter.objects.all()
+    serializer_class = ChapterSerializer
+    parent_field = "book"
+
+
+class SectionMoveView(MoveView):
+    """Move a section before/after a sibling, optionally to another chapter"""
+
+    queryset = Section.objects.all()
+    serializer_class = SectionSerializer
+    parent_field = "chapter"
+
+
+class SnippetMoveView(MoveView):
+    """Move a snippet before/after a sibling, optionally to another section"""
+
+    queryset = Snippet.objects.select_related("created_by")
+    serializer_class = SnippetSerializer
+    parent_field = "section"
+
+
+class ChapterReorderView(ReorderView):
+    """Reorder all chapters of a book"""
+
+    model = Chapter
+    parent_field = "book"
+
+
+class SectionReorderView(ReorderView):
+    """Reorder all sections of a chapter"""
+
+    model = Section
+    parent_field = "chapter"
+
+
+class SnippetReorderView(ReorderView):
+    """Reorder all snippets of a section"""
+
+    model = Snippet
+    parent_field = "section"
+
+
+# ==================== SEARCH VIEWS ====================
+class SnippetSearchView(generics.GenericAPIView):
+    """
+    Search over snippets:
+    ?q=<text>&mode=<text|code>&language=<lang>[&language=...]&page=<n>&page_size=<n>
+
+    mode=text (default): ranked full-text search with highlighted excerpts
+    mode=code: literal substring of the code (identifiers, operators), in id order
+    """
+
+    permission_classes = [IsAuthenticated]
+    page_size_query_param = "page_size"
+    search_modes = {"text": search_snippets, "code": search_code}
+
+    def get(self, request):
+        query = request.query_params.get("q", "").strip()
+        if not query:
+            raise ValidationError({"q": "This query parameter is required."})
+
+        mode = request.query_params.get("mode", "text")
+        if mode not in self.search_modes:
+            raise ValidationError({"mode": f"Unknown search mode: {mode}"})
+
+        languages = request.query_params.getlist("language")
+        known = {code for code, _ in Snippet.LANGUAGE_CHOICES}
+        unknown = [language for language in languages if language not in known]
+        if unknown:
+            raise ValidationError({"language": f"Unknown language: {unknown[0]}"})
+
+        page = self._positive_int("page", 1)
+        page_size = min(
+            self._positive_int(self.page_size_query_param, api_settings.PAGE_SIZE),
+            settings.MAX_PAGE_SIZE,
+        )
+
+        # One extra row tells whether there is a next page, without a COUNT
+        results = self.search_modes[mode](
+            query,
+            request.user,
+            languages,
+            limit=page_size + 1,
+            offset=(page - 1) * page_size,
+        )
+        url = request.build_absolute_uri()
+        has_next = len(results) > page_size
+        return Response(
+            {
+                "next": replace_query_param(url, "page", page + 1)
+                if has_next
+                else None,
+                "previous": replace_query_param(url, "page", page - 1)
+                if page > 1
+                else None,
+                "results": results[:page_size],
+            }
+        )
+
+    def _positive_int(self, name, default):
+        value = self.request.query_params.get(name)
+        if value is None:
+            return default
+        try:
+            value = int(value)
+        except ValueError:
+            value = 0
+        if value < 1:
+            raise ValidationError({name: "Must be a positive integer."})
+        return value